@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Player, SummonerName, Match, User, MatchParticipation, Post, Newsletter, PlayerOfficialStats
+from .models import Player, SummonerName, Match, User, MatchParticipation, Post, Newsletter, PlayerOfficialStats, \
+    PlayerLeaderboardEntry, Item, Rune, SummonerChampionStats, DuoStats, \
+    Champion, MatchRoster, OfficialMatch
 
 
 # Register your models here.
@@ -44,4 +46,41 @@ class PlayerOfficialStatsAdmin(admin.ModelAdmin):
         'winner', 'side', 'team_vs', 'role', 'champion', 'kills', 'deaths', 'assists',
         'cs', 'gold', 'damage_to_champions', 'team_damage_to_champions', 'vision_score',
         'team_kills', 'team_gold', 'primary_tree', 'secondary_tree', 'items', 'runes'
-    ]
\ No newline at end of file
+    ]
+    readonly_fields = ('item_ids', 'rune_ids')
+
+@admin.register(PlayerLeaderboardEntry)
+class PlayerLeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('player', 'role', 'year', 'games', 'wins', 'win_rate', 'kda', 'cs_per_min', 'updated_at')
+
+@admin.register(Item)
+class ItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name')
+
+@admin.register(Rune)
+class RuneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name')
+
+@admin.register(SummonerChampionStats)
+class SummonerChampionStatsAdmin(admin.ModelAdmin):
+    list_display = ('summoner', 'champion', 'lane', 'games', 'wins', 'kills', 'deaths', 'assists', 'last_played')
+
+
+@admin.register(DuoStats)
+class DuoStatsAdmin(admin.ModelAdmin):
+    list_display = ('player_a', 'player_b', 'games', 'wins', 'last_played')
+
+
+@admin.register(Champion)
+class ChampionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name')
+
+
+@admin.register(MatchRoster)
+class MatchRosterAdmin(admin.ModelAdmin):
+    list_display = ('match', 'champion_ids', 'blue_win')
+
+
+@admin.register(OfficialMatch)
+class OfficialMatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'scheduled_at', 'team_ids', 'synced_at')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FmsDjangoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'FMS_Django_App'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,156 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, ValidationError
+
+from . import views
+from .caching import aget_player_generation
+from .livegames import asse_stream, last_event_id
+from .renderers import ORJSONRenderer
+from .responses import acached_response
+from .pandascore import aofficial_matches, amirrored_matches, PandaScoreError
+
+"""
+Async versions of the I/O-bound public endpoints, for the ASGI deployment
+(uvicorn workers, see README). urls.py routes to them through io_view() when
+settings.ASYNC_VIEWS is on; under WSGI the DRF views are used unchanged.
+
+- AsyncOfficialMatchesView awaits PandaScore (aiohttp) or the mirror (async ORM)
+  instead of holding a worker thread for the upstream call.
+- AsyncCachedStatsView answers cache hits of the per-player stats views and the
+  profile bundle on the event loop, with the same keys and throttles as the DRF
+  view. Misses run the DRF view in a thread, as the computation is ORM/NumPy work.
+- AsyncLiveEventsView keeps SSE clients open on the event loop; one hub per
+  process polls the cache for all of them.
+"""
+
+
+def json_response(data, status=200):
+    # ten sam format co odpowiedzi DRF
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def throttled_response(view_class, request):
+    """
+    Runs the authentication and throttles of the DRF view for a request answered
+    without it. Returns the DRF error response (429, 401), or None when allowed.
+    """
+    view = view_class()
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.headers = view.default_response_headers
+    view.request = view.initialize_request(request)
+
+    try:
+        # throttle uzytkownika liczy po id z tokenu, anonimowy po IP
+        view.perform_authentication(view.request)
+        view.check_throttles(view.request)
+    except APIException as exc:
+        response = view.finalize_response(view.request, view.handle_exception(exc))
+        return response.render()
+    return None
+
+
+class AsyncOfficialMatchesView(View):
+    async def get(self, request):
+        # cache i JWT maja synchroniczne API
+        throttled = await sync_to_async(throttled_response)(views.ListOfficialMatches, request)
+        if throttled:
+            return throttled
+
+        query = views.official_matches_query(request)
+
+        if query['mirrored_team'] is not None:
+            matches, next_cursor = await amirrored_matches(
+                query['mirrored_team'], query['statuses'], cursor=query['cursor'], page=query['page']
+            )
+            return views.add_next_cursor(json_response(matches), request, next_cursor)
+
+        try:
+            data, upstream_status, cache_state = await aofficial_matches(
+                query['team_id'], query['status'], query['page']
+            )
+        except PandaScoreError:
+            return json_response(views.OFFICIAL_MATCHES_UNAVAILABLE, status=502)
+
+        response = json_response(data, status=upstream_status)
+        response['X-Cache'] = cache_state
+        return response
+
+
+class AsyncCachedStatsView(View):
+    # widok DRF z metoda cache_key(request, nick, generation)
+    sync_view = None
+
+    async def get(self, request, nick):
+        try:
+            cache_key = self.sync_view().cache_key(request, nick, await aget_player_generation(nick))
+        except ValidationError:
+            # bledny parametr - odpowiedz 400 zwroci widok DRF
+            cache_key = None
+
+        if cache_key:
+            cached = await acached_response(request, cache_key)
+            if cached:
+                # przy braku w cache limity sprawdzi widok DRF
+                throttled = await sync_to_async(throttled_response)(self.sync_view, request)
+                return throttled or cached
+
+        return await sync_to_async(self.sync_view.as_view())(request, nick=nick)
+
+
+class AsyncAggregatedPlayerStatsView(AsyncCachedStatsView):
+    sync_view = views.AggregatedPlayerStatsView
+
+
+class AsyncPlayerStatsFacetsView(AsyncCachedStatsView):
+    sync_view = views.PlayerStatsFacetsView
+
+
+class AsyncPlayerStatsBreakdownView(AsyncCachedStatsView):
+    sync_view = views.PlayerStatsBreakdownView
+
+
+class AsyncPlayerStatsTrendView(AsyncCachedStatsView):
+    sync_view = views.PlayerStatsTrendView
+
+
+class AsyncPlayerBuildsView(AsyncCachedStatsView):
+    sync_view = views.PlayerBuildsView
+
+
+class AsyncPlayerProfileView(AsyncCachedStatsView):
+    sync_view = views.PlayerProfileView
+
+
+def sse_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx nie buforuje strumienia
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class AsyncLiveEventsView(views.LiveEventsView):
+    async def get(self, request):
+        throttled = await sync_to_async(self.throttled)(request)
+        return throttled or sse_response(asse_stream(last_event_id(request)))
+
+
+ASYNC_VIEWS = {
+    views.ListOfficialMatches: AsyncOfficialMatchesView,
+    views.AggregatedPlayerStatsView: AsyncAggregatedPlayerStatsView,
+    views.PlayerStatsFacetsView: AsyncPlayerStatsFacetsView,
+    views.PlayerStatsBreakdownView: AsyncPlayerStatsBreakdownView,
+    views.PlayerStatsTrendView: AsyncPlayerStatsTrendView,
+    views.PlayerBuildsView: AsyncPlayerBuildsView,
+    views.PlayerProfileView: AsyncPlayerProfileView,
+    views.LiveEventsView: AsyncLiveEventsView,
+}
+
+
+def io_view(view_class):
+    """The async version of view_class when settings.ASYNC_VIEWS is on, otherwise the DRF view."""
+    if getattr(settings, 'ASYNC_VIEWS', False) and view_class in ASYNC_VIEWS:
+        return ASYNC_VIEWS[view_class].as_view()
+    return view_class.as_view()
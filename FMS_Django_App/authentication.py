@@ -1,9 +1,105 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
 from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import APIException, AuthenticationFailed
 import jwt
 from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django_redis.exceptions import ConnectionInterrupted
 from .models import User
 
+"""
+JWT authentication without a database query per request.
+
+The user behind a token (only the fields views and permissions read: role,
+is_staff, is_active, ...) is cached for AUTH_USER_CACHE_TTL together with the
+user's version stamp. Saving or deleting a user bumps the stamp (signals.py), so
+an edited role or a deleted account takes effect on the next request.
+
+Tokens carry a jti. Logout puts it on a denylist in the cache until the token
+expires. The version stamp, the cached user and the denylist entry are read with
+one cache round-trip.
+
+The production cache has IGNORE_EXCEPTIONS on, which would turn a Redis outage
+into "not revoked". The denylist is therefore read and written through the
+django_redis client, which raises: requests with a token get 503 until the cache
+is back, instead of revoked tokens working again.
+"""
+
+ACCESS_TOKEN_LIFETIME = timedelta(hours=24)
+
+AUTH_USER_CACHE_TTL = 300
+
+# pola usera czytane przez widoki i uprawnienia; reszta doczytywana leniwie
+AUTH_USER_FIELDS = ('id', 'nick', 'email', 'first_name', 'last_name', 'role', 'is_staff', 'is_superuser', 'is_active')
+
+
+def _version_key(user_id):
+    return f"auth_user_version:{user_id}"
+
+
+def _user_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def _revoked_key(jti):
+    return f"jwt_revoked:{jti}"
+
+
+class AuthenticationUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Token revocation cannot be checked right now, try again later.'
+    default_code = 'authentication_unavailable'
+
+
+def _strict_cache():
+    # klient django_redis pomija IGNORE_EXCEPTIONS; LocMem (dev) nie ma klienta i nie zglasza bledow
+    return getattr(cache, 'client', cache)
+
+
+def issue_token(user):
+    now = datetime.now()
+    expire = now + ACCESS_TOKEN_LIFETIME
+
+    payload = {
+        'id': user.id,
+        'nick': user.nick,
+        'exp': int(expire.timestamp()),
+        'iat': int(now.timestamp()),
+        'jti': uuid.uuid4().hex,
+    }
+
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def revoke_token(token):
+    """
+    Denylists the token's jti until it expires. Tokens issued without a jti cannot be
+    revoked. Raises AuthenticationUnavailable when the cache cannot store the entry.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return False
+
+    timeout = int(payload['exp'] - time.time())
+    if not payload.get('jti') or timeout <= 0:
+        return False
+
+    try:
+        _strict_cache().set(_revoked_key(payload['jti']), True, timeout=timeout)
+    except ConnectionInterrupted as e:
+        raise AuthenticationUnavailable() from e
+    return True
+
+
+def invalidate_cached_user(user_id):
+    # dopiero po commicie - inaczej rownolegle zapytanie mogloby zapisac stary wiersz pod nowa wersja
+    transaction.on_commit(lambda: cache.set(_version_key(user_id), time.time_ns(), timeout=None))
+
 
 class JWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -22,20 +118,55 @@ class JWTAuthentication(BaseAuthentication):
 
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_id = payload.get('id')
-
-            if not user_id:
-                raise AuthenticationFailed('Invalid token')
-
-            user = User.objects.get(id=user_id)
-            if not user:
-                raise AuthenticationFailed('User not found')
-
-            return (user, token)
-
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed('Token has expired')
         except jwt.InvalidTokenError:
             raise AuthenticationFailed('Invalid token')
+
+        user_id = payload.get('id')
+        if not user_id:
+            raise AuthenticationFailed('Invalid token')
+
+        # wersja, user i denylista jednym zapytaniem do cache
+        jti = payload.get('jti')
+        keys = [_version_key(user_id), _user_key(user_id)]
+        if jti:
+            keys.append(_revoked_key(jti))
+        try:
+            found = _strict_cache().get_many(keys)
+        except ConnectionInterrupted as e:
+            # bez denylisty nie wiadomo, czy token nie zostal odwolany
+            raise AuthenticationUnavailable() from e
+
+        if jti and found.get(_revoked_key(jti)):
+            raise AuthenticationFailed('Token has been revoked')
+
+        user = self.get_user(user_id, found)
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive')
+
+        return (user, token)
+
+    def get_user(self, user_id, found):
+        version = found.get(_version_key(user_id))
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(_version_key(user_id), version, timeout=None):
+                version = cache.get(_version_key(user_id), version)
+
+        entry = found.get(_user_key(user_id))
+        if entry and entry['version'] == version:
+            # from_db() przyjmuje wartosci w kolejnosci pol modelu
+            names = [field.attname for field in User._meta.concrete_fields if field.attname in entry['values']]
+            return User.from_db(router.db_for_read(User), names, [entry['values'][name] for name in names])
+
+        try:
+            user = User.objects.only(*AUTH_USER_FIELDS).get(id=user_id)
         except User.DoesNotExist:
-            raise AuthenticationFailed('User not found')
\ No newline at end of file
+            raise AuthenticationFailed('User not found')
+
+        cache.set(_user_key(user_id), {
+            'version': version,
+            'values': {field: getattr(user, field) for field in AUTH_USER_FIELDS},
+        }, timeout=AUTH_USER_CACHE_TTL)
+        return user
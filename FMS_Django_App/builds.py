@@ -0,0 +1,63 @@
+from collections import ChainMap
+
+from django.db import transaction
+
+from .models import Item, Rune
+
+"""
+Dictionary encoding of PlayerOfficialStats.items / .runes.
+
+Names are mapped to integer ids from the Item / Rune lookup tables, so builds
+can be grouped and compared as small integer arrays instead of JSON.
+
+Known ids are kept per process (lookup rows are never deleted), so encoding a
+row on save does not query the lookup tables again. Ids read inside a
+transaction are shared only after it commits.
+"""
+
+# nazwa -> id, wspolne dla wszystkich BuildEncoder w procesie
+_known_ids = {Item: {}, Rune: {}}
+
+
+def _as_list(value):
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return []
+
+
+def _share_ids(model, ids):
+    _known_ids[model].update(ids)
+
+
+class BuildEncoder:
+    def __init__(self):
+        # ids z biezacej transakcji - po rollbacku moglyby nie istniec
+        self._ids = {Item: {}, Rune: {}}
+
+    def ids_for(self, model, names):
+        names = [str(name) for name in _as_list(names) if name]
+        known = ChainMap(self._ids[model], _known_ids[model])
+
+        missing = {name for name in names if name not in known}
+        if missing:
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            found = dict(model.objects.filter(name__in=missing).values_list('name', 'id'))
+            self._ids[model].update(found)
+            transaction.on_commit(lambda: _share_ids(model, found))
+
+        return [known[name] for name in names]
+
+    def encode(self, stats):
+        # kolejnosc slotow nie ma znaczenia dla buildu
+        stats.item_ids = sorted(self.ids_for(Item, stats.items))
+        stats.rune_ids = self.ids_for(Rune, stats.runes)
+        return stats
+
+
+def decode(model, id_lists):
+    """Maps lists of ids back to names with a single query."""
+    ids = {item_id for id_list in id_lists for item_id in id_list}
+    names = dict(model.objects.filter(id__in=ids).values_list('id', 'name'))
+    return [[names.get(item_id) for item_id in id_list] for id_list in id_lists]
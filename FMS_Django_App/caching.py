@@ -0,0 +1,48 @@
+import time
+
+from django.core.cache import cache
+
+"""
+Generation stamps for per-player caches.
+
+Every cache entry derived from a player's official stats includes the player's
+generation in its key. Bumping the generation makes all those entries
+unreachable at once, so nothing has to be deleted key by key.
+"""
+
+
+def _generation_key(nick):
+    return f"player_generation:{nick.lower()}"
+
+
+def get_player_generation(nick):
+    key = _generation_key(nick)
+    generation = cache.get(key)
+    if generation is None:
+        # znacznik czasu zamiast licznika - po wyrzuceniu klucza z cache nie wrocimy do starej generacji
+        generation = time.time_ns()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def get_player_generations(nicks):
+    """get_player_generation() for several players with one cache round-trip, in the order of nicks."""
+    keys = [_generation_key(nick) for nick in nicks]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else get_player_generation(nick) for nick, key in zip(nicks, keys)]
+
+
+async def aget_player_generation(nick):
+    """get_player_generation() for async views."""
+    key = _generation_key(nick)
+    generation = await cache.aget(key)
+    if generation is None:
+        generation = time.time_ns()
+        if not await cache.aadd(key, generation, timeout=None):
+            generation = await cache.aget(key, generation)
+    return generation
+
+
+def bump_player_generation(nick):
+    cache.set(_generation_key(nick), time.time_ns(), timeout=None)
@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.fields import ArrayField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+"""
+Streaming writers for bulk exports.
+
+Every writer takes column names, the model fields behind them and an iterator
+of row tuples (e.g. from QuerySet.values_list().iterator()) and yields encoded
+chunks, so an export of any size is produced in constant memory.
+"""
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _plain(value):
+    # DurationField -> sekundy, latwiejsze w notebookach niz "0:31:20"
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return value
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    # listy/slowniki (items, runes) jako JSON, zeby dalo sie je wczytac z powrotem
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return _plain(value)
+
+
+def export_fields(queryset):
+    """Output fields of a values_list() queryset, in column order."""
+    select = queryset.query.get_compiler(queryset.db).get_select()[0]
+    return [expression.output_field for expression, _, _ in select]
+
+
+def csv_stream(columns, fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def ndjson_stream(columns, fields, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, map(_plain, row)))) + "\n"
+
+
+class _DrainingBuffer(io.RawIOBase):
+    """Write-only sink that hands over everything written since the last drain()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(pa, field):
+    if isinstance(field, ArrayField):
+        return pa.list_(_arrow_type(pa, field.base_field))
+    if isinstance(field, models.JSONField):
+        # items/runes maja rozny ksztalt miedzy wierszami - zapisujemy tekst JSON, jak w CSV
+        return pa.string()
+    if isinstance(field, (models.IntegerField, models.AutoField, models.DurationField)):
+        # DurationField jako sekundy (_plain)
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def parquet_schema(columns, fields):
+    """Schema built from the model fields, so it does not depend on the values of the first batch."""
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field(column, _arrow_type(pa, field), nullable=True) for column, field in zip(columns, fields)
+    ])
+
+
+def parquet_stream(columns, fields, rows, batch_size=EXPORT_CHUNK_SIZE):
+    # pyarrow jest opcjonalny - sprawdzane w widoku przez parquet_available()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(columns, fields)
+    as_json = [isinstance(field, models.JSONField) for field in fields]
+
+    sink = _DrainingBuffer()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    def write_batch(batch):
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)], schema=schema
+        ))
+        return sink.drain()
+
+    batch = []
+    for row in rows:
+        batch.append([
+            json.dumps(value, cls=DjangoJSONEncoder) if json_value and value is not None else _plain(value)
+            for value, json_value in zip(row, as_json)
+        ])
+        if len(batch) >= batch_size:
+            yield write_batch(batch)
+            batch = []
+
+    if batch:
+        yield write_batch(batch)
+
+    # pusty eksport - nadal poprawny plik parquet z pelnym schematem
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def aiterate(chunks, chunks_per_hop=EXPORT_CHUNK_SIZE // 10):
+    """
+    Async iterator over a sync export stream, for StreamingHttpResponse under
+    ASGI (a sync iterator would be read whole before sending). The stream reads
+    a database cursor, so it advances in the thread sync views run in, several
+    chunks per thread hop.
+    """
+    def take():
+        return list(islice(chunks, chunks_per_hop))
+
+    take_async = sync_to_async(take, thread_sensitive=True)
+    while True:
+        taken = await take_async()
+        for chunk in taken:
+            yield chunk
+        if len(taken) < chunks_per_hop:
+            return
+
+
+EXPORT_WRITERS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'parquet': parquet_stream,
+}
@@ -0,0 +1,285 @@
+import csv
+import io
+import json
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_duration
+
+from .builds import BuildEncoder
+from .caching import bump_player_generation
+from .leaderboards import refresh_leaderboards
+from .models import Player, PlayerOfficialStats
+from .partitioning import ensure_partitions
+
+"""
+Bulk ingest of PlayerOfficialStats from CSV or NDJSON.
+
+Rows are validated in batches, staged with COPY into a temporary table and
+merged into PlayerOfficialStats with INSERT ... ON CONFLICT on unique_game_player.
+The input format is the same as the /api/export/official_stats/ output
+(player given by nick, gamelength in seconds, items/runes as JSON).
+Caches and leaderboards are invalidated once, after the whole import.
+"""
+
+INGEST_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+
+STAGING_TABLE = "official_stats_staging"
+
+# pola wczytywane z pliku - wszystko poza id, player i polami liczonymi przez BuildEncoder
+INGEST_FIELDS = [
+    field for field in PlayerOfficialStats._meta.concrete_fields
+    if field.name not in ('id', 'player', 'item_ids', 'rune_ids')
+]
+
+
+class RowError(ValueError):
+    pass
+
+
+def _parse_value(field, value):
+    if value is None or value == "":
+        # puste pole tylko tam, gdzie model na nie pozwala
+        if field.null:
+            return None
+        default = field.get_default() if field.blank else None
+        if default is None:
+            raise RowError(f"{field.name}: missing value")
+        return default
+
+    if isinstance(field, models.IntegerField):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RowError(f"{field.name}: expected integer, got {value!r}")
+
+    if isinstance(field, models.DateTimeField):
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            raise RowError(f"{field.name}: invalid datetime {value!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return parsed
+
+    if isinstance(field, models.DurationField):
+        # sekundy (jak w eksporcie) albo "HH:MM:SS"
+        if isinstance(value, (int, float)) or str(value).isdigit():
+            return timedelta(seconds=int(value))
+        parsed = parse_duration(str(value))
+        if parsed is None:
+            raise RowError(f"{field.name}: invalid duration {value!r}")
+        return parsed
+
+    if isinstance(field, models.JSONField):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                raise RowError(f"{field.name}: invalid JSON")
+        return value
+
+    value = str(value)
+    if field.max_length and len(value) > field.max_length:
+        raise RowError(f"{field.name}: longer than {field.max_length} characters")
+    return value
+
+
+def read_rows(stream, input_format):
+    """Yields (line number, dict) from a text stream."""
+    if input_format == 'csv':
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            yield line, row
+    elif input_format == 'ndjson':
+        for line, raw in enumerate(stream, start=1):
+            if not raw.strip():
+                continue
+            try:
+                yield line, json.loads(raw)
+            except ValueError:
+                yield line, None
+    else:
+        raise ValueError(f"Unsupported format: {input_format}")
+
+
+def _copy_value(field, value):
+    """Value of a model field as text understood by COPY ... (FORMAT csv)."""
+    if value is None:
+        # QUOTE_ALL zapisuje None jako "" - kolumny nullable maja FORCE_NULL w COPY
+        return None
+    if isinstance(field, models.JSONField):
+        return json.dumps(value)
+    if isinstance(value, timedelta):
+        return f"{int(value.total_seconds())} seconds"
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _array_literal(values):
+    return "{" + ",".join(map(str, values)) + "}"
+
+
+class OfficialStatsIngest:
+    def __init__(self, batch_size=INGEST_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.encoder = BuildEncoder()
+        # nick -> (id, nick), wczytywane przy pierwszym wierszu
+        self.players = None
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+        self.touched_players = set()
+        self.touched_years = set()
+
+        self.columns = [field.column for field in INGEST_FIELDS] + ['player_id', 'item_ids', 'rune_ids']
+
+    def _reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def _player(self, nick):
+        if self.players is None:
+            # graczy jest kilkuset, ladujemy wszystkich jednym zapytaniem
+            self.players = {
+                nick.lower(): (player_id, nick)
+                for player_id, nick in Player.objects.values_list('id', 'nick')
+            }
+        return self.players.get(str(nick).lower())
+
+    def _validate(self, batch):
+        """Returns rows ready for COPY, unique by (game_id, player_id) - last one wins."""
+        valid = {}
+
+        for line, row in batch:
+            if not isinstance(row, dict):
+                self._reject(line, "invalid row")
+                continue
+
+            player = self._player(row.get('player', ''))
+            if player is None:
+                self._reject(line, f"player: unknown nick {row.get('player')!r}")
+                continue
+
+            try:
+                values = {field.name: _parse_value(field, row.get(field.name)) for field in INGEST_FIELDS}
+            except RowError as e:
+                self._reject(line, str(e))
+                continue
+
+            # COPY omija sygnaly modelu - build kodujemy tutaj, generacje podbija run()
+            stats = PlayerOfficialStats(player_id=player[0], **values)
+            self.encoder.encode(stats)
+
+            valid[(stats.game_id, stats.player_id)] = [
+                *(_copy_value(field, values[field.name]) for field in INGEST_FIELDS),
+                stats.player_id,
+                _array_literal(stats.item_ids),
+                _array_literal(stats.rune_ids),
+            ]
+            self.touched_players.add(player)
+            self.touched_years.add(timezone.localtime(stats.datetime_utc).year)
+
+        return list(valid.values())
+
+    def _merge(self, cursor, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        writer.writerows(rows)
+        buffer.seek(0)
+
+        qn = connection.ops.quote_name
+        columns = ", ".join(qn(column) for column in self.columns)
+        updates = ", ".join(f"{qn(column)} = EXCLUDED.{qn(column)}" for column in self.columns)
+
+        nullable = ", ".join(qn(field.column) for field in INGEST_FIELDS if field.null)
+        force_null = f", FORCE_NULL ({nullable})" if nullable else ""
+
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+        cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv{force_null})", buffer)
+        table = qn(PlayerOfficialStats._meta.db_table)
+
+        # RETURNING xmax nie dziala na tabelach partycjonowanych - liczymy istniejace klucze przed upsertem
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {STAGING_TABLE} s JOIN {table} t "
+            f"ON t.game_id = s.game_id AND t.player_id = s.player_id"
+        )
+        updated = cursor.fetchone()[0]
+
+        # gra przeniesiona na inny rok zmienia tez ranking starego roku
+        moved = (
+            f"FROM {STAGING_TABLE} s JOIN {table} t "
+            f"ON t.game_id = s.game_id AND t.player_id = s.player_id AND t.datetime_utc <> s.datetime_utc"
+        )
+        cursor.execute(f"SELECT DISTINCT t.datetime_utc {moved}")
+        self.touched_years.update(timezone.localtime(old_datetime).year for (old_datetime,) in cursor.fetchall())
+
+        # na tabeli partycjonowanej unique_game_player zawiera datetime_utc - gra z poprawiona data nie dalaby
+        # konfliktu i trafilaby do tabeli drugi raz; przenosimy istniejacy wiersz na nowa date przed upsertem
+        cursor.execute(
+            f"UPDATE {table} t SET datetime_utc = s.datetime_utc FROM {STAGING_TABLE} s "
+            f"WHERE t.game_id = s.game_id AND t.player_id = s.player_id AND t.datetime_utc <> s.datetime_utc"
+        )
+
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT ON CONSTRAINT unique_game_player DO UPDATE SET {updates}"
+        )
+        self.updated += updated
+        self.inserted += len(rows) - updated
+
+    def run(self, stream, input_format):
+        started = time.monotonic()
+        qn = connection.ops.quote_name
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # same kolumny, bez id i ograniczen; IF NOT EXISTS - import w zewnetrznej transakcji moze byc kolejnym
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DROP AS "
+                f"SELECT {', '.join(qn(column) for column in self.columns)} "
+                f"FROM {qn(PlayerOfficialStats._meta.db_table)} WITH NO DATA"
+            )
+
+            batch = []
+            for line, row in read_rows(stream, input_format):
+                self.rows += 1
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    self._flush(cursor, batch)
+                    batch = []
+
+            if batch:
+                self._flush(cursor, batch)
+
+        # jedna inwalidacja na caly import zamiast na kazdy wiersz
+        for _, nick in self.touched_players:
+            bump_player_generation(nick)
+        if self.touched_players:
+            refresh_leaderboards(
+                player_ids=[player_id for player_id, _ in self.touched_players],
+                years=sorted(self.touched_years)
+            )
+
+        seconds = time.monotonic() - started
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(self.rows / seconds, 1) if seconds else self.rows,
+        }
+
+    def _flush(self, cursor, batch):
+        rows = self._validate(batch)
+        if rows:
+            # nowy rok w danych -> nowa partycja (jesli tabela jest partycjonowana)
+            ensure_partitions(PlayerOfficialStats, self.touched_years)
+            self._merge(cursor, rows)
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import ExtractYear
+
+from .models import PlayerOfficialStats, PlayerLeaderboardEntry, official_stats_aggregates
+from .serializers import PlayerAggregatedStatsSerializer
+
+"""
+Leaderboards over all tracked pros.
+
+Per-(player, role, year) aggregates of PlayerOfficialStats are materialized into
+PlayerLeaderboardEntry together with percentile ranks inside each (role, year).
+Refreshing is incremental: only the given players/years are re-aggregated and
+only the (role, year) groups they belong to get new percentiles.
+"""
+
+# metryka w tabeli -> pole PlayerAggregatedStatsSerializer
+LEADERBOARD_METRICS = {
+    'win_rate': 'win_rate',
+    'kda': 'avg_kda',
+    'cs_per_min': 'avg_cs_per_min',
+    'damage_per_min': 'avg_damage_per_min',
+    'kill_participation': 'avg_kill_participation',
+    'gold_participation': 'avg_gold_participation',
+    'dmg_participation': 'avg_dmg_participation',
+    'vision_score': 'avg_vision_score',
+}
+
+# mniej gier nie liczy sie do percentyli
+LEADERBOARD_MIN_GAMES = 3
+
+
+def _metrics(row):
+    data = PlayerAggregatedStatsSerializer(row).data
+    metrics = {field: data[source] for field, source in LEADERBOARD_METRICS.items()}
+    if metrics['kda'] == "Perfect":
+        metrics['kda'] = float(row['total_kills'] + row['total_assists'])
+    return metrics
+
+
+def _percent_rank(values):
+    """PERCENT_RANK() z SQL: (liczba mniejszych wartosci) / (n - 1) * 100."""
+    ordered = sorted(values)
+    ranks = {}
+    for index, value in enumerate(ordered):
+        ranks.setdefault(value, index)
+    if len(ordered) < 2:
+        return {value: 100.0 for value in ordered}
+    return {value: round(rank / (len(ordered) - 1) * 100, 1) for value, rank in ranks.items()}
+
+
+def _refresh_percentiles(role, year):
+    entries = list(PlayerLeaderboardEntry.objects.filter(role=role, year=year))
+    ranked = [entry for entry in entries if entry.games >= LEADERBOARD_MIN_GAMES]
+
+    ranks = {metric: _percent_rank([getattr(entry, metric) for entry in ranked]) for metric in LEADERBOARD_METRICS}
+
+    for entry in entries:
+        if entry.games >= LEADERBOARD_MIN_GAMES:
+            entry.percentiles = {metric: ranks[metric][getattr(entry, metric)] for metric in LEADERBOARD_METRICS}
+        else:
+            entry.percentiles = {}
+
+    PlayerLeaderboardEntry.objects.bulk_update(entries, ['percentiles'])
+
+
+def refresh_leaderboards(player_ids=None, years=None):
+    """
+    Recomputes leaderboard entries for the given players and years (all when None)
+    and percentiles for every (role, year) group that was touched.
+    Returns the number of refreshed entries.
+    """
+    stats = PlayerOfficialStats.objects.annotate(year=ExtractYear('datetime_utc'))
+    entries = PlayerLeaderboardEntry.objects.all()
+
+    if player_ids is not None:
+        stats = stats.filter(player_id__in=player_ids)
+        entries = entries.filter(player_id__in=player_ids)
+
+    if years is not None:
+        # datetime_utc__year to zakres na kolumnie - Postgres przycina partycje
+        years_q = Q()
+        for year in years:
+            years_q |= Q(datetime_utc__year=year)
+        stats = stats.filter(years_q)
+        entries = entries.filter(year__in=years)
+
+    rows = stats.values('player_id', 'role', 'year').annotate(**official_stats_aggregates()).order_by()
+
+    with transaction.atomic():
+        touched = set(entries.values_list('role', 'year').distinct())
+        entries.delete()
+
+        new_entries = []
+        for row in rows:
+            new_entries.append(PlayerLeaderboardEntry(
+                player_id=row['player_id'],
+                role=row['role'],
+                year=row['year'],
+                games=row['total_matches'],
+                wins=row['wins'],
+                **_metrics(row)
+            ))
+            touched.add((row['role'], row['year']))
+
+        PlayerLeaderboardEntry.objects.bulk_create(new_entries)
+
+        for role, year in touched:
+            _refresh_percentiles(role, year)
+
+    return len(new_entries)
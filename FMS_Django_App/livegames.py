@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+import weakref
+
+from django.core.cache import cache
+from django.utils import timezone
+
+"""
+Live game state of tracked summoners and the event log behind the SSE endpoint.
+
+track_live_games polls spectator-v5 and calls update_live_games() with the games
+it found. The current state (puuid -> game) is one cache entry; every change is
+appended to an event log in the cache: a sequence counter plus one entry per
+event, kept for LIVE_EVENT_TTL.
+
+SSE clients never talk to Riot. Under ASGI one LiveEventHub per process polls the
+sequence counter and fans new events out to all connected clients. Under WSGI an
+open stream would hold a worker, so sse_backlog() answers with the events since
+Last-Event-ID and closes; EventSource reconnects after SSE_RETRY.
+"""
+
+LIVE_STATE_KEY = "live_games:state"
+
+LIVE_SEQUENCE_KEY = "live_games:sequence"
+
+LIVE_EVENT_TTL = 3600
+
+# jak czesto strumienie sprawdzaja nowe zdarzenia w cache
+LIVE_POLL_INTERVAL = 1
+
+SSE_HEARTBEAT = 15
+
+# ms, po ilu EventSource wznawia zerwane (lub zamkniete pod WSGI) polaczenie
+SSE_RETRY = 3000
+
+
+def _event_key(event_id):
+    return f"live_games:event:{event_id}"
+
+
+def get_live_games():
+    return cache.get(LIVE_STATE_KEY) or {}
+
+
+def _append_event(event):
+    cache.add(LIVE_SEQUENCE_KEY, 0, timeout=None)
+    event_id = cache.incr(LIVE_SEQUENCE_KEY)
+    event = {'id': event_id, **event}
+    cache.set(_event_key(event_id), event, timeout=LIVE_EVENT_TTL)
+    return event
+
+
+def update_live_games(games):
+    """
+    games: puuid -> game info (nick, riot_id, game_id, champion_id, queue_id, game_start)
+    for every tracked summoner currently in game. Returns the events that were emitted.
+    """
+    previous = get_live_games()
+    events = []
+
+    for puuid, game in games.items():
+        if previous.get(puuid, {}).get('game_id') != game['game_id']:
+            events.append(_append_event({'type': 'started', **game}))
+
+    for puuid, game in previous.items():
+        if games.get(puuid, {}).get('game_id') != game['game_id']:
+            events.append(_append_event({'type': 'finished', **game, 'finished_at': timezone.now().isoformat()}))
+
+    cache.set(LIVE_STATE_KEY, games, timeout=None)
+    return events
+
+
+def _event_range(last_id, sequence):
+    # log w cache ma ograniczony czas zycia - starszych zdarzen juz nie odtworzymy
+    return [_event_key(event_id) for event_id in range(max(last_id, sequence - 1000) + 1, sequence + 1)]
+
+
+def events_since(last_id):
+    sequence = cache.get(LIVE_SEQUENCE_KEY, 0)
+    if sequence <= last_id:
+        return [], sequence
+    found = cache.get_many(_event_range(last_id, sequence))
+    return [found[key] for key in _event_range(last_id, sequence) if key in found], sequence
+
+
+async def aevents_since(last_id):
+    sequence = await cache.aget(LIVE_SEQUENCE_KEY, 0)
+    if sequence <= last_id:
+        return [], sequence
+    found = await cache.aget_many(_event_range(last_id, sequence))
+    return [found[key] for key in _event_range(last_id, sequence) if key in found], sequence
+
+
+def last_event_id(request):
+    """Last-Event-ID of a reconnecting EventSource, None for a new client."""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def sse_backlog(last_id):
+    """SSE body for WSGI: the events since last_id and the current id, then the response ends."""
+    if last_id is None:
+        # nowy klient dostaje tylko nowe zdarzenia
+        events, sequence = [], cache.get(LIVE_SEQUENCE_KEY, 0)
+    else:
+        events, sequence = events_since(last_id)
+
+    # samo "id:" bez danych przesuwa Last-Event-ID klienta, nawet gdy zdarzenia wygasly
+    return f"retry: {SSE_RETRY}\n\n" + "".join(format_event(event) for event in events) + f"id: {sequence}\n\n"
+
+
+class LiveEventHub:
+    """One cache poller per process (event loop) for all connected SSE clients."""
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        self.sequence = None
+
+    async def subscribe(self, last_id):
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.sequence = await cache.aget(LIVE_SEQUENCE_KEY, 0)
+            self.task = asyncio.ensure_future(self.poll())
+
+        # zdarzenia przegapione od Last-Event-ID; nowsze niz sequence trafia do kolejki
+        sequence = self.sequence
+        if last_id is None:
+            return queue, []
+        backlog, _ = await aevents_since(last_id)
+        return queue, [event for event in backlog if event['id'] <= sequence]
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def poll(self):
+        while self.subscribers:
+            await asyncio.sleep(LIVE_POLL_INTERVAL)
+            events, self.sequence = await aevents_since(self.sequence)
+            for event in events:
+                for queue in self.subscribers:
+                    # wolny klient traci zdarzenia zamiast blokowac pozostalych
+                    if not queue.full():
+                        queue.put_nowait(event)
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = LiveEventHub()
+    return hub
+
+
+async def asse_stream(last_id):
+    """Async SSE stream (ASGI) - events come from the per-process hub, open until the client disconnects."""
+    hub = get_hub()
+    queue, backlog = await hub.subscribe(last_id)
+    try:
+        yield f"retry: {SSE_RETRY}\n\n"
+        for event in backlog:
+            yield format_event(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(queue)
@@ -0,0 +1,42 @@
+from django.core.management import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from ...models import Match, MatchParticipation
+
+"""
+Management command for copying game_start / game_duration from Match onto
+MatchParticipation rows that were created before these columns existed.
+
+Rows are updated in id batches, so the table is never locked as a whole.
+"""
+
+
+class Command(BaseCommand):
+    help = "Backfill denormalized game_start and game_duration on match participations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        match = Match.objects.filter(pk=OuterRef('match_id'))
+
+        total = 0
+        while True:
+            ids = list(
+                MatchParticipation.objects.filter(game_start__isnull=True)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            total += MatchParticipation.objects.filter(id__in=ids).update(
+                game_start=Subquery(match.values('game_start')[:1]),
+                game_duration=Subquery(match.values('game_duration')[:1])
+            )
+
+            # Info
+            self.stdout.write(f"Uzupelniono {total} wierszy")
+
+        # Info
+        self.stdout.write(f"PODSUMOWANIE: uzupelniono {total} wierszy")
@@ -0,0 +1,147 @@
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Player, PlayerOfficialStats
+from ...renderers import ORJSONRenderer
+from ...responses import encode_response, response_cache, brotli, GZIP_LEVEL, BROTLI_QUALITY
+from ...serializers import PlayerOfficialStatsSerializer, PlayerAggregatedStatsSerializer
+
+"""
+Micro-benchmark of the cache hit path of AggregatedPlayerStatsView.
+
+Builds a realistic payload (aggregated stats and a page of --rows matches with all
+fields, rendered by the real serializers, nothing is saved) and times per hit:
+- before: cached data from the cache, rendered by DRF's JSONRenderer, gzipped
+- orjson: the same with ORJSONRenderer
+- encoded: the precompressed entry from the responses cache (responses.py)
+
+Uses the configured caches, so on the development LocMem cache it measures the
+CPU side only; with Redis the network round-trip is the same for every variant.
+"""
+
+CHAMPIONS = ('Ahri', 'Azir', 'Sylas', 'Orianna', 'Taliyah', 'Syndra', 'Viktor')
+
+ITEMS = ("Luden's Companion", "Sorcerer's Shoes", "Shadowflame", "Rabadon's Deathcap", "Zhonya's Hourglass", "Void Staff")
+
+RUNES = ('Electrocute', 'Taste of Blood', 'Eyeball Collection', 'Ultimate Hunter', 'Manaflow Band', 'Transcendence')
+
+
+def sample_payload(rows):
+    random.seed(0)
+    player = Player(id=1, nick='Caps')
+    matches = []
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    for i in range(rows):
+        kills, deaths, assists = random.randint(0, 12), random.randint(0, 8), random.randint(0, 15)
+        stats = PlayerOfficialStats(
+            id=i + 1, game_id=f'LEC/2025 Season/Winter Season_Week {i // 6 + 1}_{i}', tournament='LEC 2025 Winter',
+            datetime_utc=start + timedelta(days=i), patch='25.S1.1', gamelength=timedelta(seconds=random.randint(1500, 2400)),
+            winner=random.randint(1, 2), side=random.randint(1, 2), team_vs='G2 Esports', player=player, role='Mid',
+            champion=random.choice(CHAMPIONS), kills=kills, deaths=deaths, assists=assists, cs=random.randint(200, 400),
+            gold=random.randint(10000, 16000), damage_to_champions=random.randint(12000, 40000),
+            team_damage_to_champions=random.randint(60000, 110000), vision_score=random.randint(20, 60),
+            team_kills=random.randint(10, 30), team_gold=random.randint(50000, 70000), items=list(ITEMS),
+            primary_tree='Domination', secondary_tree='Sorcery', runes=list(RUNES), item_ids=list(range(6)),
+            rune_ids=list(range(9)),
+        )
+        # adnotacje z with_derived_metrics()
+        stats.kda = round((kills + assists) / max(deaths, 1), 2)
+        stats.cs_per_min = round(stats.cs / (stats.gamelength.total_seconds() / 60), 2)
+        stats.damage_per_min = round(stats.damage_to_champions / (stats.gamelength.total_seconds() / 60), 2)
+        stats.kill_participation = round((kills + assists) / stats.team_kills * 100, 2)
+        stats.gold_participation = round(stats.gold / stats.team_gold * 100, 2)
+        stats.dmg_participation = round(stats.damage_to_champions / stats.team_damage_to_champions * 100, 2)
+        matches.append(stats)
+
+    aggregated = {
+        'total_matches': 120, 'total_kills': 540, 'total_deaths': 260, 'total_assists': 810, 'total_cs': 36000,
+        'total_gold': 1600000, 'total_team_gold': 7000000, 'total_damage': 3100000, 'total_team_damage': 10500000,
+        'total_vision_score': 4300, 'wins': 74, 'total_team_kills': 2100, 'total_gamelength': timedelta(hours=62),
+    }
+
+    return {
+        'aggregated_stats': PlayerAggregatedStatsSerializer(aggregated).data,
+        'matches': {
+            'results': PlayerOfficialStatsSerializer(matches, many=True).data,
+            'count': 120,
+            'next': 'https://fms.example/api/players/Caps/official_stats/?page=2',
+            'previous': None,
+        }
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark rendering of cached AggregatedPlayerStatsView responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20, help="Matches on the page")
+        parser.add_argument('-n', '--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        data = sample_payload(options['rows'])
+        iterations = options['iterations']
+
+        key = "benchmark_responses"
+        cache.set(key, data)
+        response_cache().set(key, encode_response(data))
+
+        drf_body = JSONRenderer().render(data)
+        orjson_body = ORJSONRenderer().render(data)
+        if json.loads(drf_body) != json.loads(orjson_body):
+            self.stderr.write("ORJSONRenderer zwraca inne dane niz JSONRenderer!")
+
+        def before():
+            body = JSONRenderer().render(cache.get(key))
+            return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+        def with_orjson():
+            body = ORJSONRenderer().render(cache.get(key))
+            return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+        def encoded():
+            return response_cache().get(key)['gzip']
+
+        entry = response_cache().get(key)
+
+        # Info
+        self.stdout.write(
+            f"Payload: {len(drf_body) / 1024:.1f} kB JSON, gzip {len(entry['gzip']) / 1024:.1f} kB"
+            + (f", br {len(entry['br']) / 1024:.1f} kB" if 'br' in entry else "")
+        )
+
+        results = {}
+        for name, hit in (("before (DRF + gzip)", before), ("orjson + gzip", with_orjson), ("encoded", encoded)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                hit()
+            results[name] = (time.perf_counter() - started) / iterations
+
+        baseline = results["before (DRF + gzip)"]
+        for name, elapsed in results.items():
+            # Info
+            self.stdout.write(f"{name}: {elapsed * 1e6:.0f} us/trafienie, {baseline / elapsed:.1f}x")
+
+        # sam rendering, bez cache i kompresji
+        for name, render in (("JSONRenderer", JSONRenderer().render), ("ORJSONRenderer", ORJSONRenderer().render)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                render(data)
+            # Info
+            self.stdout.write(f"{name}: {(time.perf_counter() - started) / iterations * 1e6:.0f} us/render")
+
+        if brotli is not None:
+            started = time.perf_counter()
+            brotli.compress(drf_body, quality=BROTLI_QUALITY)
+            # Info
+            self.stdout.write(f"Brotli (q={BROTLI_QUALITY}) przy zapisie: {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+        cache.delete(key)
+        response_cache().delete(key)
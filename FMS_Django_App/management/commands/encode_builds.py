@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand
+
+from ...builds import BuildEncoder
+from ...caching import bump_player_generation
+from ...models import PlayerOfficialStats, Player
+
+"""
+Management command for backfilling item_ids / rune_ids of PlayerOfficialStats.
+
+Rows are read in chunks and updated with bulk_update, so the whole table is
+never loaded at once. By default only rows without encoded items are processed.
+"""
+
+
+class Command(BaseCommand):
+    help = "Encode items and runes of official stats into lookup table ids"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-encode every row")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        encoder = BuildEncoder()
+        batch_size = options['batch_size']
+
+        stats = PlayerOfficialStats.objects.only('id', 'items', 'runes').order_by('id')
+        if not options['all']:
+            stats = stats.filter(item_ids=[])
+
+        batch = []
+        total = 0
+        for row in stats.iterator(chunk_size=batch_size):
+            batch.append(encoder.encode(row))
+
+            if len(batch) >= batch_size:
+                PlayerOfficialStats.objects.bulk_update(batch, ['item_ids', 'rune_ids'])
+                total += len(batch)
+                batch = []
+
+        if batch:
+            PlayerOfficialStats.objects.bulk_update(batch, ['item_ids', 'rune_ids'])
+            total += len(batch)
+
+        # buildy sa czescia statystyk - stare odpowiedzi z cache sa nieaktualne
+        for nick in Player.objects.values_list('nick', flat=True):
+            bump_player_generation(nick)
+
+        # Info
+        self.stdout.write(f"Zakodowano buildy w {total} wierszach")
@@ -1,5 +1,4 @@
 import os
-import time
 from datetime import datetime, timezone
 
 import requests
@@ -7,6 +6,8 @@ from django.core.management import BaseCommand
 from dotenv import load_dotenv
 
 from ...models import SummonerName, Match, MatchParticipation
+from ...riot import RiotClient
+from ...rosters import RosterBuilder
 
 """
 Management command for fetching and updating data of players from Riot Games API
@@ -16,6 +17,7 @@ Operations that are made:
 2. Calling Riot Games API to fetch data that include rank of the account, then updating it
 3. Calling Riot Games API to fetch 20 match ids of the account and check if there are matching ids from database
 4. Calling Riot Games API to fetch details of matches that are not in database and participants stats
+5. Saving the compact roster of all 10 participants (MatchRoster) for matchup stats
 """
 
 
@@ -35,12 +37,15 @@ class Command(BaseCommand):
             self.stderr.write("Missing RIOT_API_KEY in .env file!")
             return
 
-        # RGAPI Key to headers needed for authorization
-        headers = {"X-Riot-Token": api_key}
+        # Client with RGAPI Key in headers, requests share the rate budget with other commands
+        riot = RiotClient(api_key)
 
         # Global stat of added participants
         total_participants = 0
 
+        # Maps championIds to Champion rows for rosters
+        roster_builder = RosterBuilder()
+
         # Iterate through summoners one by one to fetch all the data we need for every one of them
         for summoner in SummonerName.objects.all():
 
@@ -51,11 +56,12 @@ class Command(BaseCommand):
             # Request URL for getting rank of the account
             rank_url = f"https://euw1.api.riotgames.com/lol/league/v4/entries/by-puuid/{summoner.puuid}"
 
-            # Fetching
-            rank_resp = requests.get(rank_url, headers=headers)
-
-            # Bypassing rate limits
-            time.sleep(1)
+            # Fetching, a timeout or repeated 429 skips only this account
+            try:
+                rank_resp = riot.get(rank_url)
+            except requests.RequestException as e:
+                self.stderr.write(f"Pobieranie rangi konta {summoner.riot_id}: {e}")
+                continue
 
             # Check if there are errors
             if rank_resp.status_code != 200:
@@ -103,10 +109,11 @@ class Command(BaseCommand):
             match_id_url = f"https://europe.api.riotgames.com/lol/match/v5/matches/by-puuid/{summoner.puuid}/ids?start=0&count=20"
 
             # Fetching
-            resp = requests.get(match_id_url, headers=headers)
-
-            # Bypassing rate limits
-            time.sleep(1)
+            try:
+                resp = riot.get(match_id_url)
+            except requests.RequestException as e:
+                self.stderr.write(f"Pobieranie match IDs {summoner.riot_id}: {e}")
+                continue
 
             # Check if there are errors
             if resp.status_code != 200:
@@ -138,11 +145,12 @@ class Command(BaseCommand):
                 # Request URL for new match data
                 match_details_url = f"https://europe.api.riotgames.com/lol/match/v5/matches/{match_id}"
 
-                # Fetching
-                match_resp = requests.get(match_details_url, headers=headers)
-
-                # Bypassing rate limits
-                time.sleep(1)
+                # Fetching, a failed match is retried on the next run (not in the database yet)
+                try:
+                    match_resp = riot.get(match_details_url)
+                except requests.RequestException as e:
+                    self.stderr.write(f"Pobieranie szczegółów meczu {match_id}: {e}")
+                    continue
 
                 # Check if there are errors
                 if match_resp.status_code != 200:
@@ -167,6 +175,11 @@ class Command(BaseCommand):
                 # Look for participants in this match
                 participants = match_details_api["info"]["participants"]
 
+                # Save all participants compactly (only 5v5 modes)
+                roster = roster_builder.build(match_obj, participants)
+                if roster:
+                    roster.save()
+
                 # Local stat for checking if our players took part in the same match
                 match_participants = 0
 
@@ -190,7 +203,9 @@ class Command(BaseCommand):
                         deaths=p["deaths"],
                         assists=p["assists"],
                         win=p["win"],
-                        lane=p["teamPosition"]
+                        lane=p["teamPosition"],
+                        game_start=match_obj.game_start,
+                        game_duration=match_obj.game_duration
                     )
                     match_participants += 1
                     summoner_participants += 1
@@ -1,11 +1,11 @@
 import os
-import time
 
 import requests
 from django.core.management import BaseCommand
 from dotenv import load_dotenv
 
 from FMS_Django_App.models import SummonerName
+from FMS_Django_App.riot import RiotClient
 
 """
 Management command for fetching Riot PUUIDs of players stored in the database.
@@ -31,10 +31,8 @@ class Command(BaseCommand):
             self.stderr.write("Missing RIOT_API_KEY in .env file!")
             return
 
-        # RGAPI Key to headers needed for authorization
-        headers = {
-            "X-Riot-Token": api_key
-        }
+        # Client with RGAPI Key in headers, requests share the rate budget with other commands
+        riot = RiotClient(api_key)
 
         # Iterate through summoners one by one to fetch PUUIDs
         for summoner in SummonerName.objects.all():
@@ -57,7 +55,7 @@ class Command(BaseCommand):
                 try:
 
                     #Fetching
-                    response = requests.get(url=puuid_url, headers=headers)
+                    response = riot.get(puuid_url)
                     response.raise_for_status()
 
                     # Getting PUUID immediately
@@ -77,6 +75,3 @@ class Command(BaseCommand):
 
                 #Info
                 self.stdout.write(f"Added puuid for {summoner.player}'s account {summoner.riot_id}: {puuid}")
-
-                #Bypassing rate limits
-                time.sleep(1.5)
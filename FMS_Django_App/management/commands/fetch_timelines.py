@@ -0,0 +1,145 @@
+import json
+import os
+import time
+import tracemalloc
+from datetime import timedelta
+
+import requests
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from dotenv import load_dotenv
+
+from ...models import Match, MatchTimelineSnapshot
+from ...riot import RiotClient
+from ...rosters import RosterBuilder
+from ...timelines import iter_frames, build_snapshots, SNAPSHOT_MINUTES, TIMELINE_CHUNK_SIZE
+
+"""
+Management command for the opt-in timeline stage, run beside fetch_matches.
+
+Operations that are made:
+1. Selecting matches of tracked players that have a roster but no timeline snapshots
+   (from the last --days days, or all of them with --backfill)
+2. Calling Riot Games API for the match timeline under the shared rate budget
+3. Parsing the frames incrementally and saving gold/CS/XP of all participants at SNAPSHOT_MINUTES
+
+With --backfill, matches fetched before rosters existed get their roster first
+(one extra request per match). --benchmark <file> compares peak memory of
+parsing a saved timeline with json.loads and with the incremental parser.
+"""
+
+# remake / krotsza gra nie ma klatki z 10 minuty
+MIN_GAME_DURATION = min(SNAPSHOT_MINUTES) * 60
+
+
+class Command(BaseCommand):
+    help = "Fetch match timelines and store early-game snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Only matches from the last N days")
+        parser.add_argument('--backfill', action='store_true', help="All matches without snapshots")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after N matches")
+        parser.add_argument('--benchmark', metavar='FILE', help="Measure parsing memory on a saved timeline")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            self.benchmark(options['benchmark'])
+            return
+
+        # Loading environment variables
+        load_dotenv()
+
+        # Getting Riot Games API key from environment variables
+        api_key = os.getenv("RIOT_API_KEY")
+
+        # Check if there is RGAPI in .env file
+        if not api_key:
+            self.stderr.write("Missing RIOT_API_KEY in .env file!")
+            return
+
+        riot = RiotClient(api_key)
+
+        matches = Match.objects.filter(
+            participations__isnull=False, timeline_snapshots__isnull=True, game_duration__gte=MIN_GAME_DURATION
+        ).distinct().order_by('-game_start')
+
+        if options['backfill']:
+            roster_builder = RosterBuilder()
+        else:
+            matches = matches.filter(roster__isnull=False, game_start__gte=timezone.now() - timedelta(days=options['days']))
+
+        if options['limit']:
+            matches = matches[:options['limit']]
+
+        # Global stat of saved snapshots
+        total_snapshots = 0
+
+        for match in matches.select_related('roster'):
+
+            # Backfill: roster for matches fetched before MatchRoster existed
+            if not hasattr(match, 'roster'):
+                try:
+                    match_resp = riot.get(f"https://europe.api.riotgames.com/lol/match/v5/matches/{match.match_id}")
+                except requests.RequestException as e:
+                    self.stderr.write(f"Pobieranie szczegółów meczu {match.match_id}: {e}")
+                    continue
+                if match_resp.status_code != 200:
+                    self.stderr.write(f"Pobieranie szczegółów meczu {match.match_id}: {match_resp.status_code}")
+                    continue
+
+                roster = roster_builder.build(match, match_resp.json()["info"]["participants"])
+                if not roster:
+                    self.stdout.write(f"Pomijam {match.match_id} (nie 5v5)")
+                    continue
+                roster.save()
+
+            # Fetching, the body is read in chunks
+            timeline_url = f"https://europe.api.riotgames.com/lol/match/v5/matches/{match.match_id}/timeline"
+            try:
+                with riot.get(timeline_url, stream=True) as timeline_resp:
+
+                    # Check if there are errors
+                    if timeline_resp.status_code != 200:
+                        self.stderr.write(f"Pobieranie timeline {match.match_id}: {timeline_resp.status_code}")
+                        continue
+
+                    snapshots = build_snapshots(match, iter_frames(timeline_resp.iter_content(TIMELINE_CHUNK_SIZE)))
+            except requests.RequestException as e:
+                # takze zerwane polaczenie w trakcie czytania strumienia
+                self.stderr.write(f"Pobieranie timeline {match.match_id}: {e}")
+                continue
+
+            with transaction.atomic():
+                MatchTimelineSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+
+            total_snapshots += len(snapshots)
+
+            # Info
+            self.stdout.write(f"Zapisano {len(snapshots)} klatek dla {match.match_id}")
+
+        # Info
+        self.stdout.write(f"PODSUMOWANIE: Zapisano {total_snapshots} klatek")
+
+    def benchmark(self, path):
+        def chunks():
+            with open(path, 'rb') as file:
+                while chunk := file.read(TIMELINE_CHUNK_SIZE):
+                    yield chunk
+
+        def whole():
+            with open(path, 'rb') as file:
+                return json.loads(file.read())["info"]["frames"]
+
+        for name, frames in (("json.loads", lambda: whole()), ("iter_frames", lambda: iter_frames(chunks()))):
+            tracemalloc.start()
+            started = time.perf_counter()
+            snapshots = build_snapshots(None, frames())
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # Info
+            self.stdout.write(
+                f"{name}: {len(snapshots)} klatek, szczyt pamieci {peak / 1024 / 1024:.2f} MB, {elapsed * 1000:.1f} ms"
+            )
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+
+from ...ingest import OfficialStatsIngest, INGEST_BATCH_SIZE
+
+"""
+Management command for bulk loading official stats from a CSV or NDJSON file.
+
+Rows are staged with COPY and upserted on (game_id, player), see ingest.py.
+The file format matches /api/export/official_stats/.
+"""
+
+
+class Command(BaseCommand):
+    help = "Bulk import official stats from CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if input_format not in ('csv', 'ndjson'):
+            raise CommandError("Unknown format, use --format csv|ndjson")
+
+        with open(path, encoding='utf-8', newline='') as stream:
+            report = OfficialStatsIngest(batch_size=options['batch_size']).run(stream, input_format)
+
+        for error in report['errors']:
+            self.stderr.write(f"Linia {error['line']}: {error['error']}")
+
+        # Info
+        self.stdout.write(
+            f"Wczytano {report['rows']} wierszy: {report['inserted']} nowych, {report['updated']} zaktualizowanych, "
+            f"{report['rejected']} odrzuconych ({report['rows_per_sec']} wierszy/s)"
+        )
+        self.stdout.write(json.dumps(report))
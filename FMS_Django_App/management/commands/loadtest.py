@@ -0,0 +1,71 @@
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from django.core.management import BaseCommand
+
+"""
+Management command for load testing a running server, e.g. the WSGI (gunicorn
+sync workers) and ASGI (uvicorn workers) deployments side by side, see README.
+
+Sends --requests GET requests to the URL keeping --concurrency of them in
+flight, then reports throughput, latency percentiles and errors. "{n}" in the
+URL is replaced with the request number, so every request can be a cache miss.
+"""
+
+
+class Command(BaseCommand):
+    help = "Load test a URL with concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL to request, "{n}" is replaced with the request number')
+        parser.add_argument('-c', '--concurrency', type=int, default=50)
+        parser.add_argument('-n', '--requests', type=int, default=500)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        latencies, statuses, elapsed = asyncio.run(self.run(options))
+
+        ok = sum(1 for status in statuses if status == 200)
+        errors = {}
+        for status in statuses:
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+
+        latencies.sort()
+        percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+        # Info
+        self.stdout.write(f"{len(statuses)} zapytan, {options['concurrency']} rownolegle, {elapsed:.2f} s")
+        self.stdout.write(f"Przepustowosc: {len(statuses) / elapsed:.1f} req/s, OK: {ok}, bledy: {errors or 0}")
+        if latencies:
+            self.stdout.write(
+                f"Czas odpowiedzi: p50 {percentile(0.5):.0f} ms, p95 {percentile(0.95):.0f} ms, "
+                f"p99 {percentile(0.99):.0f} ms, srednio {statistics.mean(latencies) * 1000:.0f} ms"
+            )
+
+    async def run(self, options):
+        latencies, statuses = [], []
+        numbers = iter(range(options['requests']))
+
+        async def worker(session):
+            for n in numbers:
+                started = time.perf_counter()
+                try:
+                    async with session.get(options['url'].replace('{n}', str(n))) as response:
+                        await response.read()
+                        statuses.append(response.status)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    statuses.append(type(e).__name__)
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        timeout = aiohttp.ClientTimeout(total=options['timeout'])
+        connector = aiohttp.TCPConnector(limit=options['concurrency'])
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(session) for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+
+        return latencies, statuses, elapsed
@@ -0,0 +1,63 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from ...caching import bump_player_generation
+from ...models import Player
+from ...partitioning import PARTITIONED_MODELS, convert_to_partitioned, ensure_partitions, upcoming_years, \
+    archive_partition, restore_partition, check_convertible
+
+"""
+Management command for yearly range partitioning of the stats tables.
+
+Without arguments it creates partitions for the current and next year
+(safe to run on every deploy, no-op for tables that are not partitioned).
+
+--convert                    rebuild the tables as partitioned tables (one-off)
+--archive YEAR --dir PATH    dump the year's partitions to gzipped CSV files and drop them
+--restore YEAR --dir PATH    load archived partitions back
+"""
+
+
+class Command(BaseCommand):
+    help = "Manage yearly partitions of official stats tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true')
+        parser.add_argument('--archive', type=int, metavar='YEAR')
+        parser.add_argument('--restore', type=int, metavar='YEAR')
+        parser.add_argument('--dir', default='archives')
+
+    def handle(self, *args, **options):
+        try:
+            if options['convert']:
+                # wszystkie tabele sprawdzone przed pierwsza konwersja - bez polowicznego stanu
+                with connection.cursor() as cursor:
+                    for model in PARTITIONED_MODELS:
+                        check_convertible(model, cursor)
+
+            for model in PARTITIONED_MODELS:
+                table = model._meta.db_table
+
+                if options['convert']:
+                    years = convert_to_partitioned(model)
+                    self.stdout.write(f"{table}: utworzono partycje dla lat {years}")
+
+                elif options['archive']:
+                    path = archive_partition(model, options['archive'], options['dir'])
+                    self.stdout.write(f"{table}: zarchiwizowano rok {options['archive']} do {path}")
+
+                elif options['restore']:
+                    rows = restore_partition(model, options['restore'], options['dir'])
+                    self.stdout.write(f"{table}: przywrocono {rows} wierszy z roku {options['restore']}")
+
+                else:
+                    created = ensure_partitions(model, upcoming_years())
+                    self.stdout.write(f"{table}: nowe partycje {created or 'brak'}")
+
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        # archiwizacja/przywracanie zmienia dane wszystkich graczy
+        if options['archive'] or options['restore']:
+            for nick in Player.objects.values_list('nick', flat=True):
+                bump_player_generation(nick)
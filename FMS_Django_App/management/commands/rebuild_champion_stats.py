@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from ...rollups import rebuild_champion_stats
+
+"""
+Management command for rebuilding the champion pool rollup (per summoner,
+champion and lane) from MatchParticipation. Needed once for matches fetched
+before the rollup existed; afterwards it is kept up to date as participations
+are added. Duo pairs are rebuilt by rebuild_duo_stats.
+"""
+
+
+class Command(BaseCommand):
+    help = "Rebuild the champion pool rollup from match participations"
+
+    def handle(self, *args, **options):
+        total = rebuild_champion_stats()
+
+        # Info
+        self.stdout.write(f"Przeliczono {total} wierszy puli championow")
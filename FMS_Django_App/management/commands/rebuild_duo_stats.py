@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from ...rollups import rebuild_duo_stats
+
+"""
+Management command for rebuilding the duo rollup (tracked players seen on the
+same team) from MatchParticipation. Needed once for matches fetched before the
+rollup existed; afterwards it is kept up to date as participations are added.
+"""
+
+
+class Command(BaseCommand):
+    help = "Rebuild the duo rollup from match participations"
+
+    def handle(self, *args, **options):
+        total = rebuild_duo_stats()
+
+        # Info
+        self.stdout.write(f"Przeliczono {total} par duo")
@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from ...leaderboards import refresh_leaderboards
+from ...models import Player
+
+"""
+Management command for refreshing leaderboards after official stats imports.
+
+Without arguments every entry is rebuilt. With --player / --year only those
+players and years are re-aggregated (plus percentiles of their role/year groups).
+"""
+
+
+class Command(BaseCommand):
+    help = "Refresh materialized leaderboards of official stats"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--player', action='append', dest='players', help="Nick of the player (repeatable)")
+        parser.add_argument('--year', action='append', dest='years', type=int, help="Year (repeatable)")
+
+    def handle(self, *args, **options):
+        player_ids = None
+        if options['players']:
+            player_ids = list(Player.objects.filter(nick__in=options['players']).values_list('id', flat=True))
+            if not player_ids:
+                self.stderr.write("Nie znaleziono podanych graczy")
+                return
+
+        refreshed = refresh_leaderboards(player_ids=player_ids, years=options['years'])
+
+        # Info
+        self.stdout.write(f"Odswiezono {refreshed} wpisow leaderboardu")
@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from dotenv import load_dotenv
+
+from ...models import OfficialMatch
+from ...pandascore import sync_team, PandaScoreError, SYNC_ENDPOINTS
+
+"""
+Management command mirroring our teams' PandaScore matches into OfficialMatch.
+
+Operations that are made:
+1. Calling PandaScore for upcoming, running and past matches of every team in
+   PANDASCORE_TEAM_IDS (or --team)
+2. Upserting them into OfficialMatch, which /api/officialmatches/ serves from
+
+Without --loop it syncs once (cron). With --loop it keeps polling: every
+--live-interval seconds while one of the matches is running or about to start
+(only running and past, so results show up quickly), and a full sync every
+--interval seconds otherwise.
+"""
+
+# mecz zaczynajacy sie w tym czasie traktujemy jak trwajacy
+LIVE_WINDOW = timedelta(minutes=15)
+
+
+class Command(BaseCommand):
+    help = "Sync official matches of our teams from PandaScore"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, action='append', help="PandaScore team id (repeatable)")
+        parser.add_argument('--past-pages', type=int, default=1, help="Pages of past matches on a full sync")
+        parser.add_argument('--loop', action='store_true', help="Keep polling on a schedule")
+        parser.add_argument('--interval', type=int, default=300, help="Seconds between full syncs")
+        parser.add_argument('--live-interval', type=int, default=20, help="Seconds between polls while live")
+
+    def handle(self, *args, **options):
+        # Loading environment variables
+        load_dotenv()
+
+        team_ids = options['team'] or settings.PANDASCORE_TEAM_IDS
+        if not team_ids:
+            self.stderr.write("Missing PANDASCORE_TEAM_IDS (or --team)!")
+            return
+
+        last_full = None
+        while True:
+            full = last_full is None or time.monotonic() - last_full >= options['interval']
+            self.sync(team_ids, SYNC_ENDPOINTS if full else ('running', 'past'), options['past_pages'] if full else 1)
+            if full:
+                last_full = time.monotonic()
+
+            if not options['loop']:
+                return
+
+            live = self.is_live(team_ids)
+            time.sleep(options['live_interval'] if live else options['interval'])
+
+            # dlugo dzialajacy proces - nie trzymamy zerwanych polaczen
+            close_old_connections()
+
+    def sync(self, team_ids, endpoints, pages):
+        for team_id in team_ids:
+            try:
+                saved = sync_team(team_id, endpoints, pages=pages)
+            except PandaScoreError as e:
+                self.stderr.write(f"Druzyna {team_id}: {e}")
+                continue
+
+            # Info
+            self.stdout.write(f"Druzyna {team_id}: zapisano {saved} meczy ({', '.join(endpoints)})")
+
+    def is_live(self, team_ids):
+        now = timezone.now()
+        return OfficialMatch.objects.filter(team_ids__overlap=team_ids).filter(
+            status='running'
+        ).exists() or OfficialMatch.objects.filter(
+            team_ids__overlap=team_ids, status='not_started', scheduled_at__lte=now + LIVE_WINDOW,
+            scheduled_at__gte=now - LIVE_WINDOW
+        ).exists()
@@ -0,0 +1,94 @@
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import requests
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from dotenv import load_dotenv
+
+from FMS_Django_App.livegames import update_live_games
+from FMS_Django_App.models import SummonerName
+from FMS_Django_App.riot import RiotClient
+
+"""
+Management command tracking which of our players are in game right now.
+
+Operations that are made:
+1. Calling spectator-v5 for every summoner with a PUUID (shared Riot rate budget)
+2. Passing the games found to update_live_games(), which keeps the live state in
+   the cache and emits started/finished events for /api/live/events/
+
+Without --loop it checks once (cron). With --loop it keeps polling every
+--interval seconds.
+"""
+
+
+class Command(BaseCommand):
+    help = "Track live games of players via spectator-v5"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling on a schedule")
+        parser.add_argument('--interval', type=int, default=60, help="Seconds between polls")
+
+    def handle(self, *args, **options):
+        # Loading environment variables
+        load_dotenv()
+
+        # Getting Riot Games API key from environment variables
+        api_key = os.getenv("RIOT_API_KEY")
+
+        # Check if there is RGAPI in .env file
+        if not api_key:
+            self.stderr.write("Missing RIOT_API_KEY in .env file!")
+            return
+
+        # Client with RGAPI Key in headers, requests share the rate budget with other commands
+        riot = RiotClient(api_key)
+
+        while True:
+            games = self.poll(riot)
+            if games is not None:
+                events = update_live_games(games)
+
+                # Info
+                self.stdout.write(f"W grze: {len(games)}, nowe zdarzenia: {len(events)}")
+
+            if not options['loop']:
+                return
+
+            time.sleep(options['interval'])
+
+            # dlugo dzialajacy proces - nie trzymamy zerwanych polaczen
+            close_old_connections()
+
+    def poll(self, riot):
+        """puuid -> game for every summoner in game, None when the poll failed."""
+        games = {}
+        summoners = SummonerName.objects.exclude(puuid="").select_related('player')
+
+        for summoner in summoners:
+            try:
+                game = riot.active_game(summoner.puuid)
+            except requests.exceptions.RequestException as e:
+                # niepelny wynik zakonczylby gry, ktore wciaz trwaja - pomijamy ten obrot
+                self.stderr.write(f"Blad spectator-v5 dla {summoner.riot_id}: {e}")
+                return None
+
+            if game is None:
+                continue
+
+            participant = next((p for p in game.get('participants', []) if p.get('puuid') == summoner.puuid), {})
+            games[summoner.puuid] = {
+                'nick': summoner.player.nick,
+                'riot_id': summoner.riot_id,
+                'game_id': game['gameId'],
+                'champion_id': participant.get('championId'),
+                'queue_id': game.get('gameQueueConfigId'),
+                # gameStartTime w ms, 0 w trakcie ladowania gry
+                'game_start': datetime.fromtimestamp(
+                    game['gameStartTime'] / 1000, tz=dt_timezone.utc
+                ).isoformat() if game.get('gameStartTime') else None,
+            }
+
+        return games
@@ -16,7 +16,7 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
                 "connect-src 'self' https://api.pandascore.co http://localhost:* http://127.0.0.1:* ws://localhost:* wss://localhost:*; "
                 "frame-ancestors 'none'; "
                 "base-uri 'self'; "
-                "form-action 'self'; "
+                "form-action 'self';"
             )
         else:
             # Bardzo restrykcyjne CSP dla produkcji
@@ -31,7 +31,7 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
                 "base-uri 'self'; "
                 "form-action 'self'; "
                 "frame-ancestors 'none'; "
-                "upgrade-insecure-requests; "
+                "upgrade-insecure-requests;"
             )
 
         # Permissions Policy - rozszerzone
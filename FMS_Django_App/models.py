@@ -1,6 +1,13 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Case, When, F, Q, Value, FloatField, Count, Sum
+from django.db.models.functions import Cast, Extract, Round
 from django.utils import timezone
 
 
@@ -80,6 +87,10 @@ class MatchParticipation(models.Model):
     assists = models.IntegerField()
     win = models.BooleanField()
     lane = models.CharField(max_length=50)
+    # kopia z Match - historia gracza stronicowana po indeksie (summoner, -game_start) bez JOIN-a;
+    # NULL tylko w starych wierszach (backfill_participation_dates), po partycjonowaniu kolumna jest NOT NULL
+    game_start = models.DateTimeField(null=True, blank=True)
+    game_duration = models.IntegerField(default=0)
 
     class Meta:
         # unique constraint tworzy z automatu index i zapewnia unikalnosc
@@ -90,6 +101,108 @@ class MatchParticipation(models.Model):
             )
         ]
 
+        indexes = [
+            models.Index(fields=['summoner', '-game_start'], name='participation_summoner_start')
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.game_start is None:
+            self.game_start = self.match.game_start
+            self.game_duration = self.game_duration or self.match.game_duration
+        super().save(*args, **kwargs)
+
+
+ROSTER_SIZE = 10
+
+
+class MatchRoster(models.Model):
+    """
+    Wszyscy uczestnicy meczu 5v5, nie tylko sledzeni gracze. Sloty 0-4 to druzyna 100 (blue),
+    5-9 druzyna 200 (red); kazda tablica ma jedna wartosc na slot.
+    """
+    match = models.OneToOneField(Match, related_name='roster', on_delete=models.CASCADE, primary_key=True)
+    puuids = ArrayField(models.CharField(max_length=78), size=ROSTER_SIZE)
+    champion_ids = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    # indeksy w rosters.POSITIONS
+    positions = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    kills = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    deaths = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    assists = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    blue_win = models.BooleanField()
+
+    class Meta:
+        indexes = [
+            # mecze gracza po dowolnym z jego kont: puuids && ARRAY[...]
+            GinIndex(fields=['puuids'], name='roster_puuids_gin')
+        ]
+
+
+class MatchTimelineSnapshot(models.Model):
+    """Stan uczestnikow w danej minucie z timeline meczu, tablice w kolejnosci slotow MatchRoster."""
+    match = models.ForeignKey(Match, related_name='timeline_snapshots', on_delete=models.CASCADE)
+    minute = models.SmallIntegerField()
+    gold = ArrayField(models.IntegerField(), size=ROSTER_SIZE)
+    cs = ArrayField(models.SmallIntegerField(), size=ROSTER_SIZE)
+    xp = ArrayField(models.IntegerField(), size=ROSTER_SIZE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'minute'], name='unique_match_minute')
+        ]
+
+
+class SummonerChampionStats(models.Model):
+    """Rollup MatchParticipation per (konto, champion, lane), aktualizowany przy dodawaniu meczy."""
+    summoner = models.ForeignKey(SummonerName, related_name='champion_stats', on_delete=models.CASCADE)
+    champion = models.CharField(max_length=50)
+    lane = models.CharField(max_length=50)
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    kills = models.IntegerField(default=0)
+    deaths = models.IntegerField(default=0)
+    assists = models.IntegerField(default=0)
+    last_played = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['summoner', 'champion', 'lane'],
+                name='unique_summoner_champion_lane'
+            )
+        ]
+
+
+class DuoStats(models.Model):
+    """Gry dwoch sledzonych graczy w tej samej druzynie, player_a.id < player_b.id."""
+    player_a = models.ForeignKey(Player, related_name='duos_as_a', on_delete=models.CASCADE)
+    player_b = models.ForeignKey(Player, related_name='duos_as_b', on_delete=models.CASCADE)
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    last_played = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player_a', 'player_b'], name='unique_duo'),
+            models.CheckConstraint(condition=models.Q(player_a__lt=models.F('player_b')), name='duo_ordered_pair')
+        ]
+
+
+class OfficialMatch(models.Model):
+    """Kopia meczu z PandaScore utrzymywana przez sync_official_matches, payload w formacie API."""
+    # id z PandaScore
+    id = models.IntegerField(primary_key=True)
+    status = models.CharField(max_length=20)
+    scheduled_at = models.DateTimeField()
+    team_ids = ArrayField(models.IntegerField(), default=list)
+    payload = models.JSONField()
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['team_ids'], name='official_match_teams_gin'),
+            models.Index(fields=['status', 'scheduled_at', 'id'], name='official_match_keyset'),
+        ]
+
 
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
@@ -108,6 +221,211 @@ class Newsletter(models.Model):
     email = models.EmailField(max_length=255, unique=True)
     created_at=models.DateTimeField(auto_now_add=True)
 
+class Item(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Rune(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Champion(models.Model):
+    # id = championId z Riot API
+    id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+def _rounded(expression, places):
+    # Round() na Postgresie zwraca numeric, rzutujemy z powrotem na float
+    return Cast(Round(expression, places), FloatField())
+
+
+def _percent_of(part, total):
+    return Case(
+        When(**{total: 0}, then=Value(0.0)),
+        default=_rounded(Cast(part, FloatField()) * 100 / F(total), 1),
+        output_field=FloatField()
+    )
+
+
+def _per_minute(field):
+    game_minutes = Cast(Extract('gamelength', 'epoch'), FloatField()) / 60.0
+    return Case(
+        When(gamelength__lte=timedelta(0), then=Value(0.0)),
+        default=_rounded(Cast(F(field), FloatField()) / game_minutes, 1),
+        output_field=FloatField()
+    )
+
+
+DERIVED_METRICS = (
+    'kda', 'cs_per_min', 'damage_per_min',
+    'kill_participation', 'gold_participation', 'dmg_participation'
+)
+
+# kolumny, z ktorych liczona jest metryka (serializer nie moze ich odroczyc)
+DERIVED_METRIC_INPUTS = {
+    'kda': ('kills', 'deaths', 'assists'),
+    'cs_per_min': ('cs', 'gamelength'),
+    'damage_per_min': ('damage_to_champions', 'gamelength'),
+    'kill_participation': ('kills', 'assists', 'team_kills'),
+    'gold_participation': ('gold', 'team_gold'),
+    'dmg_participation': ('damage_to_champions', 'team_damage_to_champions'),
+}
+
+
+def _round_half_up(value, places):
+    # jak ROUND() na numeric w Postgresie, nie bankierskie round() Pythona
+    return float(Decimal(value).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP))
+
+
+def derived_metric(stats, name):
+    """
+    The value with_derived_metrics() annotates, computed in Python for rows
+    loaded without the annotation.
+    """
+    if name == 'kda':
+        takedowns = stats.kills + stats.assists
+        return float(takedowns) if stats.deaths == 0 else _round_half_up(takedowns / stats.deaths, 2)
+
+    if name in ('cs_per_min', 'damage_per_min'):
+        minutes = stats.gamelength.total_seconds() / 60 if stats.gamelength else 0
+        value = stats.cs if name == 'cs_per_min' else stats.damage_to_champions
+        return _round_half_up(value / minutes, 1) if minutes > 0 else 0.0
+
+    part, total = {
+        'kill_participation': (stats.kills + stats.assists, stats.team_kills),
+        'gold_participation': (stats.gold, stats.team_gold),
+        'dmg_participation': (stats.damage_to_champions, stats.team_damage_to_champions),
+    }[name]
+    return _round_half_up(part * 100 / total, 1) if total else 0.0
+
+
+def official_stats_aggregates():
+    # pola wejsciowe PlayerAggregatedStatsSerializer
+    return {
+        'total_matches': Count('id'),
+        'total_kills': Sum('kills'),
+        'total_deaths': Sum('deaths'),
+        'total_assists': Sum('assists'),
+        'total_cs': Sum('cs'),
+        'total_gold': Sum('gold'),
+        'total_damage': Sum('damage_to_champions'),
+        'total_team_damage': Sum('team_damage_to_champions'),
+        'total_vision_score': Sum('vision_score'),
+        'total_team_kills': Sum('team_kills'),
+        'total_team_gold': Sum('team_gold'),
+        'total_gamelength': Sum('gamelength'),
+        'wins': Count('id', filter=Q(winner=F('side')))
+    }
+
+
+def _ratio_of(part, total, scale=1, places=1):
+    # 0 przy zerowym mianowniku i zaokraglenie jak w PlayerAggregatedStatsSerializer
+    return Case(
+        When(**{f'{total}__lte': 0}, then=Value(0.0)),
+        default=_rounded(Cast(part, FloatField()) * scale / F(total), places),
+        output_field=FloatField()
+    )
+
+
+def _ratio_per_minute(total):
+    game_minutes = Cast(Extract('total_gamelength', 'epoch'), FloatField()) / 60.0
+    return Case(
+        When(total_gamelength__lte=timedelta(0), then=Value(0.0)),
+        default=_rounded(Cast(F(total), FloatField()) / game_minutes, 1),
+        output_field=FloatField()
+    )
+
+
+def official_stats_sort_expressions():
+    """
+    Calculated fields of PlayerAggregatedStatsSerializer as SQL expressions over
+    official_stats_aggregates(), for ordering groups in the database.
+    """
+    takedowns = F('total_kills') + F('total_assists')
+    return {
+        # Perfect KDA (0 smierci) zawsze najwyzej
+        'avg_kda': Case(
+            When(total_deaths=0, then=Value(float('inf'))),
+            default=_ratio_of(takedowns, 'total_deaths', places=2),
+            output_field=FloatField()
+        ),
+        'avg_cs_per_min': _ratio_per_minute('total_cs'),
+        'avg_damage_per_min': _ratio_per_minute('total_damage'),
+        'win_rate': _ratio_of(F('wins'), 'total_matches', 100),
+        'avg_kill_participation': _ratio_of(takedowns, 'total_team_kills', 100),
+        'avg_gold_participation': _ratio_of(F('total_gold'), 'total_team_gold', 100),
+        'avg_dmg_participation': _ratio_of(F('total_damage'), 'total_team_damage', 100),
+        'avg_vision_score': _ratio_of(F('total_vision_score'), 'total_matches'),
+    }
+
+
+class PlayerOfficialStatsQuerySet(models.QuerySet):
+    # bulk_create/bulk_update/update() omijaja sygnal pre_save - item_ids/rune_ids kodujemy tutaj
+    def bulk_create(self, objs, *args, **kwargs):
+        from .builds import BuildEncoder
+
+        objs = list(objs)
+        encoder = BuildEncoder()
+        for stats in objs:
+            encoder.encode(stats)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from .builds import BuildEncoder
+
+        if 'items' in fields or 'runes' in fields:
+            objs = list(objs)
+            encoder = BuildEncoder()
+            for stats in objs:
+                encoder.encode(stats)
+            fields = [*fields, *({'item_ids', 'rune_ids'} - set(fields))]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        from .builds import BuildEncoder
+
+        # bulk_update() przekazuje tu wyrazenia razem z juz zakodowanymi item_ids/rune_ids
+        if ('items' in kwargs or 'runes' in kwargs) and not ('item_ids' in kwargs or 'rune_ids' in kwargs):
+            if not all(isinstance(kwargs.get(name, []), (list, dict)) for name in ('items', 'runes')):
+                raise ValueError("items/runes can only be updated with values, not expressions")
+            encoder = BuildEncoder()
+            if 'items' in kwargs:
+                kwargs['item_ids'] = sorted(encoder.ids_for(Item, kwargs['items']))
+            if 'runes' in kwargs:
+                kwargs['rune_ids'] = encoder.ids_for(Rune, kwargs['runes'])
+        return super().update(**kwargs)
+
+    def with_derived_metrics(self):
+        """
+        Annotates per-game metrics computed by the database, so they can be
+        used in order_by()/filter() and read directly by the serializer.
+        """
+        takedowns = F('kills') + F('assists')
+        return self.annotate(
+            kda=Case(
+                # Perfect KDA
+                When(deaths=0, then=Cast(takedowns, FloatField())),
+                default=_rounded(Cast(takedowns, FloatField()) / F('deaths'), 2),
+                output_field=FloatField()
+            ),
+            cs_per_min=_per_minute('cs'),
+            damage_per_min=_per_minute('damage_to_champions'),
+            kill_participation=_percent_of(takedowns, 'team_kills'),
+            gold_participation=_percent_of(F('gold'), 'team_gold'),
+            dmg_participation=_percent_of(F('damage_to_champions'), 'team_damage_to_champions'),
+        )
+
+
 class PlayerOfficialStats(models.Model):
     game_id = models.CharField(max_length=255)
     tournament = models.CharField(max_length=255)
@@ -134,6 +452,11 @@ class PlayerOfficialStats(models.Model):
     primary_tree = models.CharField(max_length=100)
     secondary_tree = models.CharField(max_length=100)
     runes = models.JSONField()
+    # items/runes zakodowane jako id z tabel Item/Rune (builds.BuildEncoder), itemy posortowane
+    item_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    rune_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+
+    objects = PlayerOfficialStatsQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -146,4 +469,37 @@ class PlayerOfficialStats(models.Model):
             models.Index(fields=['player', 'tournament']),
             models.Index(fields=['player', 'team_vs']),
             models.Index(fields=['datetime_utc'])
-        ]
\ No newline at end of file
+        ]
+
+
+class PlayerLeaderboardEntry(models.Model):
+    """
+    Zmaterializowane statystyki gracza na danej roli w danym roku,
+    odswiezane przez leaderboards.refresh_leaderboards().
+    """
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="leaderboard_entries")
+    role = models.CharField(max_length=50)
+    year = models.IntegerField()
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    win_rate = models.FloatField(default=0)
+    kda = models.FloatField(default=0)
+    cs_per_min = models.FloatField(default=0)
+    damage_per_min = models.FloatField(default=0)
+    kill_participation = models.FloatField(default=0)
+    gold_participation = models.FloatField(default=0)
+    dmg_participation = models.FloatField(default=0)
+    vision_score = models.FloatField(default=0)
+    # metryka -> percentyl (0-100) wsrod graczy z ta sama rola i rokiem
+    percentiles = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["player", "role", "year"], name="unique_leaderboard_player_role_year")
+        ]
+
+        indexes = [
+            models.Index(fields=['role', 'year'])
+        ]
+
@@ -0,0 +1,394 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+import weakref
+
+import aiohttp
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from requests.adapters import HTTPAdapter
+
+from .models import OfficialMatch
+
+"""
+Caching proxy in front of the PandaScore matches endpoint.
+
+- one pooled requests.Session per process, with connect/read timeouts
+- responses are cached for a TTL picked from the match statuses in the payload
+  (short while a match is running, long once everything is finished) and kept
+  for PANDASCORE_STALE_TTL longer, so upstream errors are answered with stale data
+- concurrent misses for the same query are coalesced with a cache lock: one
+  request goes upstream, the others serve the stale copy or wait for the result
+
+The upstream address comes from settings.PANDASCORE_BASE_URL, so tests can point
+the proxy at a local stub server.
+
+The a-prefixed functions are the same operations for async views: aiohttp with
+one pooled session per event loop, Django's async cache/ORM API, and in-process
+coalescing on top of the cache lock.
+
+Matches of the teams in settings.PANDASCORE_TEAM_IDS are mirrored into
+OfficialMatch by sync_official_matches and served from the database with keyset
+pagination (mirrored_matches); other teams still go through the proxy.
+"""
+
+PANDASCORE_TIMEOUT = (3, 5)
+
+PANDASCORE_PAGE_SIZE = 5
+
+# TTL po statusie meczu, najkrotszy ze statusow w odpowiedzi wygrywa
+PANDASCORE_STATUS_TTL = {
+    'running': 15,
+    'not_started': 120,
+    'postponed': 600,
+    'finished': 3600,
+    'canceled': 3600,
+}
+
+PANDASCORE_DEFAULT_TTL = 60
+
+PANDASCORE_STALE_TTL = 24 * 3600
+
+# jak dlugo inne zapytania czekaja na wynik zapytania, ktore poszlo do PandaScore
+PANDASCORE_LOCK_TIMEOUT = sum(PANDASCORE_TIMEOUT) + 1
+
+PANDASCORE_WAIT_STEP = 0.1
+
+
+class PandaScoreError(Exception):
+    pass
+
+
+_session = None
+
+_async_sessions = weakref.WeakKeyDictionary()
+
+# zapytania do PandaScore w toku w tym procesie (async), klucz cache -> Task
+_inflight = {}
+
+
+def get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        _session = session
+    return _session
+
+
+def get_async_session():
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connect, read = PANDASCORE_TIMEOUT
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+        )
+        _async_sessions[loop] = session
+    return session
+
+
+async def aclose_session():
+    """Closes the aiohttp session of the running loop (ASGI lifespan shutdown, tests)."""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def base_url():
+    return getattr(settings, 'PANDASCORE_BASE_URL', 'https://api.pandascore.co')
+
+
+def ttl_for(matches):
+    if not isinstance(matches, list) or not matches:
+        return PANDASCORE_DEFAULT_TTL
+    return min(PANDASCORE_STATUS_TTL.get(match.get('status'), PANDASCORE_DEFAULT_TTL) for match in matches)
+
+
+def _cache_key(path, params):
+    digest = hashlib.md5(json.dumps([path, params], sort_keys=True).encode()).hexdigest()
+    return f"pandascore:{digest}"
+
+
+def _headers():
+    return {"Authorization": f"Bearer {os.getenv('PANDASCORE_API_KEY', '')}"}
+
+
+def _is_upstream_failure(status):
+    # 429 i 5xx to awaria upstreamu - mozna podac stara odpowiedz
+    return status == 429 or status >= 500
+
+
+def _is_fresh(entry):
+    return bool(entry) and entry['expires_at'] > time.time()
+
+
+def _cache_entry(data, status):
+    ttl = ttl_for(data)
+    return {'data': data, 'status': status, 'expires_at': time.time() + ttl}, ttl + PANDASCORE_STALE_TTL
+
+
+def fetch(path, params):
+    try:
+        response = get_session().get(
+            f"{base_url()}{path}",
+            params=params,
+            headers=_headers(),
+            timeout=PANDASCORE_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        raise PandaScoreError(str(e)) from e
+
+    if _is_upstream_failure(response.status_code):
+        raise PandaScoreError(f"PandaScore {response.status_code}")
+
+    try:
+        return response.json(), response.status_code
+    except ValueError as e:
+        raise PandaScoreError("PandaScore returned invalid JSON") from e
+
+
+def proxy_get(path, params):
+    """
+    Returns (data, status_code, cache_state) with cache_state HIT / MISS / STALE.
+    Raises PandaScoreError when upstream fails and nothing is cached.
+    """
+    key = _cache_key(path, params)
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + PANDASCORE_LOCK_TIMEOUT
+
+    locked = False
+
+    while True:
+        entry = cache.get(key)
+        if _is_fresh(entry):
+            return entry['data'], entry['status'], 'HIT'
+
+        locked = cache.add(lock_key, 1, timeout=PANDASCORE_LOCK_TIMEOUT)
+        # None - cache niedostepny (IGNORE_EXCEPTIONS), na wpis nie ma co czekac
+        if locked or locked is None:
+            break
+
+        # ktos juz pobiera te same dane
+        if entry:
+            return entry['data'], entry['status'], 'STALE'
+        if time.monotonic() > deadline:
+            break
+        time.sleep(PANDASCORE_WAIT_STEP)
+
+    try:
+        data, status = fetch(path, params)
+
+        # 4xx (np. zly filtr) nie trafia do cache
+        if status == 200:
+            entry, timeout = _cache_entry(data, status)
+            cache.set(key, entry, timeout=timeout)
+    except PandaScoreError:
+        if entry:
+            return entry['data'], entry['status'], 'STALE'
+        raise
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    return data, status, 'MISS'
+
+
+async def afetch(path, params):
+    # aiohttp nie przyjmuje None w parametrach, requests je pomija
+    params = {name: str(value) for name, value in params.items() if value is not None}
+    try:
+        async with get_async_session().get(f"{base_url()}{path}", params=params, headers=_headers()) as response:
+            if _is_upstream_failure(response.status):
+                raise PandaScoreError(f"PandaScore {response.status}")
+            try:
+                return await response.json(content_type=None), response.status
+            except ValueError as e:
+                raise PandaScoreError("PandaScore returned invalid JSON") from e
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise PandaScoreError(str(e)) from e
+
+
+async def _aproxy_get(path, params, key):
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + PANDASCORE_LOCK_TIMEOUT
+    locked = False
+
+    while True:
+        entry = await cache.aget(key)
+        if _is_fresh(entry):
+            return entry['data'], entry['status'], 'HIT'
+
+        locked = await cache.aadd(lock_key, 1, timeout=PANDASCORE_LOCK_TIMEOUT)
+        if locked or locked is None:
+            break
+
+        # inny proces juz pobiera te same dane
+        if entry:
+            return entry['data'], entry['status'], 'STALE'
+        if time.monotonic() > deadline:
+            break
+        await asyncio.sleep(PANDASCORE_WAIT_STEP)
+
+    try:
+        data, status = await afetch(path, params)
+
+        if status == 200:
+            entry, timeout = _cache_entry(data, status)
+            await cache.aset(key, entry, timeout=timeout)
+    except PandaScoreError:
+        if entry:
+            return entry['data'], entry['status'], 'STALE'
+        raise
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+
+    return data, status, 'MISS'
+
+
+async def aproxy_get(path, params):
+    """proxy_get() for async views; concurrent calls in one process share one task."""
+    key = _cache_key(path, params)
+
+    task = _inflight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_aproxy_get(path, params, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+
+    # shield - rozlaczony klient nie anuluje zapytania, na ktore czekaja inni
+    return await asyncio.shield(task)
+
+
+def _official_matches_params(team_id, status, page):
+    return {
+        'filter[opponent_id]': team_id,
+        'filter[status]': status,
+        'page[number]': page,
+        'page[size]': PANDASCORE_PAGE_SIZE,
+    }
+
+
+def official_matches(team_id, status, page=1):
+    return proxy_get('/lol/matches', _official_matches_params(team_id, status, page))
+
+
+async def aofficial_matches(team_id, status, page=1):
+    return await aproxy_get('/lol/matches', _official_matches_params(team_id, status, page))
+
+
+# /lol/matches/<endpoint> synchronizowane dla kazdej druzyny
+SYNC_ENDPOINTS = ('upcoming', 'running', 'past')
+
+SYNC_PAGE_SIZE = 50
+
+# statusy pokazywane od najnowszego, reszta od najblizszego
+DESCENDING_STATUSES = {'finished', 'canceled'}
+
+
+def is_mirrored(team_id):
+    return team_id in getattr(settings, 'PANDASCORE_TEAM_IDS', [])
+
+
+def _official_match(payload):
+    scheduled_at = payload.get('scheduled_at') or payload.get('begin_at')
+    if not scheduled_at:
+        return None
+
+    return OfficialMatch(
+        id=payload['id'],
+        status=payload.get('status') or '',
+        scheduled_at=parse_datetime(scheduled_at),
+        team_ids=[opponent['opponent']['id'] for opponent in payload.get('opponents') or [] if opponent.get('opponent')],
+        payload=payload,
+    )
+
+
+def sync_team(team_id, endpoints=SYNC_ENDPOINTS, pages=1):
+    """Upserts the team's matches from the given endpoints, returns the number of matches saved."""
+    saved = 0
+    for endpoint in endpoints:
+        for page in range(1, pages + 1):
+            data, status = fetch(f'/lol/matches/{endpoint}', {
+                'filter[opponent_id]': team_id, 'page[number]': page, 'page[size]': SYNC_PAGE_SIZE,
+            })
+            if status != 200 or not isinstance(data, list):
+                raise PandaScoreError(f"PandaScore {status} for {endpoint}")
+
+            matches = [match for match in map(_official_match, data) if match]
+            OfficialMatch.objects.bulk_create(
+                matches, update_conflicts=True, unique_fields=['id'],
+                update_fields=['status', 'scheduled_at', 'team_ids', 'payload', 'synced_at'],
+            )
+            saved += len(matches)
+
+            if len(data) < SYNC_PAGE_SIZE:
+                break
+
+    return saved
+
+
+def _encode_cursor(match):
+    return base64.urlsafe_b64encode(f"{match.scheduled_at.isoformat()}|{match.id}".encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        scheduled_at, match_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        scheduled_at, match_id = parse_datetime(scheduled_at), int(match_id)
+    except (ValueError, TypeError):
+        return None
+    # parse_datetime() zwraca None dla tekstu, ktory nie jest data
+    return (scheduled_at, match_id) if scheduled_at else None
+
+
+def _mirrored_page(team_id, statuses, cursor, page, page_size):
+    matches = OfficialMatch.objects.filter(team_ids__contains=[team_id])
+    if statuses:
+        matches = matches.filter(status__in=statuses)
+
+    descending = bool(statuses) and set(statuses) <= DESCENDING_STATUSES
+    order = ('-scheduled_at', '-id') if descending else ('scheduled_at', 'id')
+    matches = matches.order_by(*order)
+
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        scheduled_at, match_id = position
+        if descending:
+            matches = matches.filter(Q(scheduled_at__lt=scheduled_at) | Q(scheduled_at=scheduled_at, id__lt=match_id))
+        else:
+            matches = matches.filter(Q(scheduled_at__gt=scheduled_at) | Q(scheduled_at=scheduled_at, id__gt=match_id))
+        offset = 0
+    else:
+        offset = (max(page, 1) - 1) * page_size
+
+    # jeden wiersz wiecej - wiadomo, czy jest nastepna strona
+    return matches.only('id', 'scheduled_at', 'payload')[offset:offset + page_size + 1]
+
+
+def _page_result(rows, page_size):
+    next_cursor = _encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [row.payload for row in rows[:page_size]], next_cursor
+
+
+def mirrored_matches(team_id, statuses, cursor=None, page=1, page_size=PANDASCORE_PAGE_SIZE):
+    """
+    One page of mirrored matches as PandaScore payloads plus the cursor of the next page.
+    With a cursor the page is read from the (status, scheduled_at, id) index after
+    the last row of the previous page; page is only used for the first request.
+    """
+    return _page_result(list(_mirrored_page(team_id, statuses, cursor, page, page_size)), page_size)
+
+
+async def amirrored_matches(team_id, statuses, cursor=None, page=1, page_size=PANDASCORE_PAGE_SIZE):
+    rows = [row async for row in _mirrored_page(team_id, statuses, cursor, page, page_size)]
+    return _page_result(rows, page_size)
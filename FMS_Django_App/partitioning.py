@@ -0,0 +1,238 @@
+import gzip
+from datetime import datetime
+from pathlib import Path
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import PlayerOfficialStats, MatchParticipation
+
+"""
+Declarative range partitioning by year for the append-only stats tables.
+
+convert_to_partitioned() rebuilds a regular table as a partitioned one
+(one partition per year + a DEFAULT partition), ensure_partitions() creates
+missing yearly partitions, archive_partition() moves a year to a gzipped CSV
+file and drops it, restore_partition() loads such a file back.
+
+Year filters in the views go through <column>__year, which Django turns
+into a range on the column, so Postgres prunes partitions for them.
+Every unique constraint of a partitioned table has to contain the partition
+key, so the primary key becomes (id, <column>) and unique constraints get the
+column appended. Ids still come from a sequence and stay unique.
+
+The appended column weakens the constraints: unique_game_player becomes
+(game_id, player, datetime_utc), so the database accepts the same game twice
+with a different timestamp. The bulk ingest moves an existing game to the new
+timestamp before its upsert (ingest.py); other writers have to check
+(game_id, player) themselves.
+"""
+
+# model -> kolumna, po ktorej partycjonujemy
+PARTITIONED_MODELS = {
+    PlayerOfficialStats: 'datetime_utc',
+    # klucz glowny (id, game_start) wymaga NOT NULL - przed --convert uruchom backfill_participation_dates
+    MatchParticipation: 'game_start',
+}
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _table(model):
+    return model._meta.db_table
+
+
+def partition_name(model, year):
+    return f"{_table(model)}_y{year}"
+
+
+def default_partition_name(model):
+    return f"{_table(model)}_default"
+
+
+def _bounds(year):
+    # granice roku w TIME_ZONE - tak samo liczy filtr datetime_utc__year, wiec trafia w jedna partycje
+    tz = timezone.get_default_timezone()
+    return datetime(year, 1, 1, tzinfo=tz), datetime(year + 1, 1, 1, tzinfo=tz)
+
+
+def is_partitioned(model, cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [_table(model)]
+    )
+    return cursor.fetchone() is not None
+
+
+def partition_years(model, cursor):
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s",
+        [_table(model)]
+    )
+    prefix = f"{_table(model)}_y"
+    return {int(name[len(prefix):]) for (name,) in cursor.fetchall() if name.startswith(prefix)}
+
+
+def _create_partition(model, year, cursor):
+    table, column = _table(model), PARTITIONED_MODELS[model]
+    name = partition_name(model, year)
+    start, end = _bounds(year)
+
+    cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)")
+    # wiersze z tego roku moga juz lezec w partycji DEFAULT - bez przeniesienia ATTACH sie nie uda
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {qn(default_partition_name(model))} "
+        f"WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+        f"INSERT INTO {qn(name)} SELECT * FROM moved",
+        [start, end]
+    )
+    cursor.execute(
+        f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+        [start, end]
+    )
+
+
+def ensure_partitions(model, years):
+    """Creates missing yearly partitions. No-op for tables that are not partitioned."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(model, cursor):
+            return []
+
+        missing = sorted(set(years) - partition_years(model, cursor))
+        for year in missing:
+            _create_partition(model, year, cursor)
+        return missing
+
+
+def upcoming_years():
+    year = timezone.now().year
+    return [year, year + 1]
+
+
+def _index_sql(model, index):
+    columns = ", ".join(
+        f"{qn(model._meta.get_field(field.lstrip('-')).column)}{' DESC' if field.startswith('-') else ''}"
+        for field in index.fields
+    )
+    return f"CREATE INDEX {qn(index.name)} ON {qn(_table(model))} ({columns})"
+
+
+def check_convertible(model, cursor):
+    """Raises ValueError when convert_to_partitioned() cannot convert the model's table."""
+    table, column = _table(model), PARTITIONED_MODELS[model]
+    if is_partitioned(model, cursor):
+        raise ValueError(f"{table} is already partitioned")
+
+    # ADD PRIMARY KEY (id, <kolumna>) ustawia NOT NULL - z pustymi wartosciami konwersja padlaby w polowie
+    cursor.execute(f"SELECT COUNT(*) FROM {qn(table)} WHERE {qn(column)} IS NULL")
+    missing = cursor.fetchone()[0]
+    if missing:
+        raise ValueError(
+            f"{table} has {missing} rows without {column}"
+            + (", run backfill_participation_dates first" if model is MatchParticipation else "")
+        )
+
+
+def convert_to_partitioned(model):
+    """
+    Rebuilds the model's table as a partitioned table in one transaction.
+    Returns the list of created yearly partitions.
+    """
+    table, column = _table(model), PARTITIONED_MODELS[model]
+    legacy = f"{table}_legacy"
+    # nazwa inna niz sekwencja identity starej tabeli ({table}_id_seq)
+    sequence = f"{table}_partitioned_id_seq"
+    pk = model._meta.pk.column
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        check_convertible(model, cursor)
+
+        # odroczone sprawdzenia FK z wczesniejszych zapisow w tej transakcji blokowalyby DROP starej tabeli
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE ({qn(column)})"
+        )
+
+        # identity zostaje w starej tabeli - nowa dostaje zwykla sekwencje
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.{qn(pk)}")
+        cursor.execute(f"SELECT setval(%s, COALESCE(MAX({qn(pk)}), 0) + 1, false) FROM {qn(legacy)}", [qn(sequence)])
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} SET DEFAULT nextval(%s)", [qn(sequence)])
+
+        cursor.execute(
+            f"CREATE TABLE {qn(default_partition_name(model))} PARTITION OF {qn(table)} DEFAULT"
+        )
+
+        cursor.execute(
+            f"SELECT DISTINCT EXTRACT(YEAR FROM {qn(column)} AT TIME ZONE %s)::int FROM {qn(legacy)} "
+            f"WHERE {qn(column)} IS NOT NULL",
+            [timezone.get_default_timezone_name()]
+        )
+        years = sorted({year for (year,) in cursor.fetchall()} | set(upcoming_years()))
+        for year in years:
+            _create_partition(model, year, cursor)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn(pk)}, {qn(column)})")
+
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, models.UniqueConstraint):
+                columns = [model._meta.get_field(field).column for field in constraint.fields]
+                if column not in columns:
+                    columns.append(column)
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(constraint.name)} "
+                    f"UNIQUE ({', '.join(qn(c) for c in columns)})"
+                )
+
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.ForeignKey):
+                target = field.target_field
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_{field.column}_fk')} "
+                    f"FOREIGN KEY ({qn(field.column)}) "
+                    f"REFERENCES {qn(target.model._meta.db_table)} ({qn(target.column)}) "
+                    f"DEFERRABLE INITIALLY DEFERRED"
+                )
+
+        for index in model._meta.indexes:
+            cursor.execute(_index_sql(model, index))
+
+        return years
+
+
+def archive_partition(model, year, directory):
+    """Writes the year's partition to <directory>/<partition>.csv.gz, then detaches and drops it."""
+    name = partition_name(model, year)
+    path = Path(directory) / f"{name}.csv.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if year not in partition_years(model, cursor):
+            raise ValueError(f"No partition {name}")
+
+        cursor.execute(f"ALTER TABLE {qn(_table(model))} DETACH PARTITION {qn(name)}")
+        with gzip.open(path, 'wt', encoding='utf-8') as archive:
+            cursor.copy_expert(f"COPY {qn(name)} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+        cursor.execute(f"DROP TABLE {qn(name)}")
+
+    return path
+
+
+def restore_partition(model, year, directory):
+    """Loads a file written by archive_partition() back into its yearly partition."""
+    name = partition_name(model, year)
+    path = Path(directory) / f"{name}.csv.gz"
+
+    ensure_partitions(model, [year])
+    with transaction.atomic(), connection.cursor() as cursor, gzip.open(path, 'rt', encoding='utf-8') as archive:
+        cursor.copy_expert(f"COPY {qn(name)} FROM STDIN WITH (FORMAT csv, HEADER)", archive)
+        return cursor.rowcount
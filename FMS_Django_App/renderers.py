@@ -0,0 +1,44 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+"""
+orjson-backed JSON renderer for all API views (REST_FRAMEWORK renderer classes).
+
+Like rest_framework.renderers.JSONRenderer it writes compact UTF-8 JSON, and
+datetimes, timedeltas, Decimals, UUIDs and lazy strings go through DRF's own
+encoder. The JSON values are the same, the bytes can differ:
+- floats in exponent form are spelled differently (0.00001 / 1e-05, 1e16 / 1e+16)
+- NaN and Infinity are written as null, where DRF (STRICT_JSON) raises
+Data orjson cannot encode at all (integers above 64 bits) is rendered by DRF.
+"""
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+# typy spoza JSON (datetime, Decimal, ...) - jak w DRF
+_default = encoders.JSONEncoder().default
+
+
+def dumps(data):
+    try:
+        body = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # np. int spoza 64 bitow - DRF sobie poradzi albo zglosi ten sam blad co bez orjson
+        return JSONRenderer().render(data)
+    # DRF escapuje separatory linii/akapitu (niedozwolone w JS przed ES2019)
+    if b'\xe2\x80\xa8' in body or b'\xe2\x80\xa9' in body:
+        body = body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return body
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # wciecia (?indent / Accept: ...; indent=4) tylko w rendererze DRF
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
@@ -0,0 +1,91 @@
+import gzip
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .renderers import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+Cache of encoded responses for the cached read endpoints (per-player stats,
+profile, compare).
+
+On a miss the view renders its data once and stores the JSON bytes together with
+gzip and brotli (if installed) copies in the "responses" cache. A hit picks the
+variant the client accepts and returns the bytes as they are - no serializing,
+rendering or compressing per request.
+
+The "responses" cache stores bytes, so in production it is a separate Redis alias
+without the JSON serializer of the default cache (see settings.CACHES).
+"""
+
+# mniejszych odpowiedzi nie oplaca sie kompresowac
+RESPONSE_MIN_COMPRESS_SIZE = 512
+
+GZIP_LEVEL = 6
+
+BROTLI_QUALITY = 5
+
+
+def response_cache():
+    return caches['responses']
+
+
+def encode_response(data):
+    body = dumps(data)
+    entry = {'identity': body}
+    if len(body) >= RESPONSE_MIN_COMPRESS_SIZE:
+        entry['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return entry
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.partition(';')
+        # "gzip;q=0" oznacza odmowe
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:].strip('0.') == '':
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def encoded_response(request, entry):
+    accepted = accepted_encodings(request)
+    for encoding in ('br', 'gzip'):
+        if encoding in entry and encoding in accepted:
+            response = HttpResponse(entry[encoding], content_type='application/json')
+            response['Content-Encoding'] = encoding
+            break
+    else:
+        response = HttpResponse(entry['identity'], content_type='application/json')
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cached_response(request, key):
+    """The cached response for key, None on a miss."""
+    entry = response_cache().get(key)
+    return encoded_response(request, entry) if entry else None
+
+
+async def acached_response(request, key):
+    """cached_response() for async views."""
+    entry = await response_cache().aget(key)
+    return encoded_response(request, entry) if entry else None
+
+
+def cache_response(request, key, data, timeout):
+    """Encodes data once, caches every variant and returns the one the client accepts."""
+    entry = encode_response(data)
+    response_cache().set(key, entry, timeout=timeout)
+    return encoded_response(request, entry)
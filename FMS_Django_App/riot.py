@@ -0,0 +1,134 @@
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+"""
+Riot Games API client shared by the management commands.
+
+All requests go through one rate budget kept in the cache (Redis in
+production), so fetch_puuids, fetch_matches and fetch_timelines running at the
+same time never exceed the limits of the API key together. The budget is a set
+of fixed windows (requests, seconds), by default the limits of a development key.
+When the cache cannot be used (no Redis configured or reachable), each process
+keeps the windows itself.
+"""
+
+RIOT_RATE_LIMITS = getattr(settings, 'RIOT_RATE_LIMITS', ((20, 1), (100, 120)))
+
+RIOT_TIMEOUT = 10
+
+RIOT_MAX_RETRIES = 3
+
+
+def platform_url():
+    # euw1 - rangi i spectator; w testach lokalny stub
+    return getattr(settings, 'RIOT_PLATFORM_URL', 'https://euw1.api.riotgames.com')
+
+
+class RateBudget:
+    def __init__(self, limits=RIOT_RATE_LIMITS, prefix="riot_budget"):
+        self.limits = limits
+        self.prefix = prefix
+        # okno -> (numer okna, licznik) w tym procesie; None dopoki cache dziala
+        self._local = None
+
+    def _key(self, window, now):
+        return f"{self.prefix}:{window}:{int(now // window)}"
+
+    def _cache_take(self, window, now):
+        key = self._key(window, now)
+        cache.add(key, 0, timeout=window + 1)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # klucz wygasl miedzy add() a incr()
+            cache.add(key, 1, timeout=window + 1)
+            return 1
+
+    def _take(self, window, now):
+        if self._local is None:
+            try:
+                count = self._cache_take(window, now)
+            except (ValueError, ConnectionInterrupted, RedisError):
+                # np. LOCATION bez schematu redis://
+                count = None
+            if count is not None:
+                return count
+            # cache nieuzywalny (albo IGNORE_EXCEPTIONS zwrocilo None) - limit pilnuje sam proces
+            self._local = {}
+
+        period = int(now // window)
+        taken_period, count = self._local.get(window, (period, 0))
+        count = count + 1 if taken_period == period else 1
+        self._local[window] = (period, count)
+        return count
+
+    def _give_back(self, window, now):
+        if self._local is not None:
+            period, count = self._local.get(window, (None, 0))
+            if period == int(now // window):
+                self._local[window] = (period, count - 1)
+            return
+
+        try:
+            cache.decr(self._key(window, now))
+        except (ValueError, ConnectionInterrupted, RedisError):
+            pass
+
+    def try_acquire(self, now):
+        """Takes one request from every window; 0 on success, otherwise seconds to wait (nothing is taken)."""
+        taken = []
+        for limit, window in self.limits:
+            if self._take(window, now) > limit:
+                # odmowa nie zuzywa limitu - oddajemy to, co juz pobrane
+                for taken_window in taken + [window]:
+                    self._give_back(taken_window, now)
+                return window - now % window
+            taken.append(window)
+        return 0
+
+    def acquire(self):
+        """Blocks until every window has room for one more request."""
+        while True:
+            wait = self.try_acquire(time.time())
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class RiotClient:
+    def __init__(self, api_key, budget=None):
+        self.session = requests.Session()
+        self.session.headers["X-Riot-Token"] = api_key
+        self.budget = budget or RateBudget()
+
+    def get(self, url, **kwargs):
+        """
+        GET under the shared budget. 429 responses are retried after Retry-After,
+        when the retries run out requests.HTTPError is raised.
+        """
+        kwargs.setdefault('timeout', RIOT_TIMEOUT)
+
+        for attempt in range(1, RIOT_MAX_RETRIES + 1):
+            self.budget.acquire()
+            response = self.session.get(url, **kwargs)
+            if response.status_code != 429:
+                return response
+
+            response.close()
+            if attempt < RIOT_MAX_RETRIES:
+                time.sleep(int(response.headers.get('Retry-After', 1)))
+
+        response.raise_for_status()
+
+    def active_game(self, puuid):
+        """spectator-v5 game of the account, None when it is not in game."""
+        response = self.get(f"{platform_url()}/lol/spectator/v5/active-games/by-summoner/{puuid}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Max
+
+from .models import MatchParticipation, SummonerChampionStats, DuoStats
+
+"""
+Incremental rollups over MatchParticipation.
+
+apply_participation() adds (sign=1) or removes (sign=-1) one game from the
+(summoner, champion, lane) rollup and apply_duos() does the same for duo pairs
+of tracked players. rebuild_champion_stats() / rebuild_duo_stats() recompute
+the tables from MatchParticipation.
+"""
+
+
+def apply_participation(participation, sign=1):
+    key = {
+        'summoner_id': participation.summoner_id,
+        'champion': participation.champion,
+        'lane': participation.lane,
+    }
+
+    with transaction.atomic():
+        stats, _ = SummonerChampionStats.objects.select_for_update().get_or_create(**key)
+        stats.games += sign
+        stats.wins += sign * int(participation.win)
+        stats.kills += sign * participation.kills
+        stats.deaths += sign * participation.deaths
+        stats.assists += sign * participation.assists
+
+        if sign > 0 and participation.game_start and (
+                stats.last_played is None or participation.game_start > stats.last_played):
+            stats.last_played = participation.game_start
+
+        if sign < 0 and stats.games > 0 and stats.last_played == participation.game_start:
+            # usunieta gra byla ostatnia - data najnowszej z pozostalych
+            stats.last_played = MatchParticipation.objects.filter(**key).exclude(id=participation.id).aggregate(
+                last_played=Max('game_start')
+            )['last_played']
+
+        if stats.games <= 0:
+            stats.delete()
+        else:
+            stats.save()
+
+
+def rebuild_champion_stats():
+    rows = MatchParticipation.objects.values('summoner_id', 'champion', 'lane').annotate(
+        games=Count('id'),
+        wins=Count('id', filter=Q(win=True)),
+        kills=Sum('kills'),
+        deaths=Sum('deaths'),
+        assists=Sum('assists'),
+        last_played=Max('game_start'),
+    ).order_by()
+
+    with transaction.atomic():
+        SummonerChampionStats.objects.all().delete()
+        SummonerChampionStats.objects.bulk_create(
+            [SummonerChampionStats(**row) for row in rows], batch_size=1000
+        )
+
+    return SummonerChampionStats.objects.count()
+
+
+def _pair(player_id, other_id):
+    return (player_id, other_id) if player_id < other_id else (other_id, player_id)
+
+
+def duo_teammates(participation):
+    """
+    Tracked teammates already stored for the same match.
+    Same team = same result, as MatchParticipation does not store the team.
+    """
+    return list(MatchParticipation.objects.filter(
+        match_id=participation.match_id, win=participation.win
+    ).exclude(id=participation.id).exclude(summoner__player_id=participation.summoner.player_id).values_list(
+        'summoner__player_id', flat=True
+    ).distinct())
+
+
+def apply_duos(participation, sign=1, teammates=None):
+    """
+    Adds the participation to the pairs with its teammates (sign=1) or recounts those
+    pairs after it was deleted (sign=-1). A queryset delete removes all rows before
+    post_delete runs, so on removal the teammates are passed in from pre_delete.
+    """
+    player_id = participation.summoner.player_id
+    if teammates is None:
+        teammates = duo_teammates(participation)
+
+    for other_id in teammates:
+        player_a, player_b = _pair(player_id, other_id)
+        with transaction.atomic():
+            if sign > 0:
+                duo, _ = DuoStats.objects.select_for_update().get_or_create(player_a_id=player_a, player_b_id=player_b)
+                duo.games += 1
+                duo.wins += int(participation.win)
+                if participation.game_start and (duo.last_played is None or participation.game_start > duo.last_played):
+                    duo.last_played = participation.game_start
+                duo.save()
+            else:
+                _recount_duo(player_a, player_b)
+
+
+def _recount_duo(player_a, player_b):
+    # przy usuwaniu liczymy pare od nowa - kilka usunietych wierszy z jednego meczu nie odejmie sie podwojnie
+    counts = MatchParticipation.objects.filter(
+        summoner__player_id=player_a,
+        match__participations__summoner__player_id=player_b,
+        match__participations__win=F('win'),
+    ).aggregate(
+        games=Count('match_id', distinct=True),
+        wins=Count('match_id', distinct=True, filter=Q(win=True)),
+        last_played=Max('game_start'),
+    )
+
+    if counts['games']:
+        DuoStats.objects.update_or_create(player_a_id=player_a, player_b_id=player_b, defaults=counts)
+    else:
+        DuoStats.objects.filter(player_a_id=player_a, player_b_id=player_b).delete()
+
+
+def rebuild_duo_stats():
+    shared_matches = MatchParticipation.objects.values('match_id').annotate(
+        players=Count('summoner__player_id', distinct=True)
+    ).filter(players__gte=2).values('match_id')
+
+    participations = MatchParticipation.objects.filter(match_id__in=shared_matches).values(
+        'match_id', 'summoner__player_id', 'win', 'game_start'
+    ).order_by('match_id')
+
+    by_match = {}
+    for row in participations:
+        by_match.setdefault(row['match_id'], {})[row['summoner__player_id']] = row
+
+    duos = {}
+    for players in by_match.values():
+        rows = sorted(players.values(), key=lambda row: row['summoner__player_id'])
+        for i, first in enumerate(rows):
+            for second in rows[i + 1:]:
+                if first['win'] != second['win']:
+                    continue
+                duo = duos.setdefault(
+                    (first['summoner__player_id'], second['summoner__player_id']),
+                    DuoStats(player_a_id=first['summoner__player_id'], player_b_id=second['summoner__player_id'])
+                )
+                duo.games += 1
+                duo.wins += int(first['win'])
+                if first['game_start'] and (duo.last_played is None or first['game_start'] > duo.last_played):
+                    duo.last_played = first['game_start']
+
+    with transaction.atomic():
+        DuoStats.objects.all().delete()
+        DuoStats.objects.bulk_create(duos.values(), batch_size=1000)
+
+    return len(duos)
@@ -0,0 +1,116 @@
+from .models import Champion, MatchRoster, ROSTER_SIZE
+
+"""
+Compact storage of the full 10-player roster of a match (MatchRoster) and lane
+matchups computed from it.
+
+Every field of MatchRoster is an array with one value per slot. Slots 0-4 are
+team 100 (blue), 5-9 team 200 (red), positions are stored as indexes into
+POSITIONS and champions as Riot championIds mapped to names by Champion.
+"""
+
+POSITIONS = ('', 'TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY')
+
+TEAM_SIZE = ROSTER_SIZE // 2
+
+
+class RosterBuilder:
+    def __init__(self):
+        self._champions = set(Champion.objects.values_list('id', flat=True))
+
+    def champion_ids(self, participants):
+        missing = {
+            p["championId"]: p["championName"] for p in participants if p["championId"] not in self._champions
+        }
+        if missing:
+            Champion.objects.bulk_create(
+                [Champion(id=champion_id, name=name) for champion_id, name in missing.items()], ignore_conflicts=True
+            )
+            self._champions.update(missing)
+
+        return [p["championId"] for p in participants]
+
+    def build(self, match, participants):
+        """Returns an unsaved MatchRoster, or None for modes that are not 5v5 (Arena etc.)."""
+        if len(participants) != ROSTER_SIZE:
+            return None
+
+        participants = sorted(participants, key=lambda p: (p["teamId"], p["participantId"]))
+        if [p["teamId"] for p in participants].count(100) != TEAM_SIZE:
+            return None
+
+        return MatchRoster(
+            match=match,
+            puuids=[p["puuid"] for p in participants],
+            champion_ids=self.champion_ids(participants),
+            positions=[position_index(p.get("teamPosition")) for p in participants],
+            kills=[p["kills"] for p in participants],
+            deaths=[p["deaths"] for p in participants],
+            assists=[p["assists"] for p in participants],
+            blue_win=participants[0]["win"],
+        )
+
+
+def position_index(position):
+    return POSITIONS.index(position) if position in POSITIONS else 0
+
+
+def lane_opponent(roster, slot):
+    """Slot of the player on the other team with the same position, or None."""
+    position = roster.positions[slot]
+    if not position:
+        return None
+
+    enemies = range(TEAM_SIZE, ROSTER_SIZE) if slot < TEAM_SIZE else range(TEAM_SIZE)
+    for enemy in enemies:
+        if roster.positions[enemy] == position:
+            return enemy
+    return None
+
+
+def lane_matchups(puuids, champion=None, opponent=None):
+    """
+    Results of the accounts (puuids) against their lane opponents, grouped by the
+    opponent's champion. champion / opponent limit the rows to the player's and the
+    opponent's champion name.
+    """
+    puuids = set(puuids)
+    champions = dict(Champion.objects.values_list('id', 'name'))
+
+    rosters = MatchRoster.objects.filter(puuids__overlap=list(puuids)).only(
+        'puuids', 'champion_ids', 'positions', 'kills', 'deaths', 'assists', 'blue_win'
+    )
+
+    matchups = {}
+    for roster in rosters.iterator(chunk_size=2000):
+        slot = next(i for i, puuid in enumerate(roster.puuids) if puuid in puuids)
+        enemy = lane_opponent(roster, slot)
+        if enemy is None:
+            continue
+
+        own_champion = champions.get(roster.champion_ids[slot])
+        enemy_champion = champions.get(roster.champion_ids[enemy])
+        if champion and (own_champion or '').lower() != champion.lower():
+            continue
+        if opponent and (enemy_champion or '').lower() != opponent.lower():
+            continue
+
+        row = matchups.setdefault((enemy_champion, roster.positions[slot]), {
+            'opponent': enemy_champion, 'position': POSITIONS[roster.positions[slot]],
+            'games': 0, 'wins': 0, 'kills': 0, 'deaths': 0, 'assists': 0,
+        })
+        row['games'] += 1
+        row['wins'] += int(roster.blue_win == (slot < TEAM_SIZE))
+        row['kills'] += roster.kills[slot]
+        row['deaths'] += roster.deaths[slot]
+        row['assists'] += roster.assists[slot]
+
+    results = []
+    for row in matchups.values():
+        results.append({
+            **row,
+            'win_rate': round(row['wins'] / row['games'] * 100, 1),
+            'kda': round((row['kills'] + row['assists']) / max(row['deaths'], 1), 2),
+        })
+
+    return sorted(results, key=lambda row: (-row['games'], row['opponent'] or ''))
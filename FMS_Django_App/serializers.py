@@ -5,14 +5,33 @@ from django.core.exceptions import ValidationError
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from .models import Player, User, Post, Match, MatchParticipation, Newsletter, SummonerName, PlayerOfficialStats
+from .models import Player, User, Post, Match, MatchParticipation, Newsletter, SummonerName, PlayerOfficialStats, \
+    PlayerLeaderboardEntry, DERIVED_METRIC_INPUTS, derived_metric
+from .timelines import lane_diffs
 import bleach
 
 ALLOWED_TAGS = ['b','i','em','strong','u','a','p','ul','ol','li','br','blockquote','code','pre', 'h1', 'h2']
 ALLOWED_ATTRS = {'a': ['href', 'title', 'rel', 'target']}
 ALLOWED_PROTOCOLS = ['http','https','mailto']
 
-class PlayerSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Serializer keeping only the fields picked by the view (?fields= / ?exclude=, see
+    views.sparse_fieldset). Meta.list_exclude lists heavy fields left out of list
+    responses unless asked for.
+    """
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+
+class PlayerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = ['id', 'first_name', 'last_name', 'nick',  'lane', 'champion', 'team_role', 'twitter', 'youtube', 'twitch', 'kick', 'instagram', 'tiktok']
@@ -82,7 +101,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data['password']
         )
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='nick'
@@ -120,70 +139,77 @@ class MatchSerializer(serializers.ModelSerializer):
         model = Match
         fields = ['match_id', 'game_duration', 'game_start']
 
-class MatchParticipationSerializer(serializers.ModelSerializer):
-    match = MatchSerializer(read_only=True)
+class ParticipationMatchSerializer(serializers.Serializer):
+    # game_start/game_duration czytane z MatchParticipation (zdenormalizowane)
+    match_id = serializers.CharField(source='match.match_id')
+    game_duration = serializers.IntegerField()
+    game_start = serializers.DateTimeField()
+
+class MatchParticipationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    match = ParticipationMatchSerializer(source='*', read_only=True)
     summoner = serializers.CharField(source='summoner.riot_id', read_only=True)
+    # roznice gold/cs/xp z przeciwnikiem z linii w 10/15 minucie, jesli pobrano timeline
+    early_diffs = serializers.SerializerMethodField()
 
     class Meta:
         model = MatchParticipation
-        fields = ['match', 'summoner', 'champion', 'kills', 'deaths', 'assists', 'win', 'lane']
+        fields = ['match', 'summoner', 'champion', 'kills', 'deaths', 'assists', 'win', 'lane', 'early_diffs']
+
+    def get_early_diffs(self, obj):
+        # roster i klatki doczytane razem z Match (ListMatchesView)
+        return lane_diffs(getattr(obj.match, 'roster', None), obj.match.timeline_snapshots.all(), obj.summoner.puuid)
 
 class NewsletterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Newsletter
         fields = ['email']
 
-class SummonerNameSerializer(serializers.ModelSerializer):
+class SummonerNameSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     player = PlayerSerializer(read_only=True)
 
     class Meta:
         model = SummonerName
         fields = ['riot_id', 'puuid', 'player', 'tier', 'rank', 'league_points']
+        # lista rang jest zawsze dla jednego gracza - bez zagniezdzonego gracza w kazdym wierszu
+        list_exclude = ['puuid', 'player']
+
+
+class DerivedMetricField(serializers.ReadOnlyField):
+    """
+    Metric annotated by PlayerOfficialStats.objects.with_derived_metrics(); rows
+    loaded without the annotation get the same value computed in Python.
+    """
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        # kolumny wejsciowe - views.defer_unused_columns ich nie odracza
+        self.requires = DERIVED_METRIC_INPUTS[self.source]
+
+    def get_attribute(self, instance):
+        value = getattr(instance, self.source, None)
+        if value is None:
+            value = derived_metric(instance, self.source)
+
+        # Perfect KDA jako liczba calkowita (kills + assists), jak przed adnotacjami
+        if self.source == 'kda' and instance.deaths == 0:
+            return int(value)
+        return value
 
 
-class PlayerOfficialStatsSerializer(serializers.ModelSerializer):
-    kda = serializers.SerializerMethodField()
-    cs_per_min = serializers.SerializerMethodField()
-    damage_per_min = serializers.SerializerMethodField()
-    kill_participation = serializers.SerializerMethodField()
-    gold_participation = serializers.SerializerMethodField()
-    dmg_participation = serializers.SerializerMethodField()
+class PlayerOfficialStatsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Wyliczane w bazie przez PlayerOfficialStats.objects.with_derived_metrics()
+    kda = DerivedMetricField()
+    cs_per_min = DerivedMetricField()
+    damage_per_min = DerivedMetricField()
+    kill_participation = DerivedMetricField()
+    gold_participation = DerivedMetricField()
+    dmg_participation = DerivedMetricField()
 
     class Meta:
         model = PlayerOfficialStats
-        fields = '__all__'
-
-    def get_kda(self, obj):
-        if obj.deaths == 0:
-            return (obj.kills + obj.assists)  # Perfect KDA
-        return round((obj.kills + obj.assists) / obj.deaths, 2)
-
-    def get_cs_per_min(self, obj):
-        if not obj.gamelength or obj.gamelength.total_seconds() == 0:
-            return 0
-        game_minutes = obj.gamelength.total_seconds() / 60
-        return round(obj.cs / game_minutes, 1)
-
-    def get_damage_per_min(self, obj):
-        if not obj.gamelength or obj.gamelength.total_seconds() == 0:
-            return 0
-        game_minutes = obj.gamelength.total_seconds() / 60
-        return round(obj.damage_to_champions / game_minutes, 1)
-
-    def get_kill_participation(self, obj):
-        if obj.team_kills == 0:
-            return 0
-        return round(((obj.kills + obj.assists) / obj.team_kills) * 100, 1)
-
-    def get_gold_participation(self, obj):
-        if obj.team_gold == 0:
-            return 0
-        return round((obj.gold / obj.team_gold) * 100, 1)
-
-    def get_dmg_participation(self, obj):
-        if obj.team_damage_to_champions == 0:
-            return 0
-        return round((obj.damage_to_champions / obj.team_damage_to_champions) * 100, 1)
+        # item_ids/rune_ids to wewnetrzne kodowanie items/runes (builds.py)
+        exclude = ['item_ids', 'rune_ids']
+        # buildy sa w official_stats/builds/ - lista meczy ich nie pokazuje
+        list_exclude = ['items', 'runes', 'primary_tree', 'secondary_tree']
 
 class PlayerAggregatedStatsSerializer(serializers.Serializer):
     total_matches = serializers.IntegerField()
@@ -248,4 +274,13 @@ class PlayerAggregatedStatsSerializer(serializers.Serializer):
     def get_avg_vision_score(self, obj):
         if obj['total_matches'] == 0:
             return 0
-        return round((obj['total_vision_score'] / obj['total_matches']), 1)
\ No newline at end of file
+        return round((obj['total_vision_score'] / obj['total_matches']), 1)
+
+class PlayerLeaderboardEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    nick = serializers.CharField(source='player.nick', read_only=True)
+
+    class Meta:
+        model = PlayerLeaderboardEntry
+        fields = ['nick', 'role', 'year', 'games', 'wins', 'win_rate', 'kda', 'cs_per_min', 'damage_per_min',
+                  'kill_participation', 'gold_participation', 'dmg_participation', 'vision_score', 'percentiles']
+
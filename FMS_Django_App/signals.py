@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .builds import BuildEncoder
+from .caching import bump_player_generation
+from .models import PlayerOfficialStats, MatchParticipation, User
+from .rollups import apply_participation, apply_duos, duo_teammates
+
+
+@receiver(pre_save, sender=PlayerOfficialStats)
+def encode_player_build(sender, instance, **kwargs):
+    BuildEncoder().encode(instance)
+
+
+@receiver(post_save, sender=PlayerOfficialStats)
+@receiver(post_delete, sender=PlayerOfficialStats)
+def invalidate_player_stats(sender, instance, **kwargs):
+    bump_player_generation(instance.player.nick)
+
+
+@receiver(post_save, sender=MatchParticipation)
+def add_participation_to_rollups(sender, instance, created, **kwargs):
+    if created:
+        apply_participation(instance)
+        apply_duos(instance)
+
+
+@receiver(pre_delete, sender=MatchParticipation)
+def collect_duo_teammates(sender, instance, **kwargs):
+    # po usunieciu calego meczu nie byloby juz kogo szukac
+    instance._duo_teammates = duo_teammates(instance)
+
+
+@receiver(post_delete, sender=MatchParticipation)
+def remove_participation_from_rollups(sender, instance, **kwargs):
+    apply_participation(instance, sign=-1)
+    apply_duos(instance, sign=-1, teammates=getattr(instance, '_duo_teammates', None))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
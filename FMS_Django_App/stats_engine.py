@@ -0,0 +1,220 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+
+from .caching import get_player_generation
+from .models import PlayerOfficialStats
+
+"""
+In-memory columnar engine for official stats.
+
+A pro player has at most a few thousand PlayerOfficialStats rows, so they are
+loaded once per player generation into NumPy arrays (ints for the stats,
+dictionary-encoded strings, timestamps). Filters, aggregates and breakdowns are
+then answered with vectorized masks instead of a SQL aggregate per filter set.
+
+The engine is process-local. When a player is not loaded yet (cold), callers
+get None and fall back to SQL while the columns are loaded in the background,
+one load per player at a time on a small shared thread pool.
+"""
+
+MAX_LOADED_PLAYERS = 64
+
+# ladowanie w tle - ograniczona pula zamiast watku na kazde zimne zapytanie
+MAX_CONCURRENT_LOADS = 2
+
+# kolumny liczbowe -> nazwa pola w PlayerOfficialStats
+STAT_COLUMNS = {
+    'kills': 'kills',
+    'deaths': 'deaths',
+    'assists': 'assists',
+    'cs': 'cs',
+    'gold': 'gold',
+    'damage': 'damage_to_champions',
+    'team_damage': 'team_damage_to_champions',
+    'vision_score': 'vision_score',
+    'team_kills': 'team_kills',
+    'team_gold': 'team_gold',
+    'winner': 'winner',
+    'side': 'side',
+}
+
+ENCODED_COLUMNS = ('champion', 'tournament', 'team_vs', 'patch')
+
+
+class PlayerStatsColumns:
+    def __init__(self, rows):
+        rows = list(rows)
+        self.size = len(rows)
+
+        for name, field in STAT_COLUMNS.items():
+            setattr(self, name, np.fromiter((row[field] for row in rows), dtype=np.int32, count=self.size))
+
+        self.gamelength = np.fromiter(
+            (row['gamelength'].total_seconds() for row in rows), dtype=np.int32, count=self.size
+        )
+        self.timestamp = np.fromiter(
+            (row['datetime_utc'].timestamp() for row in rows), dtype=np.int64, count=self.size
+        )
+        # rok w strefie TIME_ZONE, tak jak filtr datetime_utc__year
+        self.year = np.fromiter(
+            (timezone.localtime(row['datetime_utc']).year for row in rows), dtype=np.int16, count=self.size
+        )
+        self.win = self.winner == self.side
+
+        # slownik wartosci + kody int16 dla kolumn tekstowych
+        self.values = {}
+        for column in ENCODED_COLUMNS:
+            values, codes = np.unique(np.array([row[column] for row in rows], dtype=object), return_inverse=True)
+            self.values[column] = list(values)
+            setattr(self, column, codes.astype(np.int16))
+
+    def _codes_where(self, column, predicate):
+        return [code for code, value in enumerate(self.values[column]) if predicate(value)]
+
+    def mask(self, filters):
+        """Same semantics as views.filter_official_stats."""
+        mask = np.ones(self.size, dtype=bool)
+
+        if filters.get('champion'):
+            champion = filters['champion'].lower()
+            mask &= np.isin(self.champion, self._codes_where('champion', lambda v: v.lower() == champion))
+
+        if filters.get('year'):
+            try:
+                mask &= self.year == int(filters['year'])
+            except ValueError:
+                mask[:] = False
+
+        if filters.get('tournament'):
+            mask &= np.isin(self.tournament, self._codes_where('tournament', lambda v: filters['tournament'] in v))
+
+        if filters.get('team_vs'):
+            mask &= np.isin(self.team_vs, self._codes_where('team_vs', lambda v: filters['team_vs'] in v))
+
+        return mask
+
+    def _totals(self, sums, wins, games, gamelength):
+        # ten sam ksztalt co models.official_stats_aggregates()
+        return {
+            'total_matches': int(games),
+            'total_kills': int(sums['kills']),
+            'total_deaths': int(sums['deaths']),
+            'total_assists': int(sums['assists']),
+            'total_cs': int(sums['cs']),
+            'total_gold': int(sums['gold']),
+            'total_damage': int(sums['damage']),
+            'total_team_damage': int(sums['team_damage']),
+            'total_vision_score': int(sums['vision_score']),
+            'total_team_kills': int(sums['team_kills']),
+            'total_team_gold': int(sums['team_gold']),
+            'total_gamelength': timedelta(seconds=int(gamelength)) if games else None,
+            'wins': int(wins),
+        }
+
+    def aggregate(self, filters):
+        mask = self.mask(filters)
+        sums = {name: getattr(self, name)[mask].sum(dtype=np.int64) for name in STAT_COLUMNS}
+        return self._totals(
+            sums, self.win[mask].sum(), mask.sum(), self.gamelength[mask].sum(dtype=np.int64)
+        )
+
+    def counts(self, filters, by):
+        """Returns {group value: games} for every group with at least one game."""
+        mask = self.mask(filters)
+
+        if by in ENCODED_COLUMNS:
+            games = np.bincount(getattr(self, by)[mask], minlength=len(self.values[by]))
+            return {value: int(count) for value, count in zip(self.values[by], games) if count}
+
+        labels, games = np.unique(getattr(self, by)[mask], return_counts=True)
+        return {int(label): int(count) for label, count in zip(labels, games)}
+
+    def breakdown(self, filters, by):
+        """Returns [(group value, totals)] for every group with at least one game."""
+        mask = self.mask(filters)
+
+        if by in ENCODED_COLUMNS:
+            labels = self.values[by]
+            codes = getattr(self, by)[mask]
+        else:
+            # year / side - male liczby, kodujemy na biezaco
+            labels, codes = np.unique(getattr(self, by)[mask], return_inverse=True)
+            labels = [int(label) for label in labels]
+
+        size = len(labels)
+        games = np.bincount(codes, minlength=size)
+        wins = np.bincount(codes, weights=self.win[mask], minlength=size)
+        gamelength = np.bincount(codes, weights=self.gamelength[mask], minlength=size)
+        sums = {
+            name: np.bincount(codes, weights=getattr(self, name)[mask], minlength=size)
+            for name in STAT_COLUMNS
+        }
+
+        return [
+            (labels[code], self._totals(
+                {name: column[code] for name, column in sums.items()},
+                wins[code], games[code], gamelength[code]
+            ))
+            for code in range(size) if games[code]
+        ]
+
+
+class StatsEngine:
+    def __init__(self, max_players=MAX_LOADED_PLAYERS):
+        self.max_players = max_players
+        self._players = OrderedDict()
+        # gracze, ktorych ladowanie jest w toku lub w kolejce
+        self._loading = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOADS, thread_name_prefix='stats-engine')
+
+    def get(self, nick):
+        """Returns loaded columns for the current generation, or None if the engine is cold."""
+        key = nick.lower()
+        generation = get_player_generation(nick)
+
+        with self._lock:
+            entry = self._players.get(key)
+            if entry and entry[0] == generation:
+                self._players.move_to_end(key)
+                return entry[1]
+
+            # jedno ladowanie na gracza - kolejne zimne zapytania ida do SQL, nie czekaja
+            if key in self._loading:
+                return None
+            self._loading.add(key)
+
+        self._executor.submit(self._load, nick, generation)
+        return None
+
+    def load(self, nick, generation):
+        rows = PlayerOfficialStats.objects.filter(player__nick__iexact=nick).values(
+            'datetime_utc', 'gamelength', *STAT_COLUMNS.values(), *ENCODED_COLUMNS
+        )
+        columns = PlayerStatsColumns(rows)
+
+        with self._lock:
+            self._players[nick.lower()] = (generation, columns)
+            self._players.move_to_end(nick.lower())
+            while len(self._players) > self.max_players:
+                self._players.popitem(last=False)
+
+        return columns
+
+    def _load(self, nick, generation):
+        try:
+            self.load(nick, generation)
+        finally:
+            with self._lock:
+                self._loading.discard(nick.lower())
+            # watek ma wlasne polaczenie do bazy
+            connection.close()
+
+
+engine = StatsEngine()
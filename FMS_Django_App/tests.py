@@ -1,3 +1,1318 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unittest import mock
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, models
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_redis.exceptions import ConnectionInterrupted
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import User, Player, SummonerName, Match, MatchParticipation, MatchRoster, MatchTimelineSnapshot, \
+    PlayerOfficialStats, PlayerLeaderboardEntry, Item, Rune, Champion, SummonerChampionStats, DuoStats, DERIVED_METRICS, official_stats_aggregates
+from .async_views import AsyncOfficialMatchesView, AsyncAggregatedPlayerStatsView, AsyncPlayerProfileView, \
+    AsyncLiveEventsView
+from .livegames import events_since
+from .renderers import ORJSONRenderer
+from .riot import RateBudget, RiotClient, RIOT_MAX_RETRIES
+from .serializers import PlayerOfficialStatsSerializer
+from .views import ExportView, ExportOfficialStatsView
+from .exports import parquet_stream
+from .ingest import OfficialStatsIngest, INGEST_FIELDS, RowError, _parse_value
+from .rollups import rebuild_champion_stats, rebuild_duo_stats
+from .rosters import RosterBuilder, lane_opponent, lane_matchups
+from .leaderboards import refresh_leaderboards
+from .partitioning import convert_to_partitioned, ensure_partitions, archive_partition, restore_partition, \
+    partition_name, default_partition_name, is_partitioned
+from .stats_engine import engine as stats_engine, StatsEngine
+from .views import filter_official_stats, facet_counts
+from .caching import get_player_generation
+from . import builds
+from .builds import BuildEncoder, decode
+from .pandascore import _cache_key, ttl_for, sync_team, aclose_session, PANDASCORE_STATUS_TTL, \
+    PANDASCORE_LOCK_TIMEOUT
+
 
 # Create your tests here.
+
+def official_stats_row(player, i, **fields):
+    """Fields of the i-th PlayerOfficialStats row of player, varied and deterministic; fields override them."""
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    return {
+        'game_id': f'LEC/{player.nick}_{i}', 'tournament': ['LEC 2024 Summer', 'LEC 2025 Winter'][i % 2],
+        'datetime_utc': start + timedelta(days=30 * i), 'patch': f'14.{i % 3}',
+        'gamelength': timedelta(seconds=1500 + 60 * i), 'winner': 1 + i % 2, 'side': 1 + i % 3 % 2,
+        'team_vs': ['G2 Esports', 'Fnatic', 'Team Heretics'][i % 3], 'player': player, 'role': 'Mid',
+        'champion': ['Ahri', 'Azir', 'Sylas', 'Orianna'][i % 4], 'kills': i % 7, 'deaths': i % 4,
+        'assists': 3 + i % 5, 'cs': 220 + 7 * i, 'gold': 11000 + 150 * i, 'damage_to_champions': 15000 + 900 * i,
+        'team_damage_to_champions': 70000 + 500 * i, 'vision_score': 30 + i, 'team_kills': 12 + i % 9,
+        'team_gold': 55000 + 300 * i, 'items': [], 'primary_tree': 'Domination', 'secondary_tree': 'Sorcery',
+        'runes': [], **fields,
+    }
+
+
+def create_official_stats(player, count, **fields):
+    return [PlayerOfficialStats.objects.create(**official_stats_row(player, i, **fields)) for i in range(count)]
+
+
+class ListMatchesViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(
+            first_name='Rasmus', last_name='Winther', nick='Caps', lane='Middle', champion='Ahri', team_role='Player'
+        )
+        summoners = [
+            SummonerName.objects.create(player=cls.player, riot_id=f'Caps{i}#EUW', puuid=f'puuid-{i}')
+            for i in range(3)
+        ]
+
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i in range(30):
+            match = Match.objects.create(
+                match_id=f'EUW1_{i}', game_duration=1800 + i, game_start=start + timedelta(hours=i)
+            )
+            MatchParticipation.objects.create(
+                match=match, summoner=summoners[i % 3], champion=['Ahri', 'Azir', 'Sylas'][i % 3],
+                kills=i % 7, deaths=i % 4, assists=i % 9, win=i % 2 == 0, lane='MIDDLE',
+                game_start=match.game_start, game_duration=match.game_duration
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('player_matches', kwargs={'nick': 'Caps'})
+
+    def query_count(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.assertEqual(self.query_count(1), self.query_count(20))
+
+    def test_query_count(self):
+        # count, strona, Match z rosterem po PK dla strony, klatki timeline, podsumowanie
+        with self.assertNumQueries(5):
+            self.client.get(self.url, {'page_size': 20})
+
+    def test_sparse_fields_skip_timeline_queries(self):
+        # bez early_diffs nie ma rosteru ani klatek timeline: count, strona, Match po PK, podsumowanie
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'page_size': 20, 'fields': 'match,champion,win'})
+        self.assertEqual(list(response.data['results'][0]), ['match', 'champion', 'win'])
+
+    def test_ranks_are_compact_by_default(self):
+        url = reverse('player_ranks', kwargs={'nick': 'Caps'})
+        self.assertNotIn('player', self.client.get(url).data[0])
+        self.assertEqual(self.client.get(url, {'fields': 'all'}).data[0]['player']['nick'], 'Caps')
+        self.assertEqual(list(self.client.get(url, {'exclude': 'puuid,player'}).data[0]),
+                         ['riot_id', 'tier', 'rank', 'league_points'])
+
+    def test_results_are_newest_first(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(
+            [row['match']['match_id'] for row in response.data['results']],
+            ['EUW1_29', 'EUW1_28', 'EUW1_27']
+        )
+        self.assertEqual(response.data['results'][0]['summoner'], 'Caps2#EUW')
+
+    def test_summary(self):
+        response = self.client.get(self.url, {'summary_games': 10})
+        summary = response.data['summary']
+        self.assertEqual(summary['games'], 10)
+        self.assertEqual(summary['wins'], 5)
+        self.assertEqual(summary['win_rate'], 50.0)
+        self.assertEqual(sum(champion['games'] for champion in summary['champion_pool']), 10)
+
+    def test_unknown_player_returns_404(self):
+        response = self.client.get(reverse('player_matches', kwargs={'nick': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_player_without_matches(self):
+        Player.objects.create(first_name='a', last_name='b', nick='Empty', lane='Top', champion='Gnar', team_role='Player')
+        response = self.client.get(reverse('player_matches', kwargs={'nick': 'Empty'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(response.data['summary']['games'], 0)
+
+    def test_early_diffs_against_lane_opponent(self):
+        match = Match.objects.get(match_id='EUW1_29')
+        # Caps2 w slocie 2 (MIDDLE blue), przeciwnik w slocie 7 (MIDDLE red)
+        MatchRoster.objects.create(
+            match=match, puuids=[f'x{slot}' if slot != 2 else 'puuid-2' for slot in range(10)],
+            champion_ids=list(range(1, 11)), positions=[1, 2, 3, 4, 5] * 2, kills=[0] * 10, deaths=[0] * 10,
+            assists=[0] * 10, blue_win=False
+        )
+        MatchTimelineSnapshot.objects.create(
+            match=match, minute=10, gold=[3500] * 10, cs=[80] * 10, xp=[4000] * 10
+        )
+        MatchTimelineSnapshot.objects.create(
+            match=match, minute=15, gold=[5000, 0, 6200, 0, 0, 0, 0, 5400, 0, 0],
+            cs=[0, 0, 130, 0, 0, 0, 0, 121, 0, 0], xp=[0, 0, 7000, 0, 0, 0, 0, 7300, 0, 0]
+        )
+
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.data['results'][0]['early_diffs'], {
+            '10': {'gold': 0, 'cs': 0, 'xp': 0},
+            '15': {'gold': 800, 'cs': 9, 'xp': -300},
+        })
+        self.assertIsNone(response.data['results'][1]['early_diffs'])
+
+
+class PlayerProfileViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        player = Player.objects.create(nick='Tester')
+        summoner = SummonerName.objects.create(player=player, riot_id='Tester#EUW', puuid='puuid-1', tier='GOLD')
+        for i in range(3):
+            match = Match.objects.create(match_id=f'EUW1_{i}', game_duration=1800)
+            MatchParticipation.objects.create(
+                match=match, summoner=summoner, champion='Ahri', kills=5, deaths=2, assists=7,
+                win=bool(i % 2), lane='MIDDLE', game_start=match.game_start, game_duration=1800,
+            )
+
+    def test_bundle_is_served_from_one_cache_entry(self):
+        url = reverse('player_profile', args=['Tester'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data), ['player', 'ranks', 'matches', 'official_stats', 'options'])
+        self.assertEqual(data['ranks'][0]['riot_id'], 'Tester#EUW')
+        self.assertEqual(data['matches']['count'], 3)
+        self.assertEqual(data['matches']['summary']['games'], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).content, response.content)
+        self.assertEqual(len(queries), 0)
+
+    def test_cache_hit_is_served_precompressed(self):
+        url = reverse('player_profile', args=['Tester'])
+        plain = self.client.get(url).content
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    async def test_async_profile_matches_drf_view(self):
+        url = reverse('player_profile', args=['Tester'])
+        params = {'summary_games': 2}
+        view = AsyncPlayerProfileView.as_view()
+
+        # miss (widok DRF w watku), potem trafienie z cache na petli
+        miss = await view(AsyncRequestFactory().get(url, params), nick='Tester')
+        hit = await view(AsyncRequestFactory().get(url, params), nick='Tester')
+        self.assertEqual((miss.status_code, hit.status_code), (200, 200))
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(json.loads(hit.content)['matches']['summary']['games'], 2)
+
+        drf = await sync_to_async(self.client.get)(url, params)
+        self.assertEqual(drf.content, hit.content)
+
+    def test_include_selects_sections(self):
+        response = self.client.get(reverse('player_profile', args=['Tester']), {'include': 'ranks,player'})
+        self.assertEqual(list(response.json()), ['player', 'ranks'])
+
+    def test_unknown_player(self):
+        self.assertEqual(self.client.get(reverse('player_profile', args=['Nobody'])).status_code, 404)
+
+
+class PandaScoreStub(BaseHTTPRequestHandler):
+    """Local stand-in for api.pandascore.co; the test sets payload/status and counts the hits."""
+    payload = []
+    status = 200
+    delay = 0
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(self.delay)
+        body = json.dumps(self.payload).encode()
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OfficialMatchesProxyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PandaScoreStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(PANDASCORE_BASE_URL=f'http://127.0.0.1:{cls.server.server_port}')
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        PandaScoreStub.payload = [{'id': 1, 'status': 'finished'}]
+        PandaScoreStub.status = 200
+        PandaScoreStub.delay = 0
+        PandaScoreStub.hits = 0
+        self.client = APIClient()
+        self.url = reverse('get_official_matches')
+
+    def get(self):
+        return self.client.get(self.url, {'team_id': 1, 'status': 'past'})
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data, [{'id': 1, 'status': 'finished'}])
+        self.assertEqual(PandaScoreStub.hits, 1)
+
+    def test_running_matches_expire_quickly(self):
+        self.assertEqual(ttl_for([{'status': 'finished'}, {'status': 'running'}]), PANDASCORE_STATUS_TTL['running'])
+        self.assertEqual(ttl_for([{'status': 'finished'}]), PANDASCORE_STATUS_TTL['finished'])
+
+    def test_upstream_error_serves_stale_data(self):
+        self.get()
+        # wpis przestaje byc swiezy, zostaje kopia stale
+        key = _cache_key('/lol/matches', {
+            'filter[opponent_id]': '1', 'filter[status]': 'past', 'page[number]': 1, 'page[size]': 5
+        })
+        entry = cache.get(key)
+        entry['expires_at'] = 0
+        cache.set(key, entry)
+
+        PandaScoreStub.status = 503
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(PandaScoreStub.hits, 2)
+
+    def test_upstream_error_without_cache(self):
+        PandaScoreStub.status = 503
+        self.assertEqual(self.get().status_code, 502)
+
+    def test_unavailable_cache_fetches_without_waiting(self):
+        async def async_get():
+            try:
+                return await AsyncOfficialMatchesView.as_view()(
+                    AsyncRequestFactory().get(self.url, {'team_id': 1, 'status': 'past'})
+                )
+            finally:
+                await aclose_session()
+
+        # cache z IGNORE_EXCEPTIONS przy awarii Redis: get() -> default, add() -> None
+        unavailable = mock.patch.object(cache, 'get', side_effect=lambda key, default=None, version=None: default)
+        with unavailable, mock.patch.object(cache, 'add', return_value=None):
+            started = time.monotonic()
+            responses = [self.get(), self.get(), async_to_sync(async_get)()]
+
+        self.assertLess(time.monotonic() - started, PANDASCORE_LOCK_TIMEOUT)
+        self.assertEqual([response['X-Cache'] for response in responses], ['MISS'] * 3)
+        self.assertEqual(PandaScoreStub.hits, 3)
+
+    def test_concurrent_misses_are_coalesced(self):
+        PandaScoreStub.delay = 0.3
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.get())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(PandaScoreStub.hits, 1)
+
+    async def test_async_view_coalesces_concurrent_misses(self):
+        PandaScoreStub.delay = 0.3
+        view = AsyncOfficialMatchesView.as_view()
+        factory = AsyncRequestFactory()
+
+        try:
+            responses = await asyncio.gather(*(
+                view(factory.get(self.url, {'team_id': 1, 'status': 'past'})) for _ in range(10)
+            ))
+        finally:
+            # sesja aiohttp nalezy do petli tego testu
+            await aclose_session()
+
+        self.assertEqual([response.status_code for response in responses], [200] * 10)
+        self.assertEqual(json.loads(responses[0].content), [{'id': 1, 'status': 'finished'}])
+        self.assertEqual(PandaScoreStub.hits, 1)
+
+    def test_mirrored_team_is_served_from_db_with_cursor(self):
+        PandaScoreStub.payload = [
+            {'id': match_id, 'status': 'finished', 'scheduled_at': f'2025-03-{day:02d}T17:00:00Z',
+             'opponents': [{'opponent': {'id': 1}}, {'opponent': {'id': 2}}]}
+            for match_id, day in ((10, 1), (11, 2), (12, 3), (13, 3), (14, 5), (15, 6), (16, 7))
+        ]
+        sync_team(1, endpoints=('past',))
+        hits = PandaScoreStub.hits
+
+        with override_settings(PANDASCORE_TEAM_IDS=[1]):
+            first = self.client.get(self.url, {'team_id': 1, 'status': 'finished'})
+            second = self.client.get(self.url, {'team_id': 1, 'status': 'finished', 'cursor': first['X-Next-Cursor']})
+            # podrobiony kursor = pierwsza strona, nie 500
+            forged = base64.urlsafe_b64encode(b'not a date|11').decode()
+            forged = self.client.get(self.url, {'team_id': 1, 'status': 'finished', 'cursor': forged})
+
+        self.assertEqual([match['id'] for match in first.data], [16, 15, 14, 13, 12])
+        self.assertEqual([match['id'] for match in second.data], [11, 10])
+        self.assertNotIn('X-Next-Cursor', second)
+        self.assertEqual(forged.data, first.data)
+        self.assertEqual(PandaScoreStub.hits, hits)
+
+
+
+class SpectatorStub(BaseHTTPRequestHandler):
+    """Local stand-in for spectator-v5; games maps puuid -> active game, other accounts get 404."""
+    games = {}
+
+    def do_GET(self):
+        game = self.games.get(self.path.rsplit('/', 1)[-1])
+        body = json.dumps(game or {'status': {'status_code': 404}}).encode()
+        self.send_response(200 if game else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@mock.patch.dict(os.environ, {'RIOT_API_KEY': 'test'})
+class LiveGamesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), SpectatorStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(RIOT_PLATFORM_URL=f'http://127.0.0.1:{cls.server.server_port}')
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        player = Player.objects.create(nick='Tester')
+        SummonerName.objects.create(player=player, riot_id='Tester#EUW', puuid='puuid-1')
+        SummonerName.objects.create(player=player, riot_id='Smurf#EUW', puuid='puuid-2')
+        SpectatorStub.games = {'puuid-1': {
+            'gameId': 7, 'gameStartTime': 1735732800000, 'gameQueueConfigId': 420,
+            'participants': [{'puuid': 'puuid-1', 'championId': 103}],
+        }}
+
+    def track(self):
+        call_command('track_live_games', stdout=io.StringIO())
+
+    def test_started_and_finished_events(self):
+        self.track()
+        # ta sama gra w kolejnym obrocie nie daje nowego zdarzenia
+        self.track()
+        SpectatorStub.games = {}
+        self.track()
+
+        events, _ = events_since(0)
+        self.assertEqual([(event['type'], event['nick'], event['game_id']) for event in events],
+                         [('started', 'Tester', 7), ('finished', 'Tester', 7)])
+        self.assertEqual(events[0]['champion_id'], 103)
+
+    def test_live_snapshot_and_event_stream(self):
+        self.track()
+
+        response = APIClient().get(reverse('live_games'))
+        self.assertEqual([game['riot_id'] for game in response.data], ['Tester#EUW'])
+
+        # pod WSGI zalegle zdarzenia i koniec odpowiedzi, EventSource wznawia po retry
+        response = self.client.get(reverse('live_events'), HTTP_LAST_EVENT_ID='0', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('retry: 3000\n\nid: 1\nevent: started\n'))
+        self.assertTrue(body.endswith('id: 1\n\n'))
+
+        # nowy klient dostaje tylko aktualne id
+        self.assertEqual(self.client.get(reverse('live_events')).content, b'retry: 3000\n\nid: 1\n\n')
+
+    async def test_async_event_stream(self):
+        await sync_to_async(self.track)()
+
+        response = await AsyncLiveEventsView.as_view()(AsyncRequestFactory().get('/', headers={'Last-Event-ID': '0'}))
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            self.assertTrue((await anext(stream)).startswith(b'id: 1\nevent: started\n'))
+        finally:
+            await stream.aclose()
+
+    @mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'live': '2/min'})
+    def test_reconnects_are_throttled(self):
+        url = reverse('live_events')
+        self.assertEqual([self.client.get(url).status_code for _ in range(3)], [200, 200, 429])
+
+
+class RiotClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_refused_request_does_not_use_the_budget(self):
+        budget = RateBudget(limits=((2, 10), (3, 3600)), prefix='test_budget')
+        now = 100.0
+        self.assertEqual([budget.try_acquire(now) for _ in range(2)], [0, 0])
+
+        # kolejne odmowy w oknie 10 s nie zjadaja limitu godzinowego
+        for _ in range(5):
+            self.assertEqual(budget.try_acquire(now), 10)
+        self.assertEqual(budget.try_acquire(now + 10), 0)
+        self.assertEqual(budget.try_acquire(now + 20), 3600 - (now + 20) % 3600)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'None'},
+        'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_budget_without_usable_cache_paces_in_process(self):
+        # workflow bez Redis: LOCATION bez schematu redis://
+        budget = RateBudget(limits=((2, 10),), prefix='test_budget')
+        now = 100.0
+        self.assertEqual([budget.try_acquire(now) for _ in range(3)], [0, 0, 10])
+        self.assertEqual(budget.try_acquire(now + 10), 0)
+
+    @mock.patch('FMS_Django_App.riot.time.sleep')
+    def test_raises_when_retries_run_out(self, sleep):
+        client = RiotClient('test', budget=RateBudget(limits=()))
+        response = requests.Response()
+        response.status_code = 429
+        response.headers['Retry-After'] = '2'
+        response.raw = io.BytesIO()
+        client.session.get = mock.Mock(return_value=response)
+
+        with self.assertRaises(requests.HTTPError):
+            client.get('https://euw1.api.riotgames.com/lol/status/v4/platform-data')
+        self.assertEqual(client.session.get.call_count, RIOT_MAX_RETRIES)
+        # po ostatniej probie juz nie czekamy
+        self.assertEqual(sleep.call_args_list, [mock.call(2)] * (RIOT_MAX_RETRIES - 1))
+
+
+class FetchMatchesTests(TestCase):
+    def riot_response(self, data):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(data).encode()
+        return response
+
+    def test_request_error_skips_only_that_account(self):
+        player = Player.objects.create(nick='Tester')
+        SummonerName.objects.create(player=player, riot_id='Slow#EUW', puuid='puuid-slow')
+        fast = SummonerName.objects.create(player=player, riot_id='Fast#EUW', puuid='puuid-fast')
+
+        def get(url):
+            if 'puuid-slow' in url:
+                raise requests.Timeout('read timed out')
+            if '/league/' in url:
+                return self.riot_response([{'queueType': 'RANKED_SOLO_5x5', 'tier': 'GOLD', 'rank': 'II', 'leaguePoints': 7}])
+            return self.riot_response([])
+
+        stderr = io.StringIO()
+        with mock.patch.object(RiotClient, 'get', side_effect=get):
+            call_command('fetch_matches', stdout=io.StringIO(), stderr=stderr)
+
+        self.assertIn('read timed out', stderr.getvalue())
+        fast.refresh_from_db()
+        self.assertEqual((fast.tier, fast.rank, fast.league_points), ('GOLD', 'II', 7))
+
+
+class ORJSONRendererTests(TestCase):
+    def test_same_values_as_drf(self):
+        data = {'kda': 3.33, 'small': 1e-05, 'when': datetime(2025, 1, 1, tzinfo=timezone.utc), 'text': 'a\u2028b'}
+        body = ORJSONRenderer().render(data)
+        self.assertEqual(json.loads(body), json.loads(JSONRenderer().render(data)))
+        self.assertIn(b'\\u2028', body)
+
+    def test_integers_above_64_bits_use_drf(self):
+        data = {'big': 2 ** 64}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class JWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Tester', 'tester@example.com', 'S3cure-pass!')
+        self.client = APIClient()
+        response = self.client.post(reverse('login'), {'nick': 'Tester', 'password': 'S3cure-pass!'})
+        self.token = response.cookies['access_token'].value
+
+    def me(self):
+        return self.client.get(reverse('me'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_cached_user_needs_no_query(self):
+        self.assertEqual(self.me().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me().data['nick'], 'Tester')
+
+    def test_logout_revokes_token(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.client.post(reverse('logout'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(self.me().status_code, 403)
+
+    def test_denylist_does_not_fail_open(self):
+        # IGNORE_EXCEPTIONS zwrociloby {} - odwolany token by przeszedl
+        strict_cache = mock.Mock()
+        strict_cache.get_many.side_effect = ConnectionInterrupted(connection=None)
+        with mock.patch('FMS_Django_App.authentication._strict_cache', return_value=strict_cache):
+            self.assertEqual(self.me().status_code, 503)
+
+    def test_user_edit_invalidates_cached_user(self):
+        self.assertEqual(self.me().data['role'], 'USER')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'EDITOR'
+            self.user.save()
+        self.assertEqual(self.me().data['role'], 'EDITOR')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.me().status_code, 403)
+
+
+class DerivedMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        create_official_stats(cls.player, 12)
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.url = reverse('official_player_match', kwargs={'nick': 'Caps'})
+
+    def get(self, **params):
+        return self.client.get(self.url, {'page_size': 50, **params}).json()
+
+    def test_fallback_matches_annotation(self):
+        annotated = {stats.id: stats for stats in PlayerOfficialStats.objects.with_derived_metrics()}
+        for stats in PlayerOfficialStats.objects.all():
+            plain = PlayerOfficialStatsSerializer(stats).data
+            expected = PlayerOfficialStatsSerializer(annotated[stats.id]).data
+            for metric in DERIVED_METRICS:
+                self.assertEqual(plain[metric], expected[metric], metric)
+
+    def test_perfect_kda_is_integer(self):
+        perfect = [row for row in self.get()['matches']['results'] if row['deaths'] == 0]
+        self.assertTrue(perfect)
+        for row in perfect:
+            self.assertIsInstance(row['kda'], int)
+            self.assertEqual(row['kda'], row['kills'] + row['assists'])
+
+    def test_ordering_by_metric(self):
+        kdas = [row['kda'] for row in self.get(ordering='-kda')['matches']['results']]
+        self.assertEqual(kdas, sorted(kdas, reverse=True))
+
+    def test_metric_filters(self):
+        data = self.get(min_kda=3, max_cs_per_min=9)
+        rows = data['matches']['results']
+        self.assertTrue(rows)
+        self.assertTrue(all(row['kda'] >= 3 and row['cs_per_min'] <= 9 for row in rows))
+        # agregat liczony z tych samych gier
+        self.assertEqual(data['aggregated_stats']['total_matches'], len(rows))
+
+        self.assertEqual(self.client.get(self.url, {'min_kda': 'abc'}).status_code, 400)
+
+    def test_invalid_year(self):
+        self.assertEqual(self.client.get(self.url, {'year': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('leaderboards'), {'year': 'abc'}).status_code, 400)
+
+    async def test_invalid_year_async(self):
+        request = AsyncRequestFactory().get(self.url, {'year': 'abc'})
+        response = await AsyncAggregatedPlayerStatsView.as_view()(request, nick='Caps')
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'anon': '2/min'})
+    async def test_async_cache_hits_are_throttled(self):
+        await cache.aclear()
+        view = AsyncAggregatedPlayerStatsView.as_view()
+
+        # miss (widok DRF), trafienie w cache, trzecie ponad limit
+        responses = [await view(AsyncRequestFactory().get(self.url), nick='Caps') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertIn('Retry-After', responses[2])
+
+
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = {}
+        # nick -> (role, gry w 2024, kills na gre przy 1 smierci i 0 asyst = KDA)
+        for nick, role, games, kills in (
+            ('Caps', 'Mid', 3, 10), ('Humanoid', 'Mid', 3, 4), ('Larssen', 'Mid', 3, 6),
+            ('Vetheo', 'Mid', 4, 6), ('Rookie', 'Mid', 2, 20), ('BrokenBlade', 'Top', 3, 1),
+        ):
+            cls.players[nick] = player = Player.objects.create(nick=nick)
+            create_official_stats(player, games, role=role, kills=kills, deaths=1, assists=0)
+
+        # 2025 - osobna grupa
+        PlayerOfficialStats.objects.create(**official_stats_row(
+            cls.players['Caps'], 9, kills=2, deaths=1, assists=0, datetime_utc=datetime(2025, 2, 1, tzinfo=timezone.utc)
+        ))
+
+    def setUp(self):
+        refresh_leaderboards()
+
+    def entry(self, nick, year=2024):
+        return PlayerLeaderboardEntry.objects.get(player=self.players[nick], year=year)
+
+    def kda_percentiles(self):
+        return {
+            entry.player.nick: entry.percentiles.get('kda')
+            for entry in PlayerLeaderboardEntry.objects.filter(role='Mid', year=2024).select_related('player')
+        }
+
+    def test_percentiles_per_role_and_year(self):
+        # remis (Larssen, Vetheo) dostaje ten sam percentyl, Rookie ponizej LEADERBOARD_MIN_GAMES
+        self.assertEqual(self.kda_percentiles(), {
+            'Humanoid': 0.0, 'Larssen': 33.3, 'Vetheo': 33.3, 'Caps': 100.0, 'Rookie': None,
+        })
+        self.assertEqual(self.entry('Rookie').percentiles, {})
+        self.assertEqual(self.entry('BrokenBlade').percentiles['kda'], 100.0)
+        self.assertEqual(self.entry('Caps', 2025).games, 1)
+
+    def test_view_ordering_and_filters(self):
+        url = reverse('leaderboards')
+        results = self.client.get(url, {'role': 'mid', 'year': 2024, 'metric': 'kda'}).json()['results']
+        # KDA malejaco, przy remisie wiecej gier; Rookie bez minimum gier
+        self.assertEqual([row['nick'] for row in results], ['Caps', 'Vetheo', 'Larssen', 'Humanoid'])
+        self.assertEqual(results[0]['kda'], 10.0)
+
+        results = self.client.get(url, {'role': 'Top'}).json()['results']
+        self.assertEqual([(row['nick'], row['year']) for row in results], [('BrokenBlade', 2024)])
+
+        # nieznana metryka = kda
+        results = self.client.get(url, {'year': 2024, 'metric': 'nope'}).json()['results']
+        self.assertEqual(results[0]['nick'], 'Caps')
+
+    def test_incremental_refresh_touches_only_given_groups(self):
+        untouched = {self.entry('Caps').pk, self.entry('Caps', 2025).pk, self.entry('BrokenBlade').pk}
+
+        PlayerOfficialStats.objects.create(**official_stats_row(
+            self.players['Humanoid'], 3, role='Mid', kills=40, deaths=1, assists=0
+        ))
+        self.assertEqual(refresh_leaderboards(player_ids=[self.players['Humanoid'].id], years=[2024]), 1)
+
+        # (4 * 3 + 40) / 4 = 13 - Humanoid na gorze, percentyle calej grupy przeliczone
+        self.assertEqual(self.entry('Humanoid').kda, 13.0)
+        self.assertEqual(self.kda_percentiles(), {
+            'Larssen': 0.0, 'Vetheo': 0.0, 'Caps': 66.7, 'Humanoid': 100.0, 'Rookie': None,
+        })
+        self.assertEqual(
+            set(PlayerLeaderboardEntry.objects.filter(pk__in=untouched).values_list('pk', flat=True)), untouched
+        )
+
+    def test_player_without_games_drops_out(self):
+        PlayerOfficialStats.objects.filter(player=self.players['Larssen']).delete()
+        refresh_leaderboards(player_ids=[self.players['Larssen'].id])
+
+        self.assertFalse(PlayerLeaderboardEntry.objects.filter(player=self.players['Larssen']).exists())
+        self.assertEqual(self.kda_percentiles(), {'Humanoid': 0.0, 'Vetheo': 50.0, 'Caps': 100.0, 'Rookie': None})
+
+
+class PlayerStatsFacetsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        create_official_stats(cls.player, 24)
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.url = reverse('player_stats_facets', kwargs={'nick': 'Caps'})
+
+    def facets(self, warm, **params):
+        caches['responses'].clear()
+        columns = stats_engine.load('Caps', get_player_generation('Caps')) if warm else None
+        with mock.patch.object(stats_engine, 'get', return_value=columns):
+            return self.client.get(self.url, params).json()
+
+    def test_counts_under_other_filters(self):
+        data = self.facets(False, champion='Ahri', year=2025)
+        stats = PlayerOfficialStats.objects.filter(player=self.player)
+
+        self.assertEqual(data['total_matches'], stats.filter(champion='Ahri', datetime_utc__year=2025).count())
+        # facet championow ignoruje filtr championa
+        self.assertEqual(
+            {row['value']: row['count'] for row in data['champions']},
+            {champion: stats.filter(champion=champion, datetime_utc__year=2025).count()
+             for champion in stats.filter(datetime_utc__year=2025).values_list('champion', flat=True)}
+        )
+
+    def test_engine_matches_sql(self):
+        for params in ({}, {'champion': 'azir'}, {'year': 2025, 'team_vs': 'Fnatic'}, {'tournament': 'Summer'}):
+            self.assertEqual(self.facets(True, **params), self.facets(False, **params), params)
+
+    def test_sql_counts_use_one_query(self):
+        with mock.patch.object(stats_engine, 'get', return_value=None), self.assertNumQueries(1):
+            counts = facet_counts('Caps', {'champion': 'Ahri', 'year': 2025, 'tournament': None, 'team_vs': None})
+
+        stats = PlayerOfficialStats.objects.filter(player=self.player, datetime_utc__year=2025)
+        self.assertEqual(sum(counts['champion'].values()), stats.count())
+        self.assertEqual(sum(counts['team_vs'].values()), stats.filter(champion='Ahri').count())
+
+
+class PlayerStatsBreakdownTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        create_official_stats(cls.player, 30)
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.url = reverse('player_stats_breakdown', kwargs={'nick': 'Caps'})
+
+    def breakdown(self, warm, **params):
+        caches['responses'].clear()
+        columns = stats_engine.load('Caps', get_player_generation('Caps')) if warm else None
+        with mock.patch.object(stats_engine, 'get', return_value=columns):
+            return self.client.get(self.url, params)
+
+    def test_sorted_and_limited_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.breakdown(False, by='team_vs', sort='-win_rate', limit=2)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIn('LIMIT 2', queries[-1]['sql'])
+
+        rates = [row['win_rate'] for row in self.breakdown(False, by='patch', sort='win_rate').json()['results']]
+        self.assertEqual(rates, sorted(rates))
+
+    def test_engine_matches_sql(self):
+        for params in (
+            {'by': 'champion'}, {'by': 'team_vs', 'sort': '-avg_kda', 'limit': 2},
+            {'by': 'year', 'sort': 'avg_cs_per_min'}, {'by': 'side', 'sort': '-avg_dmg_participation'},
+            {'by': 'tournament', 'sort': 'total_kills', 'champion': 'Ahri'},
+        ):
+            self.assertEqual(self.breakdown(True, **params).json(), self.breakdown(False, **params).json(), params)
+
+    def test_invalid_limit(self):
+        for limit in ('abc', '-1'):
+            self.assertEqual(self.breakdown(False, limit=limit).status_code, 400)
+
+
+class ComparePlayersStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.caps = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        cls.humanoid = Player.objects.create(nick='Humanoid', lane='Middle', champion='Azir', team_role='Player')
+        create_official_stats(cls.caps, 6)
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.url = reverse('compare_players_stats')
+
+    def test_new_matches_invalidate_comparison(self):
+        results = self.client.get(self.url, {'players': 'caps,Humanoid'}).json()['results']
+        self.assertEqual([row['nick'] for row in results], ['Caps', 'Humanoid'])
+        self.assertEqual(results[1]['aggregated_stats']['total_matches'], 0)
+
+        create_official_stats(self.humanoid, 2)
+        results = self.client.get(self.url, {'players': 'caps,Humanoid'}).json()['results']
+        self.assertEqual(results[1]['aggregated_stats']['total_matches'], 2)
+
+    def test_unknown_players(self):
+        response = self.client.get(self.url, {'players': 'Caps,Nobody'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['unknown_players'], ['Nobody'])
+
+
+class PlayerStatsTrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        cls.stats = create_official_stats(cls.player, 12)
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.url = reverse('player_stats_trend', kwargs={'nick': 'Caps'})
+
+    def rolling(self, **params):
+        return self.client.get(self.url, params).json()['rolling']
+
+    def test_last_games_keep_full_window(self):
+        rolling = self.rolling(window=5, last=3)
+        self.assertEqual([row['game_id'] for row in rolling], [stats.game_id for stats in self.stats[-3:]])
+        # okno obejmuje tez gry sprzed wycinka
+        self.assertTrue(all(row['games'] == 5 for row in rolling))
+
+    def test_last_is_clamped(self):
+        self.assertEqual(len(self.rolling(last=0)), 1)
+        self.assertEqual(len(self.rolling(last=-4)), 1)
+        self.assertEqual(len(self.rolling(last=10000)), 12)
+
+
+class StatsEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        create_official_stats(cls.player, 40)
+
+    def test_aggregate_matches_sql(self):
+        columns = stats_engine.load('Caps', get_player_generation('Caps'))
+        stats = PlayerOfficialStats.objects.filter(player=self.player)
+
+        for filters in (
+            {}, {'champion': 'ahri'}, {'year': '2025'}, {'tournament': 'Winter', 'team_vs': 'Fnatic'},
+            {'champion': 'Nobody'},
+        ):
+            filters = {'champion': None, 'year': None, 'tournament': None, 'team_vs': None, **filters}
+            expected = filter_official_stats(stats, filters).aggregate(**official_stats_aggregates())
+            # SUM() bez wierszy to NULL, silnik zwraca 0
+            expected = {key: 0 if value is None and key != 'total_gamelength' else value for key, value in expected.items()}
+            self.assertEqual(columns.aggregate(filters), expected, filters)
+
+    def test_concurrent_cold_requests_load_once(self):
+        engine = StatsEngine()
+        release = threading.Event()
+
+        def load(nick, generation):
+            release.wait(5)
+
+        with mock.patch.object(engine, 'load', side_effect=load) as loaded:
+            for _ in range(5):
+                self.assertIsNone(engine.get('Caps'))
+            release.set()
+            engine._executor.shutdown(wait=True)
+
+        self.assertEqual(loaded.call_count, 1)
+
+
+class BuildEncodingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+
+    def test_known_ids_are_shared_after_commit(self):
+        # ids z wycofanej po tescie transakcji nie moga zostac we wspolnym slowniku
+        self.addCleanup(lambda: [ids.clear() for ids in builds._known_ids.values()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats, = create_official_stats(self.player, 1, items=['Zhonya', 'Luden'], runes=['Electrocute'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(BuildEncoder().ids_for(Item, ['Luden', 'Zhonya'])), stats.item_ids)
+
+    def test_bulk_paths_encode_builds(self):
+        PlayerOfficialStats.objects.bulk_create([
+            PlayerOfficialStats(**official_stats_row(self.player, i, items=['Luden'], runes=['Electrocute']))
+            for i in range(2)
+        ])
+        self.assertEqual(
+            decode(Item, PlayerOfficialStats.objects.values_list('item_ids', flat=True)), [['Luden'], ['Luden']]
+        )
+
+        stats = PlayerOfficialStats.objects.first()
+        stats.items = ['Zhonya', 'Luden']
+        PlayerOfficialStats.objects.bulk_update([stats], ['items'])
+        stats.refresh_from_db()
+        self.assertEqual(sorted(decode(Item, [stats.item_ids])[0]), ['Luden', 'Zhonya'])
+
+        PlayerOfficialStats.objects.filter(id=stats.id).update(items=['Zhonya'], runes=['Conqueror'])
+        stats.refresh_from_db()
+        self.assertEqual(decode(Item, [stats.item_ids]), [['Zhonya']])
+        self.assertEqual(decode(Rune, [stats.rune_ids]), [['Conqueror']])
+
+    def test_serializer_leaves_out_encoded_ids(self):
+        stats, = create_official_stats(self.player, 1)
+        self.assertNotIn('item_ids', PlayerOfficialStatsSerializer(stats).data)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('Admin', 'admin@example.com', 'S3cure-pass!', is_staff=True)
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        # items/runes o roznym ksztalcie w kolejnych wierszach
+        create_official_stats(cls.player, 3, items=[], runes={})
+        PlayerOfficialStats.objects.filter(game_id='LEC/Caps_1').update(items=['Luden', 'Zhonya'], runes=['Electrocute'])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('export_official_stats')
+
+    def export(self, output):
+        response = self.client.get(self.url, {'output': output})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(json.loads(rows[1]['items']), ['Luden', 'Zhonya'])
+        self.assertEqual(rows[0]['gamelength'], '1500')
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').decode().splitlines()]
+        self.assertEqual([row['player'] for row in rows], ['Caps'] * 3)
+        self.assertEqual(rows[1]['runes'], ['Electrocute'])
+
+    def test_parquet_schema_does_not_depend_on_first_batch(self):
+        table = pq.read_table(io.BytesIO(self.export('parquet')))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.schema.field('gamelength').type, pa.int64())
+        self.assertEqual(table.schema.field('item_ids').type, pa.list_(pa.int64()))
+        self.assertEqual(table.schema.field('kda').type, pa.float64())
+
+        # pierwsza partia same NULL, potem JSON o innym ksztalcie w kazdej partii
+        fields = [models.IntegerField(), models.JSONField(), ArrayField(models.IntegerField())]
+        rows = [(None, None, None), (1, {'slot1': 'Luden'}, [1, 2]), (2, ['Luden'], [])]
+        table = pq.read_table(io.BytesIO(b''.join(parquet_stream(['a', 'b', 'c'], fields, rows, batch_size=1))))
+        self.assertEqual(table.to_pydict(), {
+            'a': [None, 1, 2], 'b': [None, '{"slot1": "Luden"}', '["Luden"]'], 'c': [None, [1, 2], []]
+        })
+
+    def test_empty_parquet_has_full_schema(self):
+        response = self.client.get(self.url, {'output': 'parquet', 'player': 'Nobody'})
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(str(table.schema.field('datetime_utc').type), 'timestamp[us, tz=UTC]')
+
+    async def test_asgi_export_is_streamed_async(self):
+        request = AsyncRequestFactory().get(self.url, {'output': 'ndjson'})
+        force_authenticate(request, self.admin)
+        response = await sync_to_async(ExportOfficialStatsView.as_view())(request)
+
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_wsgi_export_is_streamed_sync(self):
+        response = self.client.get(self.url, {'output': 'ndjson'})
+        self.assertFalse(response.is_async)
+
+    def test_export_view_needs_row_source(self):
+        with self.assertRaises(TypeError):
+            ExportView()
+
+
+def ingest_row(player, i, /, **fields):
+    """official_stats_row() in the import format: player by nick, gamelength in seconds, items/runes as JSON."""
+    row = official_stats_row(player, i)
+    row.update(
+        player=player.nick.lower(), datetime_utc=row['datetime_utc'].isoformat(),
+        gamelength=int(row['gamelength'].total_seconds()), runes=json.dumps(row['runes'])
+    )
+    row.update(fields)
+    row['items'] = json.dumps(row['items'])
+    return row
+
+
+def ingest_csv(rows):
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, ['player'] + [field.name for field in INGEST_FIELDS])
+    writer.writeheader()
+    writer.writerows(rows)
+    stream.seek(0)
+    return stream
+
+
+class OfficialStatsIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+
+    def test_copy_upsert_and_rejected_rows(self):
+        report = OfficialStatsIngest().run(ingest_csv([
+            ingest_row(self.player, 0, items=['Luden']), ingest_row(self.player, 1),
+            ingest_row(self.player, 2, kills='many'), ingest_row(self.player, 3, player='Nobody'),
+            ingest_row(self.player, 4, champion=''),
+        ]), 'csv')
+
+        self.assertEqual((report['inserted'], report['updated'], report['rejected']), (2, 0, 3))
+        self.assertEqual([error['line'] for error in report['errors']], [4, 5, 6])
+        self.assertIn('champion: missing value', report['errors'][2]['error'])
+
+        stats = PlayerOfficialStats.objects.get(game_id='LEC/Caps_0')
+        self.assertEqual(stats.gamelength, timedelta(seconds=1500))
+        self.assertEqual(decode(Item, [stats.item_ids]), [['Luden']])
+
+        # ten sam mecz drugi raz - aktualizacja, nie nowy wiersz
+        report = OfficialStatsIngest().run(ingest_csv([ingest_row(self.player, 0, kills=9)]), 'csv')
+        self.assertEqual((report['inserted'], report['updated']), (0, 1))
+        self.assertEqual(PlayerOfficialStats.objects.get(game_id='LEC/Caps_0').kills, 9)
+        self.assertEqual(PlayerOfficialStats.objects.count(), 2)
+
+    def test_game_moved_to_another_year_refreshes_both_years(self):
+        OfficialStatsIngest().run(ingest_csv([ingest_row(self.player, i) for i in range(3)]), 'csv')
+        self.assertEqual(PlayerLeaderboardEntry.objects.get(year=2024).games, 3)
+
+        moved = ingest_row(self.player, 0, datetime_utc=datetime(2025, 3, 1, tzinfo=timezone.utc).isoformat())
+        OfficialStatsIngest().run(ingest_csv([moved]), 'csv')
+
+        self.assertEqual(
+            list(PlayerLeaderboardEntry.objects.order_by('year').values_list('year', 'games')), [(2024, 2), (2025, 1)]
+        )
+
+    def test_blank_and_nullable_fields(self):
+        field = models.CharField(name='note', max_length=10, blank=True)
+        self.assertEqual(_parse_value(field, ''), '')
+        self.assertIsNone(_parse_value(models.IntegerField(name='rank', null=True), ''))
+        with self.assertRaises(RowError):
+            _parse_value(models.IntegerField(name='kills', blank=True), '')
+
+    def test_unknown_players_are_loaded_once(self):
+        Player.objects.all().delete()
+        ingest = OfficialStatsIngest()
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertIsNone(ingest._player('Caps'))
+
+
+class PartitioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        # 2024-06-01, 2024-07-01, 2024-07-31
+        create_official_stats(cls.player, 3)
+
+    def setUp(self):
+        convert_to_partitioned(PlayerOfficialStats)
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_rows_move_out_of_default_partition(self):
+        self.assertEqual(self.count(partition_name(PlayerOfficialStats, 2024)), 3)
+
+        create_official_stats(self.player, 1, game_id='future', datetime_utc=datetime(2035, 3, 1, tzinfo=timezone.utc))
+        self.assertEqual(self.count(default_partition_name(PlayerOfficialStats)), 1)
+
+        self.assertEqual(ensure_partitions(PlayerOfficialStats, [2035]), [2035])
+        self.assertEqual(self.count(default_partition_name(PlayerOfficialStats)), 0)
+        self.assertEqual(self.count(partition_name(PlayerOfficialStats, 2035)), 1)
+        self.assertEqual(PlayerOfficialStats.objects.filter(datetime_utc__year=2035).count(), 1)
+
+    def test_archive_and_restore(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = archive_partition(PlayerOfficialStats, 2024, directory)
+            self.assertTrue(path.exists())
+            self.assertEqual(PlayerOfficialStats.objects.count(), 0)
+
+            self.assertEqual(restore_partition(PlayerOfficialStats, 2024, directory), 3)
+        self.assertEqual(PlayerOfficialStats.objects.filter(datetime_utc__year=2024).count(), 3)
+
+    def test_ingest_does_not_duplicate_game_with_new_timestamp(self):
+        moved = datetime(2025, 2, 1, tzinfo=timezone.utc)
+        report = OfficialStatsIngest().run(ingest_csv([ingest_row(self.player, 0, datetime_utc=moved.isoformat())]), 'csv')
+
+        self.assertEqual((report['inserted'], report['updated']), (0, 1))
+        self.assertEqual(
+            list(PlayerOfficialStats.objects.filter(game_id='LEC/Caps_0').values_list('datetime_utc', flat=True)),
+            [moved]
+        )
+
+
+class ParticipationPartitioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        player = Player.objects.create(nick='Caps', lane='Middle', champion='Ahri', team_role='Player')
+        cls.summoner = SummonerName.objects.create(player=player, riot_id='Caps#EUW', puuid='puuid-caps')
+        for i in range(3):
+            match = Match.objects.create(
+                match_id=f'EUW1_{i}', game_duration=1800, game_start=datetime(2025, 1, i + 1, tzinfo=timezone.utc)
+            )
+            MatchParticipation.objects.create(
+                match=match, summoner=cls.summoner, champion='Ahri', kills=1, deaths=1, assists=1, win=True, lane='MIDDLE'
+            )
+        # wiersze sprzed denormalizacji
+        MatchParticipation.objects.update(game_start=None)
+
+    def test_conversion_refused_while_game_start_is_missing(self):
+        with self.assertRaisesMessage(ValueError, 'run backfill_participation_dates first'):
+            convert_to_partitioned(MatchParticipation)
+
+        with connection.cursor() as cursor:
+            self.assertFalse(is_partitioned(MatchParticipation, cursor))
+
+        call_command('backfill_participation_dates', stdout=io.StringIO())
+        self.assertIn(2025, convert_to_partitioned(MatchParticipation))
+
+        # zapis bez game_start bierze date z meczu
+        match = Match.objects.create(
+            match_id='EUW1_new', game_duration=1700, game_start=datetime(2025, 5, 1, tzinfo=timezone.utc)
+        )
+        participation = MatchParticipation.objects.create(
+            match=match, summoner=self.summoner, champion='Azir', kills=0, deaths=0, assists=0, win=False, lane='MIDDLE'
+        )
+        self.assertEqual((participation.game_start, participation.game_duration), (match.game_start, 1700))
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.summoners = []
+        for nick in ('Caps', 'Mikyx', 'Hans Sama'):
+            player = Player.objects.create(nick=nick, lane='Middle', champion='Ahri', team_role='Player')
+            cls.summoners.append(
+                SummonerName.objects.create(player=player, riot_id=f'{nick}#EUW', puuid=f'puuid-{nick}')
+            )
+
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            match = Match.objects.create(
+                match_id=f'EUW1_{i}', game_duration=1800, game_start=start + timedelta(days=i)
+            )
+            # kilku sledzonych graczy w tym samym meczu, czasem po przeciwnych stronach
+            for j, summoner in enumerate(cls.summoners[:1 + i % 3]):
+                MatchParticipation.objects.create(
+                    match=match, summoner=summoner, champion=['Ahri', 'Rakan', 'Jinx'][(i + j) % 3],
+                    kills=i % 5, deaths=j, assists=i, win=(i + j * (i % 2)) % 2 == 0,
+                    lane=['MIDDLE', 'UTILITY', 'BOTTOM'][j], game_start=match.game_start
+                )
+
+    def champion_stats(self):
+        return sorted(SummonerChampionStats.objects.values(
+            'summoner_id', 'champion', 'lane', 'games', 'wins', 'kills', 'deaths', 'assists', 'last_played'
+        ), key=lambda row: (row['summoner_id'], row['champion'], row['lane']))
+
+    def test_signal_rollup_matches_rebuild(self):
+        # usuniecie najnowszej gry i calej pary (konto, champion)
+        MatchParticipation.objects.filter(match__match_id='EUW1_11').delete()
+        MatchParticipation.objects.filter(summoner=self.summoners[0], champion='Jinx').delete()
+
+        incremental = self.champion_stats()
+        rebuild_champion_stats()
+        self.assertEqual(incremental, self.champion_stats())
+
+    def duo_stats(self):
+        return sorted(
+            DuoStats.objects.values('player_a_id', 'player_b_id', 'games', 'wins', 'last_played'),
+            key=lambda row: (row['player_a_id'], row['player_b_id'])
+        )
+
+    def test_signal_duos_match_rebuild(self):
+        self.assertTrue(DuoStats.objects.exists())
+
+        # najnowsza wspolna gra i jeden gracz z calego meczu
+        MatchParticipation.objects.filter(match__match_id='EUW1_11').delete()
+        MatchParticipation.objects.filter(match__match_id='EUW1_5', summoner=self.summoners[1]).delete()
+
+        incremental = self.duo_stats()
+        rebuild_duo_stats()
+        self.assertEqual(incremental, self.duo_stats())
+
+    def test_only_teammates_are_duos(self):
+        caps, mikyx = self.summoners[0], self.summoners[1]
+        duo = DuoStats.objects.get(player_a=caps.player, player_b=mikyx.player)
+        games, wins = duo.games, duo.wins
+
+        for i, (caps_win, mikyx_win) in enumerate(((True, False), (True, True))):
+            match = Match.objects.create(match_id=f'EUW1_duo_{i}', game_start=datetime(2025, 3, 1, tzinfo=timezone.utc))
+            for summoner, win in ((caps, caps_win), (mikyx, mikyx_win)):
+                MatchParticipation.objects.create(
+                    match=match, summoner=summoner, champion='Ahri', kills=0, deaths=0, assists=0, win=win, lane='MIDDLE'
+                )
+
+        # przeciwne druzyny sie nie licza, para zapisana raz (a.id < b.id)
+        duo.refresh_from_db()
+        self.assertEqual((duo.games, duo.wins), (games + 1, wins + 1))
+        self.assertFalse(DuoStats.objects.filter(player_a=mikyx.player, player_b=caps.player).exists())
+
+
+def roster_participants(puuids, champions, win_team=100):
+    """Riot match-v5 participants: two teams in the usual TOP..UTILITY order, puuids/champions per slot."""
+    positions = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+    return [
+        {
+            'participantId': slot + 1, 'teamId': 100 if slot < 5 else 200, 'puuid': puuids[slot],
+            'championId': champions[slot][0], 'championName': champions[slot][1],
+            'teamPosition': positions[slot % 5], 'kills': slot, 'deaths': 1, 'assists': 2,
+            'win': (slot < 5) == (win_team == 100),
+        }
+        for slot in range(10)
+    ]
+
+
+class RosterTests(TestCase):
+    champions = [(i, f'Champ{i}') for i in range(1, 11)]
+
+    def test_build_orders_slots_and_creates_champions(self):
+        match = Match.objects.create(match_id='EUW1_1')
+        participants = roster_participants([f'p{slot}' for slot in range(10)], self.champions, win_team=200)
+
+        # kolejnosc z API nie musi byc po druzynach
+        roster = RosterBuilder().build(match, participants[::-1])
+        self.assertEqual(roster.puuids, [f'p{slot}' for slot in range(10)])
+        self.assertEqual(roster.positions, [1, 2, 3, 4, 5] * 2)
+        self.assertFalse(roster.blue_win)
+        self.assertEqual(Champion.objects.count(), 10)
+
+        self.assertIsNone(RosterBuilder().build(match, participants[:8]))
+        self.assertIsNone(RosterBuilder().build(match, [{**p, 'teamId': 100} for p in participants]))
+
+    def test_lane_opponent(self):
+        roster = MatchRoster(positions=[1, 2, 3, 4, 5, 5, 4, 3, 0, 1])
+        self.assertEqual(lane_opponent(roster, 2), 7)
+        self.assertEqual(lane_opponent(roster, 9), 0)
+        self.assertIsNone(lane_opponent(roster, 1))
+        self.assertIsNone(lane_opponent(roster, 8))
+
+    def test_lane_matchups(self):
+        builder = RosterBuilder()
+        # Caps na mid: dwa razy w slocie 2 (przeciwko Champ8), raz w slocie 7 (przeciwko Champ3)
+        for i, (slot, win_team) in enumerate(((2, 100), (7, 100), (2, 200))):
+            puuids = [f'x{i}_{s}' for s in range(10)]
+            puuids[slot] = 'puuid-caps'
+            match = Match.objects.create(match_id=f'EUW1_{i}')
+            builder.build(match, roster_participants(puuids, self.champions, win_team)).save()
+
+        matchups = lane_matchups(['puuid-caps', 'puuid-other'])
+        self.assertEqual([(row['opponent'], row['position'], row['games'], row['wins']) for row in matchups], [
+            ('Champ8', 'MIDDLE', 2, 1), ('Champ3', 'MIDDLE', 1, 0),
+        ])
+        self.assertEqual(matchups[0]['win_rate'], 50.0)
+        self.assertEqual(matchups[0]['kda'], 4.0)
+
+        self.assertEqual([row['games'] for row in lane_matchups(['puuid-caps'], opponent='champ3')], [1])
+        self.assertEqual([row['opponent'] for row in lane_matchups(['puuid-caps'], champion='Champ8')], ['Champ3'])
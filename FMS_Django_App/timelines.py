@@ -0,0 +1,104 @@
+import codecs
+import json
+import re
+
+from .models import MatchTimelineSnapshot, ROSTER_SIZE
+from .rosters import lane_opponent
+
+"""
+Incremental parsing of match-v5 timelines into MatchTimelineSnapshot rows.
+
+A timeline is several MB, almost all of it in info.frames[*].events. The
+payload is read in chunks and the frames are decoded one at a time, so only one
+frame is held in memory, and reading stops at the last minute in
+SNAPSHOT_MINUTES instead of downloading the rest of the game.
+
+Frames are one minute apart and participantFrames are keyed by participantId
+1-10, which is MatchRoster slot + 1 (team 100 first).
+"""
+
+SNAPSHOT_MINUTES = (10, 15)
+
+TIMELINE_CHUNK_SIZE = 64 * 1024
+
+_FRAMES_START = re.compile(r'"frames"\s*:\s*\[')
+
+_SEPARATORS = ' \t\r\n,'
+
+
+def iter_frames(chunks):
+    """Yields the frames of a timeline from an iterable of byte chunks."""
+    text = codecs.getincrementaldecoder('utf-8')()
+    decoder = json.JSONDecoder()
+    buffer = ''
+    in_frames = False
+
+    for chunk in chunks:
+        buffer += text.decode(chunk)
+
+        if not in_frames:
+            found = _FRAMES_START.search(buffer)
+            if not found:
+                # koncowka moze zawierac poczatek klucza "frames"
+                buffer = buffer[-32:]
+                continue
+            buffer = buffer[found.end():]
+            in_frames = True
+
+        while True:
+            buffer = buffer.lstrip(_SEPARATORS)
+            if not buffer:
+                break
+            if buffer[0] == ']':
+                return
+            try:
+                frame, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # niepelna klatka - doczytujemy kolejny fragment
+                break
+            yield frame
+            buffer = buffer[end:]
+
+
+def build_snapshots(match, frames, minutes=SNAPSHOT_MINUTES):
+    """Unsaved snapshots for the minutes the game reached."""
+    wanted = set(minutes)
+    last = max(minutes)
+    snapshots = []
+
+    for frame in frames:
+        minute = round(frame.get('timestamp', 0) / 60000)
+        if minute in wanted:
+            participants = frame['participantFrames']
+            slots = [participants.get(str(slot + 1), {}) for slot in range(ROSTER_SIZE)]
+            snapshots.append(MatchTimelineSnapshot(
+                match=match,
+                minute=minute,
+                gold=[p.get('totalGold', 0) for p in slots],
+                cs=[p.get('minionsKilled', 0) + p.get('jungleMinionsKilled', 0) for p in slots],
+                xp=[p.get('xp', 0) for p in slots],
+            ))
+        if minute >= last:
+            break
+
+    return snapshots
+
+
+def lane_diffs(roster, snapshots, puuid):
+    """{minute: {gold, cs, xp}} of the player minus the lane opponent, or None."""
+    if roster is None or puuid not in roster.puuids:
+        return None
+
+    slot = roster.puuids.index(puuid)
+    enemy = lane_opponent(roster, slot)
+    if enemy is None:
+        return None
+
+    return {
+        str(snapshot.minute): {
+            'gold': snapshot.gold[slot] - snapshot.gold[enemy],
+            'cs': snapshot.cs[slot] - snapshot.cs[enemy],
+            'xp': snapshot.xp[slot] - snapshot.xp[enemy],
+        }
+        for snapshot in sorted(snapshots, key=lambda snapshot: snapshot.minute)
+    } or None
@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from .async_views import io_view
 
 urlpatterns = [
     # GET /api/me                       info zalogowanego usera
@@ -32,18 +33,57 @@ urlpatterns = [
     # GET  /api/players/<nick>/         szczegóły gracza (zalogowany)
     path('players/<str:nick>/', views.PlayerDetailView.as_view(), name='player_detail'),
 
+    # GET  /api/players/<nick>/profile/?include=ranks,matches  cala strona gracza jednym zapytaniem (public)
+    path('players/<str:nick>/profile/', io_view(views.PlayerProfileView), name='player_profile'),
+
     # GET /api/players/<nick>/ranks/    pobranie rang gracza (public)
     path('players/<str:nick>/ranks/', views.ListPlayerRanks.as_view(), name='player_ranks'),
 
     # GET  /api/players/<nick>/matches/  historia meczów (public, paginowana)
     path('players/<str:nick>/matches/', views.ListMatchesView.as_view(), name='player_matches'),
 
+    # GET  /api/players/<nick>/champions/  pula championow z rankedow (public)
+    path('players/<str:nick>/champions/', views.PlayerChampionPoolView.as_view(), name='player_champions'),
+
+    # GET  /api/players/<nick>/duos/  z kim gracz gra w jednej druzynie (public)
+    path('players/<str:nick>/duos/', views.PlayerDuosView.as_view(), name='player_duos'),
+
+    # GET  /api/players/<nick>/matchups/  wyniki przeciwko championom z tej samej linii (public)
+    path('players/<str:nick>/matchups/', views.PlayerMatchupsView.as_view(), name='player_matchups'),
+
     # GET /api/players/<nick>/official_stats/ historia i statystyki oficjalnych meczy
-    path('players/<str:nick>/official_stats/', views.AggregatedPlayerStatsView.as_view(), name='official_player_match'),
+    path('players/<str:nick>/official_stats/', io_view(views.AggregatedPlayerStatsView), name='official_player_match'),
 
     # GET /api/players/<nick>/official_stats/   opcje filtrow
     path('players/<str:nick>/official_stats/options/', views.PlayerFilterOptionsView.as_view(), name='player_filter_options'),
 
+    # GET /api/players/<nick>/official_stats/facets/    opcje filtrow z liczba gier dla aktualnych filtrow
+    path('players/<str:nick>/official_stats/facets/', io_view(views.PlayerStatsFacetsView), name='player_stats_facets'),
+
+    # GET /api/players/<nick>/official_stats/breakdown/?by=champion   statystyki pogrupowane po championie/rywalu/...
+    path('players/<str:nick>/official_stats/breakdown/', io_view(views.PlayerStatsBreakdownView), name='player_stats_breakdown'),
+
+    # GET /api/players/<nick>/official_stats/trend/?window=5&bucket=month   forma (ostatnie N gier) i trendy miesieczne
+    path('players/<str:nick>/official_stats/trend/', io_view(views.PlayerStatsTrendView), name='player_stats_trend'),
+
+    # GET /api/players/<nick>/official_stats/builds/    najczestsze buildy i runy na championa z win rate
+    path('players/<str:nick>/official_stats/builds/', io_view(views.PlayerBuildsView), name='player_builds'),
+
+    # GET /api/official_stats/compare/?players=a,b,c   porownanie statystyk graczy (public)
+    path('official_stats/compare/', views.ComparePlayersStatsView.as_view(), name='compare_players_stats'),
+
+    # GET /api/leaderboards/?role=Mid&year=2025&metric=cs_per_min   ranking graczy (public)
+    path('leaderboards/', views.LeaderboardView.as_view(), name='leaderboards'),
+
+    # GET /api/export/official_stats/?output=csv|ndjson|parquet   eksport statystyk (admin)
+    path('export/official_stats/', views.ExportOfficialStatsView.as_view(), name='export_official_stats'),
+
+    # GET /api/export/matches/?output=csv|ndjson|parquet            eksport historii meczy (admin)
+    path('export/matches/', views.ExportMatchesView.as_view(), name='export_matches'),
+
+    # POST /api/import/official_stats/?input=csv|ndjson        masowy import statystyk (admin)
+    path('import/official_stats/', views.ImportOfficialStatsView.as_view(), name='import_official_stats'),
+
     # POST /api/register/               rejestracja nowego konta (public)
     path('register/', views.RegisterView.as_view(), name='register'),
 
@@ -69,7 +109,13 @@ urlpatterns = [
     path('newsletter/', views.CreateNewsletterView.as_view(), name='sign_to_newsletter'),
 
     # GET pandascore.co                 pobranie oficjalnych meczy (public)
-    path('officialmatches/', views.ListOfficialMatches.as_view(), name='get_official_matches'),
+    path('officialmatches/', io_view(views.ListOfficialMatches), name='get_official_matches'),
+
+    # GET /api/live/                   gracze w grze teraz (public)
+    path('live/', views.LiveGamesView.as_view(), name='live_games'),
+
+    # GET /api/live/events/            zdarzenia started/finished jako SSE, strumien tylko pod ASGI (public)
+    path('live/events/', io_view(views.LiveEventsView), name='live_events'),
 
     # GET /api/csrf                     csrf token (public)
     path('csrf/', views.CsrfView.as_view(), name="get_csrf_token")
@@ -1,32 +1,48 @@
 # views.py
 import hashlib
+import io
 import json
-import os
-from datetime import datetime, timedelta
+from abc import ABC, abstractmethod
 from django.core.cache import cache
 
-from django.db.models import Avg, Count, Sum, Q, F
+from django.db.models import Count, Sum, Max, Q, F, Prefetch
+from django.db.models import Window, RowRange
+from django.db.models.functions import ExtractYear, TruncMonth, TruncWeek
 
-import jwt
-import requests
 from django.conf import settings
 from django.db.models import Case, When, Value, IntegerField
-from django.http import Http404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.generics import RetrieveAPIView
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser, BasePermission
 from rest_framework.response import Response
 from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 
 from .serializers import UserSerializer, PlayerSerializer, LoginSerializer, PostSerializer, \
     MatchParticipationSerializer, RegisterSerializer, NewsletterSerializer, SummonerNameSerializer, \
-    PlayerOfficialStatsSerializer, PlayerAggregatedStatsSerializer
+    PlayerOfficialStatsSerializer, PlayerAggregatedStatsSerializer, PlayerLeaderboardEntrySerializer
 from rest_framework import generics, status
-from .models import User, Player, Post, SummonerName, MatchParticipation, Newsletter, PlayerOfficialStats
+from .authentication import issue_token, revoke_token, ACCESS_TOKEN_LIFETIME
+from .caching import get_player_generation, get_player_generations
+from .responses import cached_response, cache_response
+from .stats_engine import engine as stats_engine
+from .models import User, Player, Post, SummonerName, Match, MatchParticipation, Newsletter, PlayerOfficialStats, \
+    DERIVED_METRICS, official_stats_aggregates, official_stats_sort_expressions, PlayerLeaderboardEntry, Item, Rune, SummonerChampionStats, DuoStats
+from .builds import decode
+from .ingest import OfficialStatsIngest
+from .rosters import lane_matchups
+from .livegames import get_live_games, last_event_id, sse_backlog
+from .pandascore import official_matches, PandaScoreError, is_mirrored, mirrored_matches
+from .exports import EXPORT_FORMATS, EXPORT_WRITERS, EXPORT_CHUNK_SIZE, parquet_available, export_fields, aiterate
+from .leaderboards import LEADERBOARD_METRICS, LEADERBOARD_MIN_GAMES
 
 """
 GET → get() method (list/retrieve)
@@ -52,6 +68,52 @@ class IsEditorOrAdminUser(HasSpecificRolePermission):
     required_role = "EDITOR"
 
 
+def split_param(value):
+    return [name for name in (value or '').split(',') if name]
+
+
+def sparse_fieldset(request, serializer_class):
+    """
+    (fields, exclude) for a SparseFieldsetMixin serializer. ?fields=a,b picks fields
+    (?fields=all - every field), ?exclude=c drops them; without either a list
+    response leaves out the serializer's Meta.list_exclude.
+    """
+    fields = split_param(request.GET.get('fields'))
+    exclude = split_param(request.GET.get('exclude'))
+    if not fields and not exclude:
+        return None, list(getattr(serializer_class.Meta, 'list_exclude', ()))
+    if fields == ['all']:
+        return None, exclude
+    return fields or None, exclude
+
+
+def defer_unused_columns(queryset, serializer):
+    """Defers the model columns the serializer does not read, e.g. JSON builds of a compact list."""
+    sources = {field.source.split('.')[0] for field in serializer.fields.values()}
+    # kolumny, z ktorych pole liczy wartosc (np. DerivedMetricField)
+    for field in serializer.fields.values():
+        sources.update(getattr(field, 'requires', ()))
+    # source='*' czyta caly obiekt
+    if '*' in sources:
+        return queryset
+
+    unused = [
+        field.name for field in queryset.model._meta.concrete_fields
+        if not field.is_relation and not field.primary_key and field.name not in sources
+    ]
+    return queryset.defer(*unused) if unused else queryset
+
+
+class SparseFieldsetViewMixin:
+    """?fields= / ?exclude= for generic list views with a SparseFieldsetMixin serializer."""
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'], kwargs['exclude'] = sparse_fieldset(self.request, self.get_serializer_class())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        return defer_unused_columns(super().filter_queryset(queryset), self.get_serializer())
+
+
 # Create your views here.
 
 # GET /api/me/
@@ -157,7 +219,7 @@ class ListUserPostsView(generics.ListAPIView):
 
 
 # GET  /api/players/                lista graczy (public)
-class PlayerListView(generics.ListAPIView):
+class PlayerListView(SparseFieldsetViewMixin, generics.ListAPIView):
     queryset = Player.objects.all().annotate(
         lane_order=Case(
             When(lane='Top', then=Value(0)),
@@ -190,19 +252,83 @@ class MatchPagination(PageNumberPagination):
     max_page_size = 20
 
 
-class ListMatchesView(generics.ListAPIView):
+MATCH_SUMMARY_GAMES = 20
+
+
+def match_summary(participations, games):
+    """Win rate, KDA i pula championow z ostatnich `games` gier - jedno zapytanie GROUP BY."""
+    recent = participations.values('id')[:games]
+    pool = MatchParticipation.objects.filter(id__in=recent).values('champion').annotate(
+        games=Count('id'),
+        wins=Count('id', filter=Q(win=True)),
+        kills=Sum('kills'),
+        deaths=Sum('deaths'),
+        assists=Sum('assists'),
+    ).order_by('-games', 'champion')
+
+    champion_pool = []
+    totals = {'games': 0, 'wins': 0, 'kills': 0, 'deaths': 0, 'assists': 0}
+    for row in pool:
+        for key in totals:
+            totals[key] += row[key]
+        champion_pool.append({
+            'champion': row['champion'],
+            'games': row['games'],
+            'wins': row['wins'],
+            'win_rate': round(row['wins'] / row['games'] * 100, 1),
+            'kda': round((row['kills'] + row['assists']) / max(row['deaths'], 1), 2),
+        })
+
+    return {
+        'games': totals['games'],
+        'wins': totals['wins'],
+        'win_rate': round(totals['wins'] / totals['games'] * 100, 1) if totals['games'] else 0,
+        'avg_kda': round((totals['kills'] + totals['assists']) / max(totals['deaths'], 1), 2),
+        'champion_pool': champion_pool,
+    }
+
+
+def player_participations(early_diffs=True, **lookup):
+    # stronicowanie po indeksie (summoner, -game_start), Match z rosterem i klatkami timeline
+    # doczytywany po PK tylko dla strony
+    matches = Match.objects.all()
+    if early_diffs:
+        matches = matches.select_related('roster').prefetch_related('timeline_snapshots')
+    return MatchParticipation.objects.filter(**lookup).select_related('summoner').prefetch_related(
+        Prefetch('match', queryset=matches)
+    ).order_by('-game_start', '-id')
+
+
+def summary_games(request):
+    # request.GET - czytane tez w cache_key() z AsyncPlayerProfileView, na zwyklym requescie Django
+    try:
+        return min(max(int(request.GET.get('summary_games', MATCH_SUMMARY_GAMES)), 1), 100)
+    except ValueError:
+        return MATCH_SUMMARY_GAMES
+
+
+class ListMatchesView(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = MatchParticipationSerializer
     permission_classes = [AllowAny]
     lookup_field = 'nick'
     pagination_class = MatchPagination
 
     def get_queryset(self):
-        nick = self.kwargs['nick']
-        player = Player.objects.get(nick=nick)
-        summoner_names = SummonerName.objects.filter(player=player)
-        return MatchParticipation.objects.filter(
-            summoner__in=summoner_names
-        ).select_related('match').order_by('-match__game_start')
+        # roster i timeline tylko gdy odpowiedz zawiera early_diffs
+        early_diffs = 'early_diffs' in self.get_serializer().fields
+        return player_participations(early_diffs, summoner__player__nick=self.kwargs['nick'])
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+
+        # pusta historia - dodatkowe zapytanie tylko po to, zeby odroznic nieznany nick
+        if not page and not Player.objects.filter(nick=self.kwargs['nick']).exists():
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['summary'] = match_summary(queryset if page else queryset.none(), summary_games(request))
+        return response
 
 
 # POST /api/players/create/<nick>     tworzenie nowego zawodnika z dashboarda admina
@@ -237,17 +363,7 @@ class LoginView(generics.CreateAPIView):
             user = User.objects.get(nick=nick)
 
             if user.check_password(password):
-                now = datetime.now()
-                expire = now + timedelta(hours=24)
-
-                payload = {
-                    'id': user.id,
-                    'nick': user.nick,
-                    'exp': int(expire.timestamp()),
-                    'iat': int(now.timestamp())
-                }
-
-                token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+                token = issue_token(user)
 
                 response = Response({
                     "nick": user.nick,
@@ -261,7 +377,7 @@ class LoginView(generics.CreateAPIView):
                     httponly=True,
                     secure=not settings.DEBUG,
                     samesite="Lax",
-                    max_age=24 * 60 * 60,
+                    max_age=int(ACCESS_TOKEN_LIFETIME.total_seconds()),
                     path="/"
                 )
 
@@ -282,6 +398,9 @@ class LogoutView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
+        # token przestaje dzialac od razu, nie dopiero po wygasnieciu
+        revoke_token(request.auth)
+
         resp = Response({"detail": "Logged out successfully"}, status=200)
         resp.delete_cookie(
             key="access_token",
@@ -298,7 +417,7 @@ class PostPagination(PageNumberPagination):
     max_page_size = 20
 
 
-class PostsView(generics.ListAPIView):
+class PostsView(SparseFieldsetViewMixin, generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
@@ -346,6 +465,40 @@ class CreateNewsletterView(generics.CreateAPIView):
     throttle_scope = 'newsletter'
 
 
+def official_matches_query(request):
+    """Parametry /api/officialmatches/ wspolne dla widoku DRF i async."""
+    team_id = request.GET.get("team_id")
+    match_status = request.GET.get("status")
+
+    page = request.GET.get("page", 1)
+    mirrored_team = int(team_id) if team_id and team_id.isdigit() and is_mirrored(int(team_id)) else None
+    if mirrored_team is not None:
+        try:
+            page = int(page)
+        except ValueError:
+            page = 1
+
+    return {
+        'team_id': team_id,
+        'status': match_status,
+        'page': page,
+        'mirrored_team': mirrored_team,
+        'statuses': [value for value in (match_status or '').split(',') if value],
+        'cursor': request.GET.get("cursor"),
+    }
+
+
+def add_next_cursor(response, request, next_cursor):
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+        response['X-Next-Cursor'] = next_cursor
+        response['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+
+OFFICIAL_MATCHES_UNAVAILABLE = {"error": "Official matches are temporarily unavailable."}
+
+
 # GET /api/pandascore.co            oficjalne mecze (public)
 class ListOfficialMatches(generics.ListAPIView):
     permission_classes = [AllowAny]
@@ -353,20 +506,61 @@ class ListOfficialMatches(generics.ListAPIView):
     throttle_scope = 'pandascore'
 
     def get(self, request, *args, **kwargs):
-        team_id = request.query_params.get("team_id")
-        status = request.query_params.get("status")
-        page = request.query_params.get("page", 1)
+        query = official_matches_query(request)
 
-        url = f"https://api.pandascore.co/lol/matches?filter[opponent_id]={team_id}&filter[status]={status}&page[number]={page}&page[size]=5"
+        # nasze druzyny - z lokalnej kopii (sync_official_matches), stronicowanie po kursorze
+        if query['mirrored_team'] is not None:
+            matches, next_cursor = mirrored_matches(
+                query['mirrored_team'], query['statuses'], cursor=query['cursor'], page=query['page']
+            )
+            return add_next_cursor(Response(matches), request, next_cursor)
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {str(os.getenv('PANDASCORE_API_KEY'))}"
-        }
+        try:
+            data, upstream_status, cache_state = official_matches(query['team_id'], query['status'], query['page'])
+        except PandaScoreError:
+            return Response(OFFICIAL_MATCHES_UNAVAILABLE, status=status.HTTP_502_BAD_GATEWAY)
+
+        response = Response(data, status=upstream_status)
+        response['X-Cache'] = cache_state
+        return response
+
+
+# GET /api/live/                    gracze w grze teraz (public)
+class LiveGamesView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        # stan z cache (track_live_games) - bez zapytan do Riot
+        return Response(sorted(get_live_games().values(), key=lambda game: game['nick'].lower()))
 
-        req = requests.get(url=url, headers=headers)
 
-        return Response(req.json(), status=req.status_code)
+class IPScopedRateThrottle(ScopedRateThrottle):
+    # EventSource nie wysyla naglowka Authorization - limit zawsze po IP
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+# GET /api/live/events/             zdarzenia started/finished jako SSE, pod WSGI bez otwartego strumienia (public)
+class LiveEventsView(View):
+    # zwykly widok Django - negocjacja DRF odrzucilaby Accept: text/event-stream
+    throttle_scope = 'live'
+
+    def throttled(self, request):
+        """429 when the client (re)connects more often than the 'live' rate, otherwise None."""
+        throttle = IPScopedRateThrottle()
+        if throttle.allow_request(request, self):
+            return None
+        response = HttpResponse(status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(int(throttle.wait() or 1))
+        return response
+
+    def get(self, request):
+        # strumien trzymalby worker WSGI - otwarte polaczenia tylko w AsyncLiveEventsView
+        response = self.throttled(request) or HttpResponse(
+            sse_backlog(last_event_id(request)), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
 
 
 # GET /api/csrf                     CSRF Token
@@ -378,8 +572,37 @@ class CsrfView(RetrieveAPIView):
         return Response(status=204)
 
 
+def ranked_summoner_names(summoners):
+    # od najwyzszej rangi
+    return summoners.annotate(
+        tier_order=Case(
+            When(tier="CHALLENGER", then=Value(0)),
+            When(tier="GRANDMASTER", then=Value(1)),
+            When(tier="MASTER", then=Value(2)),
+            When(tier="DIAMOND", then=Value(3)),
+            When(tier="EMERALD", then=Value(4)),
+            When(tier="PLATINUM", then=Value(5)),
+            When(tier="GOLD", then=Value(6)),
+            When(tier="SILVER", then=Value(7)),
+            When(tier="BRONZE", then=Value(8)),
+            When(tier="IRON", then=Value(9)),
+            When(tier="UNRANKED", then=Value(10)),
+            default=Value(10),
+            output_field=IntegerField()
+        ),
+        rank_order=Case(
+            When(rank="I", then=Value(1)),
+            When(rank="II", then=Value(2)),
+            When(rank="III", then=Value(3)),
+            When(rank="IV", then=Value(4)),
+            default=Value(5),
+            output_field=IntegerField()
+        )
+    ).order_by('tier_order', 'rank_order')
+
+
 # GET /api/players/<nick>/ranks
-class ListPlayerRanks(generics.ListAPIView):
+class ListPlayerRanks(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = SummonerNameSerializer
     permission_classes = [AllowAny]
     lookup_field = 'nick'
@@ -389,39 +612,86 @@ class ListPlayerRanks(generics.ListAPIView):
 
         try:
             player = Player.objects.get(nick=nick)
-            return SummonerName.objects.filter(player=player).annotate(
-                tier_order=Case(
-                    When(tier="CHALLENGER", then=Value(0)),
-                    When(tier="GRANDMASTER", then=Value(1)),
-                    When(tier="MASTER", then=Value(2)),
-                    When(tier="DIAMOND", then=Value(3)),
-                    When(tier="EMERALD", then=Value(4)),
-                    When(tier="PLATINUM", then=Value(5)),
-                    When(tier="GOLD", then=Value(6)),
-                    When(tier="SILVER", then=Value(7)),
-                    When(tier="BRONZE", then=Value(8)),
-                    When(tier="IRON", then=Value(9)),
-                    When(tier="UNRANKED", then=Value(10)),
-                    default=Value(10),
-                    output_field=IntegerField()
-                ),
-                rank_order=Case(
-                    When(rank="I", then=Value(1)),
-                    When(rank="II", then=Value(2)),
-                    When(rank="III", then=Value(3)),
-                    When(rank="IV", then=Value(4)),
-                    default=Value(5),
-                    output_field=IntegerField()
-                )
-            ).order_by('tier_order', 'rank_order')
+            return ranked_summoner_names(SummonerName.objects.filter(player=player).select_related('player'))
         except Player.DoesNotExist:
             return SummonerName.objects.none()
 
-def generate_cache_key(player, filters, page=1):
+def generate_cache_key(player, filters, page=1, prefix="player_stats"):
     clean_filters = {k: v for k, v in filters.items() if v}
     clean_filters['page'] = page
     filter_string = json.dumps(clean_filters, sort_keys=True)
-    return f"player_stats:{player}:{hashlib.md5(filter_string.encode()).hexdigest()}"
+    return f"{prefix}:{player}:{hashlib.md5(filter_string.encode()).hexdigest()}"
+
+
+def validate_year(year):
+    # ?year=abc dawal ValueError w filtrze datetime_utc__year (500)
+    if year:
+        try:
+            int(year)
+        except ValueError:
+            raise ValidationError({'year': "Must be an integer."})
+    return year
+
+
+def get_stats_filters(request):
+    return {
+        'champion': request.GET.get('champion'),
+        'year': validate_year(request.GET.get('year')),
+        'tournament': request.GET.get('tournament'),
+        'team_vs': request.GET.get('team_vs')
+    }
+
+
+def filter_official_stats(stats, filters):
+    if filters['champion']:
+        stats = stats.filter(champion__iexact=filters['champion'])
+
+    if filters['year']:
+        stats = stats.filter(datetime_utc__year=filters['year'])
+
+    if filters['tournament']:
+        stats = stats.filter(tournament__contains=filters['tournament'])
+
+    if filters['team_vs']:
+        stats = stats.filter(team_vs__contains=filters['team_vs'])
+
+    return stats
+
+
+# sortowanie listy meczow, np. ?ordering=-kda -> najlepsze gry pod wzgledem KDA
+OFFICIAL_STATS_ORDERINGS = ('datetime_utc',) + DERIVED_METRICS
+
+# ?min_kda=5&max_dmg_participation=20 - filtry po metrykach z with_derived_metrics()
+METRIC_FILTER_PARAMS = {
+    f'{bound}_{metric}': f'{metric}__{lookup}'
+    for metric in DERIVED_METRICS for bound, lookup in (('min', 'gte'), ('max', 'lte'))
+}
+
+
+def get_metric_filters(request):
+    filters = {}
+    for param, lookup in METRIC_FILTER_PARAMS.items():
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            filters[lookup] = float(value)
+        except ValueError:
+            raise ValidationError({param: "Must be a number."})
+    return filters
+
+
+def metric_filter_cache_params(request):
+    # surowe wartosci - klucz cache liczony tez w widokach async, bez walidacji
+    return {param: request.GET.get(param) for param in METRIC_FILTER_PARAMS}
+
+
+def get_stats_ordering(request):
+    ordering = request.GET.get('ordering', '-datetime_utc')
+    if ordering.lstrip('-') not in OFFICIAL_STATS_ORDERINGS:
+        return '-datetime_utc'
+    return ordering
+
 
 class PlayerOfficialStatsPagination(PageNumberPagination):
     page_size = 5
@@ -434,61 +704,48 @@ class AggregatedPlayerStatsView(APIView):
     lookup_field = 'nick'
     pagination_class = PlayerOfficialStatsPagination
 
-    def get(self, request, nick):
-        filters={
-            'champion': request.GET.get('champion'),
-            'year': request.GET.get('year'),
-            'tournament': request.GET.get('tournament'),
-            'team_vs': request.GET.get('team_vs')
+    def cache_key(self, request, nick, generation):
+        fields, exclude = sparse_fieldset(request, PlayerOfficialStatsSerializer)
+        filters = {
+            **get_stats_filters(request), **metric_filter_cache_params(request), 'ordering': get_stats_ordering(request),
+            'fields': sorted(fields or []), 'exclude': sorted(exclude)
         }
+        return generate_cache_key(f"{nick.lower()}:{generation}", filters, request.GET.get('page', 1))
 
-        page = request.GET.get('page', 1)
-        cache_key = generate_cache_key(nick, filters, page)
-
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        stats = PlayerOfficialStats.objects.filter(
-            player__nick__iexact=nick
-        ).select_related('player')
+    def get(self, request, nick):
+        filters = get_stats_filters(request)
+        metric_filters = get_metric_filters(request)
+        ordering = get_stats_ordering(request)
 
-        if filters['champion']:
-            stats = stats.filter(champion__iexact=filters['champion'])
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
 
-        if filters['year']:
-            stats = stats.filter(datetime_utc__year=filters['year'])
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
 
-        if filters['tournament']:
-            stats = stats.filter(tournament__contains=filters['tournament'])
+        stats = filter_official_stats(
+            PlayerOfficialStats.objects.filter(player__nick__iexact=nick).select_related('player'),
+            filters
+        ).with_derived_metrics().filter(**metric_filters)
 
-        if filters['team_vs']:
-            stats = stats.filter(team_vs__contains=filters['team_vs'])
-
-        aggregated_stats = stats.aggregate(
-            total_matches=Count('id'),
-            total_kills=Sum('kills'),
-            total_deaths=Sum('deaths'),
-            total_assists=Sum('assists'),
-            total_cs=Sum('cs'),
-            total_gold=Sum('gold'),
-            total_damage=Sum('damage_to_champions'),
-            total_team_damage=Sum('team_damage_to_champions'),
-            total_vision_score=Sum('vision_score'),
-            total_team_kills=Sum('team_kills'),
-            total_team_gold=Sum('team_gold'),
-            total_gamelength=Sum('gamelength'),
-            wins=Count('id', filter=Q(winner=F('side')))
-        )
+        # silnik kolumnowy nie zna filtrow po metrykach - wtedy agregat w SQL
+        columns = stats_engine.get(nick) if not metric_filters else None
+        if columns is not None:
+            aggregated_stats = columns.aggregate(filters)
+        else:
+            aggregated_stats = stats.aggregate(**official_stats_aggregates())
 
         paginator = PlayerOfficialStatsPagination()
 
+        fields, exclude = sparse_fieldset(request, PlayerOfficialStatsSerializer)
+        match_serializer = PlayerOfficialStatsSerializer(many=True, fields=fields, exclude=exclude)
+
         matches = paginator.paginate_queryset(
-            stats.order_by('-datetime_utc'),
+            defer_unused_columns(stats.order_by(ordering, '-id'), match_serializer.child),
             request
         )
 
-        match_serializer = PlayerOfficialStatsSerializer(matches, many=True)
+        match_serializer = PlayerOfficialStatsSerializer(matches, many=True, fields=fields, exclude=exclude)
 
         aggregated_serializer=PlayerAggregatedStatsSerializer(aggregated_stats)
 
@@ -502,26 +759,833 @@ class AggregatedPlayerStatsView(APIView):
             }
         }
 
-        cache.set(cache_key, response_data, timeout=3600)
-        return Response(response_data)
+        return cache_response(request, cache_key, response_data, timeout=3600)
+
+def player_filter_options(nick):
+    cache_key = f"player_filter_options:{nick}"
+    cached_data = cache.get(cache_key)
+    if cached_data:
+        return cached_data
+
+    stats = PlayerOfficialStats.objects.filter(player__nick__iexact=nick)
+
+    options = {
+        'years': sorted(list(stats.dates('datetime_utc', 'year').values_list('datetime_utc__year', flat=True).distinct())),
+        'tournaments': sorted(list(stats.values_list('tournament', flat=True).distinct())),
+        'champions': sorted(list(stats.values_list('champion', flat=True).distinct())),
+        'teams_vs': sorted(list(stats.values_list('team_vs', flat=True).distinct()))
+    }
+
+    cache.set(cache_key, options, timeout=7200)
+    return options
+
 
 class PlayerFilterOptionsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, nick):
-        cache_key = f"player_filter_options:{nick}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        stats = PlayerOfficialStats.objects.filter(player__nick__iexact=nick)
-
-        options = {
-            'years': sorted(list(stats.dates('datetime_utc', 'year').values_list('datetime_utc__year', flat=True).distinct())),
-            'tournaments': sorted(list(stats.values_list('tournament', flat=True).distinct())),
-            'champions': sorted(list(stats.values_list('champion', flat=True).distinct())),
-            'teams_vs': sorted(list(stats.values_list('team_vs', flat=True).distinct()))
+        return Response(player_filter_options(nick))
+
+
+# kolumna -> nazwa facetu w odpowiedzi (takie same jak w PlayerFilterOptionsView)
+FACETS = {
+    'year': 'years',
+    'tournament': 'tournaments',
+    'champion': 'champions',
+    'team_vs': 'teams_vs',
+}
+
+
+def facet_matches(row, filters):
+    """Ta sama semantyka co filter_official_stats, dla jednego wiersza zgrupowanego po facetach."""
+    if filters['champion'] and row['champion'].lower() != filters['champion'].lower():
+        return False
+    if filters['year'] and row['year'] != int(filters['year']):
+        return False
+    if filters['tournament'] and filters['tournament'] not in row['tournament']:
+        return False
+    if filters['team_vs'] and filters['team_vs'] not in row['team_vs']:
+        return False
+    return True
+
+
+def facet_counts(nick, filters):
+    """
+    Liczba gier dla kazdej wartosci facetu, liczona przy pozostalych filtrach.
+    Z silnika kolumnowego, gdy gracz jest zaladowany, inaczej z jednego GROUP BY po wszystkich facetach.
+    """
+    columns = stats_engine.get(nick)
+    if columns is not None:
+        return {column: columns.counts({**filters, column: None}, column) for column in FACETS}
+
+    # kombinacji (rok, turniej, champion, przeciwnik) jest najwyzej tyle co gier gracza
+    rows = (
+        PlayerOfficialStats.objects.filter(player__nick__iexact=nick)
+        .values('tournament', 'champion', 'team_vs', year=ExtractYear('datetime_utc'))
+        .annotate(games=Count('id'))
+        .order_by()
+    )
+    counts = {column: {} for column in FACETS}
+    for row in rows:
+        for column in FACETS:
+            if facet_matches(row, {**filters, column: None}):
+                counts[column][row[column]] = counts[column].get(row[column], 0) + row['games']
+    return counts
+
+
+# GET /api/players/<nick>/official_stats/facets/  opcje filtrow z liczba gier (drill-down)
+class PlayerStatsFacetsView(APIView):
+    permission_classes = [AllowAny]
+
+    def cache_key(self, request, nick, generation):
+        return generate_cache_key(f"{nick.lower()}:{generation}", get_stats_filters(request), prefix="player_stats_facets")
+
+    def get(self, request, nick):
+        filters = get_stats_filters(request)
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        # kazdy facet liczony przy pozostalych filtrach, zeby mozna bylo zmienic jego wartosc
+        counts = facet_counts(nick, filters)
+
+        # facet roku bez filtra roku - suma jego wartosci pasujacych do filtra to liczba gier
+        year = filters['year']
+        facets = {'total_matches': sum(
+            count for value, count in counts['year'].items() if not year or str(value) == str(year)
+        )}
+
+        for column, name in FACETS.items():
+            facets[name] = [{'value': value, 'count': count} for value, count in sorted(counts[column].items())]
+
+        return cache_response(request, cache_key, facets, timeout=7200)
+
+
+# ?by= -> wyrazenie grupujace
+BREAKDOWN_GROUPS = {
+    'champion': F('champion'),
+    'team_vs': F('team_vs'),
+    'tournament': F('tournament'),
+    'year': ExtractYear('datetime_utc'),
+    'patch': F('patch'),
+    'side': F('side'),
+}
+
+
+def breakdown_sort_key(field):
+    def key(row):
+        value = row[field]
+        # "Perfect" KDA (0 smierci) jest zawsze najlepsze
+        if value == "Perfect":
+            return float('inf')
+        return value if value is not None else float('-inf')
+    return key
+
+
+def get_breakdown_limit(request):
+    # 0 - bez limitu
+    try:
+        limit = int(request.GET.get('limit', 0))
+    except ValueError:
+        raise ValidationError({'limit': "Must be a non-negative integer."})
+    if limit < 0:
+        raise ValidationError({'limit': "Must be a non-negative integer."})
+    return limit
+
+
+# GET /api/players/<nick>/official_stats/breakdown/?by=champion  statystyki pogrupowane (public)
+class PlayerStatsBreakdownView(APIView):
+    permission_classes = [AllowAny]
+
+    def cache_key(self, request, nick, generation):
+        # surowy limit - klucz liczony tez w widoku async, przed walidacja
+        return generate_cache_key(
+            f"{nick.lower()}:{generation}",
+            {
+                **get_stats_filters(request),
+                'by': request.GET.get('by', 'champion'),
+                'sort': request.GET.get('sort', '-total_matches'),
+                'limit': request.GET.get('limit', '0'),
+            },
+            prefix="player_stats_breakdown"
+        )
+
+    def get(self, request, nick):
+        by = request.GET.get('by', 'champion')
+        if by not in BREAKDOWN_GROUPS:
+            return Response(
+                {'error': f"Invalid 'by' value. Allowed: {', '.join(BREAKDOWN_GROUPS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sort = request.GET.get('sort', '-total_matches')
+        sort_field = sort.lstrip('-')
+        if sort_field not in PlayerAggregatedStatsSerializer().fields:
+            return Response(
+                {'error': f"Invalid 'sort' value: {sort_field}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = get_breakdown_limit(request)
+
+        filters = get_stats_filters(request)
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        columns = stats_engine.get(nick)
+        if columns is not None:
+            # grupy z pamieci (posortowane po wartosci grupy) - sortowanie w Pythonie
+            results = [
+                {'group': group, **PlayerAggregatedStatsSerializer(row).data}
+                for group, row in columns.breakdown(filters, by)
+            ]
+            results.sort(key=breakdown_sort_key(sort_field), reverse=sort.startswith('-'))
+            if limit > 0:
+                results = results[:limit]
+        else:
+            stats = filter_official_stats(PlayerOfficialStats.objects.filter(player__nick__iexact=nick), filters)
+
+            # jedno zapytanie GROUP BY, sortowanie i limit w bazie
+            sort_expression = official_stats_sort_expressions().get(sort_field, F(sort_field))
+            rows = (
+                stats.values(group=BREAKDOWN_GROUPS[by]).annotate(**official_stats_aggregates())
+                .annotate(sort_value=sort_expression)
+                .order_by(F('sort_value').desc() if sort.startswith('-') else F('sort_value').asc(), 'group')
+            )
+            if limit > 0:
+                rows = rows[:limit]
+            results = [{'group': row['group'], **PlayerAggregatedStatsSerializer(row).data} for row in rows]
+
+        response_data = {
+            'by': by,
+            'results': results
+        }
+
+        return cache_response(request, cache_key, response_data, timeout=3600)
+
+
+MAX_COMPARED_PLAYERS = 10
+
+
+# GET /api/official_stats/compare/?players=a,b,c   porownanie statystyk kilku graczy (public)
+class ComparePlayersStatsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        nicks = []
+        for nick in request.GET.get('players', '').split(','):
+            nick = nick.strip()
+            if nick and nick.lower() not in [n.lower() for n in nicks]:
+                nicks.append(nick)
+
+        if not nicks:
+            return Response({'error': "Missing 'players' parameter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(nicks) > MAX_COMPARED_PLAYERS:
+            return Response(
+                {'error': f"You can compare at most {MAX_COMPARED_PLAYERS} players"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = get_stats_filters(request)
+        # generacja kazdego gracza w kluczu - nowe mecze ktoregokolwiek uniewazniaja porownanie
+        generations = get_player_generations(nicks)
+        cache_key = generate_cache_key(
+            ','.join(sorted(f"{n.lower()}:{generation}" for n, generation in zip(nicks, generations))),
+            filters, prefix="official_stats_compare"
+        )
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        players_q = Q()
+        for nick in nicks:
+            players_q |= Q(nick__iexact=nick)
+
+        known = {nick.lower(): nick for nick in Player.objects.filter(players_q).values_list('nick', flat=True)}
+        unknown = [nick for nick in nicks if nick.lower() not in known]
+        if unknown:
+            return Response(
+                {'error': "Player not found.", 'unknown_players': unknown}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        stats = filter_official_stats(
+            PlayerOfficialStats.objects.filter(player__nick__in=known.values()), filters
+        )
+
+        # jedno zapytanie GROUP BY po graczu
+        rows = {
+            row['nick'].lower(): row
+            for row in stats.values(nick=F('player__nick')).annotate(**official_stats_aggregates()).order_by()
+        }
+
+        results = []
+        for nick in nicks:
+            row = rows.get(nick.lower())
+            if row is None:
+                # gracz bez meczy pod tymi filtrami
+                row = {field: 0 for field in official_stats_aggregates()}
+                row['total_gamelength'] = None
+            results.append({
+                'nick': known[nick.lower()],
+                'aggregated_stats': PlayerAggregatedStatsSerializer(row).data
+            })
+
+        response_data = {'results': results}
+
+        return cache_response(request, cache_key, response_data, timeout=3600)
+
+
+TREND_WINDOWS = (3, 5, 10, 20)
+# ?last= - ile ostatnich gier w serii kroczacej
+TREND_MAX_LAST = 500
+TREND_BUCKETS = {
+    'month': TruncMonth,
+    'week': TruncWeek,
+}
+
+
+def trend_point(kills, deaths, assists, cs, damage, team_damage, gamelength, wins, games):
+    minutes = gamelength.total_seconds() / 60 if gamelength else 0
+    return {
+        'games': games,
+        'win_rate': round(wins / games * 100, 1) if games else 0,
+        'kda': round((kills + assists) / max(deaths, 1), 2),
+        'cs_per_min': round(cs / minutes, 1) if minutes else 0,
+        'damage_share': round(damage / team_damage * 100, 1) if team_damage else 0,
+    }
+
+
+# GET /api/players/<nick>/official_stats/trend/?window=5&bucket=month   forma i trendy gracza (public)
+class PlayerStatsTrendView(APIView):
+    permission_classes = [AllowAny]
+
+    def cache_key(self, request, nick, generation):
+        try:
+            window = int(request.GET.get('window', 5))
+            last = max(1, min(int(request.GET.get('last', 50)), TREND_MAX_LAST))
+        except ValueError:
+            return None
+
+        return generate_cache_key(
+            f"{nick.lower()}:{generation}",
+            {**get_stats_filters(request), 'window': window, 'bucket': request.GET.get('bucket', 'month'), 'last': last},
+            prefix="player_stats_trend"
+        )
+
+    def get(self, request, nick):
+        try:
+            window = int(request.GET.get('window', 5))
+            last = max(1, min(int(request.GET.get('last', 50)), TREND_MAX_LAST))
+        except ValueError:
+            return Response({'error': "'window' and 'last' must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if window not in TREND_WINDOWS:
+            return Response(
+                {'error': f"Invalid 'window'. Allowed: {', '.join(map(str, TREND_WINDOWS))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bucket = request.GET.get('bucket', 'month')
+        if bucket not in TREND_BUCKETS:
+            return Response(
+                {'error': f"Invalid 'bucket'. Allowed: {', '.join(TREND_BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = get_stats_filters(request)
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        stats = filter_official_stats(PlayerOfficialStats.objects.filter(player__nick__iexact=nick), filters)
+        win = Case(When(winner=F('side'), then=Value(1)), default=Value(0), output_field=IntegerField())
+
+        # sumy kroczace po ostatnich `window` grach, indeks (player, datetime_utc)
+        def rolling(expression):
+            return Window(
+                expression=Sum(expression),
+                order_by=[F('datetime_utc').asc(), F('id').asc()],
+                frame=RowRange(start=-(window - 1), end=0)
+            )
+
+        rows = stats.annotate(
+            w_kills=rolling('kills'),
+            w_deaths=rolling('deaths'),
+            w_assists=rolling('assists'),
+            w_cs=rolling('cs'),
+            w_damage=rolling('damage_to_champions'),
+            w_team_damage=rolling('team_damage_to_champions'),
+            w_gamelength=rolling('gamelength'),
+            w_wins=rolling(win),
+            w_games=Window(
+                expression=Count('id'),
+                order_by=[F('datetime_utc').asc(), F('id').asc()],
+                frame=RowRange(start=-(window - 1), end=0)
+            ),
+        ).order_by('-datetime_utc', '-id').values(
+            'game_id', 'datetime_utc', 'champion', 'winner', 'side',
+            'w_kills', 'w_deaths', 'w_assists', 'w_cs', 'w_damage',
+            'w_team_damage', 'w_gamelength', 'w_wins', 'w_games'
+        )
+
+        # okna liczone przed LIMIT - bierzemy `last` najnowszych gier i odwracamy kolejnosc
+        rolling_series = []
+        for row in reversed(rows[:last]):
+            rolling_series.append({
+                'game_id': row['game_id'],
+                'datetime_utc': row['datetime_utc'],
+                'champion': row['champion'],
+                'win': row['winner'] == row['side'],
+                **trend_point(
+                    row['w_kills'], row['w_deaths'], row['w_assists'], row['w_cs'], row['w_damage'],
+                    row['w_team_damage'], row['w_gamelength'], row['w_wins'], row['w_games']
+                )
+            })
+
+        buckets = stats.annotate(period=TREND_BUCKETS[bucket]('datetime_utc')).values('period').annotate(
+            kills=Sum('kills'),
+            deaths=Sum('deaths'),
+            assists=Sum('assists'),
+            total_cs=Sum('cs'),
+            damage=Sum('damage_to_champions'),
+            team_damage=Sum('team_damage_to_champions'),
+            total_gamelength=Sum('gamelength'),
+            wins=Sum(win),
+            games=Count('id'),
+        ).order_by('period')
+
+        bucket_series = []
+        for row in buckets:
+            bucket_series.append({
+                'period': row['period'],
+                **trend_point(
+                    row['kills'], row['deaths'], row['assists'], row['total_cs'], row['damage'],
+                    row['team_damage'], row['total_gamelength'], row['wins'], row['games']
+                )
+            })
+
+        response_data = {
+            'window': window,
+            'bucket': bucket,
+            'rolling': rolling_series,
+            'buckets': bucket_series,
         }
 
-        cache.set(cache_key, options, timeout=7200)
-        return Response(options)
+        return cache_response(request, cache_key, response_data, timeout=3600)
+
+
+# GET /api/leaderboards/?role=Mid&year=2025&metric=cs_per_min   ranking graczy (public, paginowany)
+class LeaderboardPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class LeaderboardView(SparseFieldsetViewMixin, generics.ListAPIView):
+    serializer_class = PlayerLeaderboardEntrySerializer
+    permission_classes = [AllowAny]
+    pagination_class = LeaderboardPagination
+
+    def get_queryset(self):
+        metric = self.request.query_params.get('metric', 'kda')
+        if metric not in LEADERBOARD_METRICS:
+            metric = 'kda'
+
+        entries = PlayerLeaderboardEntry.objects.filter(
+            games__gte=LEADERBOARD_MIN_GAMES
+        ).select_related('player')
+
+        role = self.request.query_params.get('role')
+        if role:
+            entries = entries.filter(role__iexact=role)
+
+        year = validate_year(self.request.query_params.get('year'))
+        if year:
+            entries = entries.filter(year=year)
+
+        return entries.order_by(f'-{metric}', '-games', 'id')
+
+
+def top_builds(rows, limit):
+    """rows posortowane po (champion, -games) -> top `limit` buildow na championa."""
+    builds = {}
+    for row in rows:
+        champion_builds = builds.setdefault(row['champion'], [])
+        if len(champion_builds) < limit:
+            champion_builds.append(row)
+    return builds
+
+
+def build_entry(row, **extra):
+    return {
+        **extra,
+        'games': row['games'],
+        'wins': row['wins'],
+        'win_rate': round(row['wins'] / row['games'] * 100, 1) if row['games'] else 0,
+    }
+
+
+def builds_limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', 3)), 1), 10)
+    except ValueError:
+        return 3
+
+
+# GET /api/players/<nick>/official_stats/builds/    najczestsze buildy itemow i run na championa (public)
+class PlayerBuildsView(APIView):
+    permission_classes = [AllowAny]
+
+    def cache_key(self, request, nick, generation):
+        return generate_cache_key(
+            f"{nick.lower()}:{generation}", {**get_stats_filters(request), 'limit': builds_limit(request)},
+            prefix="player_builds"
+        )
+
+    def get(self, request, nick):
+        limit = builds_limit(request)
+        filters = get_stats_filters(request)
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        stats = filter_official_stats(PlayerOfficialStats.objects.filter(player__nick__iexact=nick), filters)
+        counts = {
+            'games': Count('id'),
+            'wins': Count('id', filter=Q(winner=F('side'))),
+        }
+
+        item_builds = top_builds(
+            stats.exclude(item_ids=[]).values('champion', 'item_ids').annotate(**counts).order_by('champion', '-games'),
+            limit
+        )
+        rune_builds = top_builds(
+            stats.exclude(rune_ids=[]).values('champion', 'primary_tree', 'secondary_tree', 'rune_ids')
+            .annotate(**counts).order_by('champion', '-games'),
+            limit
+        )
+        champion_games = dict(stats.values_list('champion').annotate(games=Count('id')).order_by())
+
+        # zamiana id na nazwy jednym zapytaniem na tabele
+        item_rows = [row for rows in item_builds.values() for row in rows]
+        rune_rows = [row for rows in rune_builds.values() for row in rows]
+        for row, names in zip(item_rows, decode(Item, [row['item_ids'] for row in item_rows])):
+            row['items'] = names
+        for row, names in zip(rune_rows, decode(Rune, [row['rune_ids'] for row in rune_rows])):
+            row['runes'] = names
+
+        champions = []
+        for champion, games in sorted(champion_games.items(), key=lambda c: -c[1]):
+            champions.append({
+                'champion': champion,
+                'games': games,
+                'item_builds': [build_entry(row, items=row['items']) for row in item_builds.get(champion, [])],
+                'rune_builds': [
+                    build_entry(
+                        row,
+                        primary_tree=row['primary_tree'],
+                        secondary_tree=row['secondary_tree'],
+                        runes=row['runes']
+                    )
+                    for row in rune_builds.get(champion, [])
+                ],
+            })
+
+        response_data = {'champions': champions}
+
+        return cache_response(request, cache_key, response_data, timeout=3600)
+
+
+OFFICIAL_STATS_EXPORT_COLUMNS = [
+    field.name for field in PlayerOfficialStats._meta.concrete_fields if field.name != 'player'
+]
+
+
+class ExportView(ABC, APIView):
+    """Bazowy widok eksportu - strumieniuje wiersze z kursora po stronie serwera."""
+    permission_classes = [IsAdminUser]
+    filename = 'export'
+
+    @abstractmethod
+    def get_rows(self, request):
+        """(kolumny, queryset.values_list) do wyeksportowania."""
+
+    def get(self, request):
+        export_format = request.GET.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Invalid 'output'. Allowed: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if export_format == 'parquet' and not parquet_available():
+            return Response({'error': "Parquet export requires pyarrow"}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns, rows = self.get_rows(request)
+
+        stream = EXPORT_WRITERS[export_format](columns, export_fields(rows), rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        # pod ASGI synchroniczny iterator bylby wczytany w calosci przed wyslaniem
+        # (META z WSGI zawsze ma wsgi.input, META z zakresu ASGI nie)
+        if 'wsgi.input' not in request.META:
+            stream = aiterate(stream)
+
+        response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{export_format}"'
+        return response
+
+
+# GET /api/export/official_stats/?output=csv|ndjson|parquet&player=<nick>   eksport statystyk (admin)
+class ExportOfficialStatsView(ExportView):
+    filename = 'official_stats'
+
+    def get_rows(self, request):
+        stats = filter_official_stats(
+            PlayerOfficialStats.objects.with_derived_metrics(), get_stats_filters(request)
+        ).filter(**get_metric_filters(request))
+
+        player = request.GET.get('player')
+        if player:
+            stats = stats.filter(player__nick__iexact=player)
+
+        columns = ['player'] + OFFICIAL_STATS_EXPORT_COLUMNS + list(DERIVED_METRICS)
+        rows = stats.order_by('id').values_list(
+            'player__nick', *OFFICIAL_STATS_EXPORT_COLUMNS, *DERIVED_METRICS
+        )
+        return columns, rows
+
+
+# GET /api/export/matches/?output=csv|ndjson|parquet&player=<nick>   eksport historii soloq (admin)
+class ExportMatchesView(ExportView):
+    filename = 'matches'
+
+    def get_rows(self, request):
+        participations = MatchParticipation.objects.all()
+
+        player = request.GET.get('player')
+        if player:
+            participations = participations.filter(summoner__player__nick__iexact=player)
+
+        champion = request.GET.get('champion')
+        if champion:
+            participations = participations.filter(champion__iexact=champion)
+
+        columns = ['match_id', 'game_start', 'game_duration', 'player', 'riot_id',
+                   'champion', 'lane', 'kills', 'deaths', 'assists', 'win']
+        rows = participations.order_by('id').values_list(
+            'match__match_id', 'match__game_start', 'match__game_duration', 'summoner__player__nick',
+            'summoner__riot_id', 'champion', 'lane', 'kills', 'deaths', 'assists', 'win'
+        )
+        return columns, rows
+
+
+# POST /api/import/official_stats/   masowy import statystyk z CSV/NDJSON (admin)
+class ImportOfficialStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Missing 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        input_format = request.query_params.get('input') or upload.name.rsplit('.', 1)[-1].lower()
+        if input_format not in ('csv', 'ndjson'):
+            return Response(
+                {'error': "Invalid 'input'. Allowed: csv, ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        report = OfficialStatsIngest().run(stream, input_format)
+
+        return Response(report, status=status.HTTP_200_OK)
+
+
+# GET /api/players/<nick>/champions/   pula championow z rankedow, ze wszystkich kont gracza (public)
+class PlayerChampionPoolView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, nick):
+        rows = SummonerChampionStats.objects.filter(summoner__player__nick=nick)
+
+        lane = request.GET.get('lane')
+        if lane:
+            rows = rows.filter(lane__iexact=lane)
+
+        # rollup ma wiersz na (konto, champion, lane) - sumujemy konta
+        rows = rows.values('champion', 'lane').annotate(
+            games=Sum('games'),
+            wins=Sum('wins'),
+            kills=Sum('kills'),
+            deaths=Sum('deaths'),
+            assists=Sum('assists'),
+            last_played=Max('last_played'),
+        ).order_by('-games', 'champion')
+
+        champions = []
+        for row in rows:
+            champions.append({
+                **row,
+                'win_rate': round(row['wins'] / row['games'] * 100, 1) if row['games'] else 0,
+                'kda': round((row['kills'] + row['assists']) / max(row['deaths'], 1), 2),
+            })
+
+        if not champions and not Player.objects.filter(nick=nick).exists():
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({'results': champions})
+
+
+# GET /api/players/<nick>/duos/   sledzeni gracze z tej samej druzyny w rankedach, z win rate (public)
+class PlayerDuosView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, nick):
+        player = Player.objects.filter(nick=nick).only('id').first()
+        if player is None:
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # para jest zapisana raz (player_a.id < player_b.id) - partner to ta druga strona
+        rows = DuoStats.objects.filter(Q(player_a=player) | Q(player_b=player)).select_related(
+            'player_a', 'player_b'
+        ).order_by('-games', '-last_played')
+
+        duos = []
+        for row in rows:
+            partner = row.player_b if row.player_a_id == player.id else row.player_a
+            duos.append({
+                'partner': partner.nick,
+                'games': row.games,
+                'wins': row.wins,
+                'win_rate': round(row.wins / row.games * 100, 1) if row.games else 0,
+                'last_played': row.last_played,
+            })
+
+        return Response({'results': duos})
+
+
+# GET /api/players/<nick>/matchups/?champion=&opponent=   wyniki przeciwko championom z tej samej linii (public)
+class PlayerMatchupsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, nick):
+        puuids = list(SummonerName.objects.filter(player__nick=nick).exclude(puuid='').values_list('puuid', flat=True))
+        if not puuids and not Player.objects.filter(nick=nick).exists():
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        matchups = lane_matchups(
+            puuids, champion=request.GET.get('champion'), opponent=request.GET.get('opponent')
+        ) if puuids else []
+
+        return Response({'results': matchups})
+
+
+PROFILE_SECTIONS = ('player', 'ranks', 'matches', 'official_stats', 'options')
+
+# rangi i soloq nie zmieniaja generacji gracza (fetch_puuids/fetch_matches) - krotki TTL
+PROFILE_CACHE_TTL = 300
+
+
+def profile_sections(request):
+    # ?include=ranks,matches albo ?include=ranks&include=matches, domyslnie wszystko
+    requested = [name for value in request.GET.getlist('include') for name in value.split(',') if name]
+    sections = [name for name in PROFILE_SECTIONS if name in requested]
+    return sections or list(PROFILE_SECTIONS)
+
+
+def second_page_link(url, count, page_size):
+    return f"{url}?page=2" if count > page_size else None
+
+
+# GET /api/players/<nick>/profile/?include=ranks,matches   cala strona gracza w jednym zapytaniu (public)
+class PlayerProfileView(APIView):
+    permission_classes = [AllowAny]
+
+    def cache_key(self, request, nick, generation):
+        return generate_cache_key(
+            f"{nick.lower()}:{generation}",
+            {'include': ','.join(profile_sections(request)), 'summary_games': summary_games(request)},
+            prefix="player_profile"
+        )
+
+    def get(self, request, nick):
+        cache_key = self.cache_key(request, nick, get_player_generation(nick))
+
+        cached = cached_response(request, cache_key)
+        if cached:
+            return cached
+
+        # jeden odczyt gracza dla wszystkich sekcji
+        player = Player.objects.filter(nick=nick).first()
+        if player is None:
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        sections = profile_sections(request)
+        response_data = {}
+
+        if 'player' in sections:
+            response_data['player'] = PlayerSerializer(player).data
+
+        if 'ranks' in sections:
+            # gracz jest w sekcji player - wiersze rang bez niego (Meta.list_exclude)
+            rank_serializer = SummonerNameSerializer(exclude=SummonerNameSerializer.Meta.list_exclude)
+            summoners = defer_unused_columns(ranked_summoner_names(SummonerName.objects.filter(player=player)), rank_serializer)
+            response_data['ranks'] = SummonerNameSerializer(
+                summoners, many=True, exclude=SummonerNameSerializer.Meta.list_exclude
+            ).data
+
+        if 'matches' in sections:
+            participations = player_participations(summoner__player=player)
+            page_size = MatchPagination.page_size
+            count = participations.count()
+            response_data['matches'] = {
+                'count': count,
+                'next': second_page_link(request.build_absolute_uri(reverse('player_matches', args=[nick])), count, page_size),
+                'results': MatchParticipationSerializer(participations[:page_size], many=True).data,
+                'summary': match_summary(participations if count else participations.none(), summary_games(request)),
+            }
+
+        if 'official_stats' in sections:
+            stats = PlayerOfficialStats.objects.filter(player=player)
+            # bez filtrow, jak pierwsze wejscie na official_stats/
+            filters = dict.fromkeys(('champion', 'year', 'tournament', 'team_vs'))
+            columns = stats_engine.get(nick)
+            aggregated_stats = columns.aggregate(filters) if columns is not None \
+                else stats.aggregate(**official_stats_aggregates())
+            page_size = PlayerOfficialStatsPagination.page_size
+            match_serializer = PlayerOfficialStatsSerializer(exclude=PlayerOfficialStatsSerializer.Meta.list_exclude)
+            matches = defer_unused_columns(
+                stats.with_derived_metrics().order_by('-datetime_utc', '-id'), match_serializer
+            )[:page_size]
+            # liczba meczy bez filtrow = total_matches z agregatu, bez osobnego COUNT
+            count = aggregated_stats['total_matches']
+            # gracz bez oficjalnych meczy (same soloq) - agregaty bylyby puste
+            response_data['official_stats'] = None if not count else {
+                'aggregated_stats': PlayerAggregatedStatsSerializer(aggregated_stats).data,
+                'matches': {
+                    'results': PlayerOfficialStatsSerializer(
+                        matches, many=True, exclude=PlayerOfficialStatsSerializer.Meta.list_exclude
+                    ).data,
+                    'count': count,
+                    'next': second_page_link(
+                        request.build_absolute_uri(reverse('official_player_match', args=[nick])), count, page_size
+                    ),
+                    'previous': None,
+                }
+            }
+
+        if 'options' in sections:
+            response_data['options'] = player_filter_options(nick)
+
+        return cache_response(request, cache_key, response_data, timeout=PROFILE_CACHE_TTL)
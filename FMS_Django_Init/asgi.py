@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FMS_Django_Init.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from FMS_Django_App.pandascore import aclose_session  # noqa: E402 - po zaladowaniu aplikacji
+
+
+async def application(scope, receive, send):
+    # Django nie obsluguje lifespan - przy zamknieciu workera zamykamy sesje aiohttp
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await aclose_session()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    await django_application(scope, receive, send)
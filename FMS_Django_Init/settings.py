@@ -187,7 +187,7 @@ else:
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'FMS_Django_App.renderers.ORJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'FMS_Django_App.authentication.JWTAuthentication',
@@ -207,6 +207,7 @@ REST_FRAMEWORK = {
         'newsletter': '3/day',  # lepszy dla newslettera
         'pandascore': '60/min',  # więcej dla API
         'posts': '20/hour',  # osobny limit dla tworzenia postów
+        'live': '60/min',  # polaczenia z /api/live/events/ (pod WSGI co SSE_RETRY)
     },
 }
 
@@ -313,7 +314,20 @@ else:
         },
     }
 
-UPSTASH_REDIS_REST_URL = str(os.getenv("UPSTASH_REDIS_REST_URL"))
+# brak zmiennej = cache w pamieci procesu, nie Redis pod adresem "None"
+UPSTASH_REDIS_REST_URL = os.getenv("UPSTASH_REDIS_REST_URL", "")
+
+# Riot API (riot.py) - platforma dla spectator-v5, podmieniana na lokalny stub w testach
+RIOT_PLATFORM_URL = os.getenv("RIOT_PLATFORM_URL", "https://euw1.api.riotgames.com")
+
+# Async widoki I/O (async_views.py) - tylko przy ASGI (uvicorn), patrz README
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+
+# PandaScore proxy (pandascore.py) - podmieniany na lokalny stub w testach
+PANDASCORE_BASE_URL = os.getenv("PANDASCORE_BASE_URL", "https://api.pandascore.co")
+
+# Druzyny, ktorych mecze sync_official_matches trzyma w bazie (np. "136773,128268")
+PANDASCORE_TEAM_IDS = [int(team_id) for team_id in os.getenv("PANDASCORE_TEAM_IDS", "").split(",") if team_id.strip()]
 
 if UPSTASH_REDIS_REST_URL and not DEBUG:
     CACHES = {
@@ -331,6 +345,22 @@ if UPSTASH_REDIS_REST_URL and not DEBUG:
                 'SERIALIZER': 'django_redis.serializers.json.JSONSerializer',
             },
             'TIMEOUT': 300,
+        },
+        # gotowe bajty odpowiedzi (responses.py) - JSONSerializer nie zapisze bytes
+        'responses': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': UPSTASH_REDIS_REST_URL,
+            'KEY_PREFIX': 'responses',
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'CONNECTION_POOL_KWARGS': {
+                    'retry_on_timeout': True,
+                    'socket_connect_timeout': 5,
+                    'socket_timeout': 5,
+                },
+                'IGNORE_EXCEPTIONS': True,
+            },
+            'TIMEOUT': 300,
         }
     }
 else:
@@ -338,6 +368,10 @@ else:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'responses': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'responses',
         }
     }
 
@@ -8,5 +8,6 @@ python manage.py makemigrations FMS_Django_App
 python manage.py migrate auth
 python manage.py migrate FMS_Django_App
 python manage.py migrate
+python manage.py partition_tables
 python manage.py createcachetable
 python manage.py collectstatic --no-input
\ No newline at end of file